@@ -0,0 +1,277 @@
+"""Batch JSON API for the curve math
+
+POST a list of requests to /api/<operation>:
+
+    curl -H 'Content-Type: application/json' localhost:8050/api/multiply -d '{
+        "curve": {"p": 37, "a": 0, "b": 7},
+        "requests": [{"P": [18, 17], "n": 3}, {"P": [18, 17], "n": 12}]}'
+
+    {"results": [{"R": [...]}, {"R": [...]}]}
+
+A request may carry its own "curve" instead of the shared one. Points are
+[x, y] lists with null for the point at infinity. Every request gets a result
+or an {"error": ...} in the same position.
+
+    add               P, Q          -> R = P + Q
+    multiply          P, n          -> R = nP
+    inverse-multiply  P, n          -> Q with nQ = P
+    order             (curve only)  -> order, n1, n2, cyclic
+    subgroup-order    P             -> order of P
+    sign              G, d, k, z    -> r, s   (ECDSA in the subgroup of G)
+    verify            G, H, z, r, s -> valid
+
+sign and verify take a "message" (hashed like the dashboard does) in place of z.
+
+Every request is limited to p <= max_p and integers (n, d, k, r, s, z) of at
+most max_bits bits, so no call runs for long. Requests on the same curve run
+as one PointBatch. The curve order comes from a Legendre symbol count and
+point orders from its factorization, so no request lists the orders of every
+point or leaves a cached group behind.
+"""
+import math
+
+import numpy as np
+
+from elliptic import arith
+from elliptic.batch import PointBatch
+from elliptic.digest import ECDSA_Z_SIZE, digest, to_z
+from elliptic.group import curve_order, group_invariants, point_orders
+
+
+max_batch = 10000 # requests per call
+max_prime = 2**16 # largest p of any request
+max_scalar_bits = 256 # largest bit length of n, d, k, r, s and z
+
+
+class Batch:
+    """requests of one operation on one curve (p, a, b), with their positions"""
+
+    def __init__(self, p, a, b):
+        self.p, self.a, self.b = p, a, b
+        self.index = []
+        self.requests = []
+        self._order = None
+
+    def points(self, key):
+        """PointBatch of request[key] for all requests"""
+        xs = [0 if r[key] is None else r[key][0] for r in self.requests]
+        ys = [0 if r[key] is None else r[key][1] for r in self.requests]
+        inf = [r[key] is None for r in self.requests]
+        return PointBatch(np.array(xs, dtype=object), np.array(ys, dtype=object),
+                          self.a, self.b, self.p, inf=inf)
+
+    def order(self):
+        """#E(F_p) of the curve"""
+        if self._order is None:
+            self._order = curve_order(self.p, self.a, self.b)
+        return self._order
+
+    def orders(self, key):
+        """subgroup order of request[key] for all requests, 1 for infinity"""
+        finite = [i for i, r in enumerate(self.requests) if r[key] is not None]
+        orders = [1]*len(self.requests)
+        if finite:
+            xs = np.array([self.requests[i][key][0] for i in finite], dtype=np.int64)
+            ys = np.array([self.requests[i][key][1] for i in finite], dtype=np.int64)
+            found = point_orders(xs, ys, self.p, self.a, self.b, self.order())
+            for i, order_ in zip(finite, found.tolist()):
+                orders[i] = order_
+        return orders
+
+
+def parse_curve(curve, max_p=max_prime):
+    p, a, b = (int(curve[_]) for _ in 'pab')
+    if p > max_p:
+        raise ValueError('p is limited to {}'.format(max_p))
+    if p < 3 or not arith.is_prime(p):
+        raise ValueError('p = {} is not an odd prime'.format(p))
+    if (4*a**3 + 27*b**2) % p == 0:
+        raise ValueError('y^2 = x^3 + {}x + {} is singular mod {}'.format(a, b, p))
+    return p, a % p, b % p
+
+
+def parse_point(point, p, a, b):
+    """(x, y) on the curve, None for infinity"""
+    if point is None:
+        return None
+    x, y = (int(_) for _ in point)
+    if not (0 <= x < p and 0 <= y < p) or (y*y - x**3 - a*x - b) % p != 0:
+        raise ValueError('({}, {}) is not on the curve'.format(x, y))
+    return x, y
+
+
+def parse_int(value, max_bits=max_scalar_bits):
+    """int of at most max_bits bits"""
+    n = int(value)
+    if n.bit_length() > max_bits:
+        raise ValueError('integers are limited to {} bits'.format(max_bits))
+    return n
+
+
+def message_z(request, max_bits=max_scalar_bits):
+    """z given directly or hashed from the message, as on the ECDSA tab"""
+    if 'z' in request:
+        return parse_int(request['z'], max_bits)
+    if 'message' in request:
+        return to_z(digest([str(request['message'])]), ECDSA_Z_SIZE)
+    raise ValueError('z or message required')
+
+
+# fields of each operation that are points
+point_fields = {
+    'add': ['P', 'Q'],
+    'multiply': ['P'],
+    'inverse-multiply': ['P'],
+    'order': [],
+    'subgroup-order': ['P'],
+    'sign': ['G'],
+    'verify': ['G', 'H'],
+    }
+
+# fields of each operation that are integers
+int_fields = {
+    'multiply': ['n'],
+    'inverse-multiply': ['n'],
+    'sign': ['d', 'k'],
+    'verify': ['r', 's'],
+    }
+
+
+def _add(batch):
+    return [dict(R=R) for R in (batch.points('P') + batch.points('Q')).to_list()]
+
+
+def _multiply(batch):
+    n = np.array([r['n'] for r in batch.requests], dtype=object)
+    return [dict(R=R) for R in batch.points('P').multiply(n).to_list()]
+
+
+def _inverse_multiply(batch):
+    orders = batch.orders('P')
+    results, n_inv = [], []
+    for r, order_ in zip(batch.requests, orders):
+        try:
+            n_inv.append(arith.inverse(r['n'], order_))
+            results.append({})
+        except ValueError:
+            n_inv.append(0)
+            results.append(dict(error='{} has no inverse mod the order {} of P'.format(r['n'], order_)))
+    Q = batch.points('P').multiply(np.array(n_inv, dtype=object)).to_list()
+    return [result or dict(Q=Q_, order=order_)
+            for result, Q_, order_ in zip(results, Q, orders)]
+
+
+def _order(batch):
+    order_, n1, n2 = group_invariants(batch.p, batch.a, batch.b)
+    return [dict(order=order_, n1=n1, n2=n2, cyclic=n2 == 1) for _ in batch.requests]
+
+
+def _subgroup_order(batch):
+    return [dict(order=order_) for order_ in batch.orders('P')]
+
+
+def _sign(batch):
+    orders = batch.orders('G')
+    k = np.array([r['k'] for r in batch.requests], dtype=object)
+    kG = batch.points('G').multiply(k).to_list()
+    results = []
+    for r, n, R in zip(batch.requests, orders, kG):
+        if R is None or R[0] % n == 0:
+            results.append(dict(error='k*G gives r = 0, choose another k'))
+            continue
+        x = R[0] % n
+        try:
+            s = arith.inverse(r['k'], n)*(r['z'] + x*r['d']) % n
+        except ValueError:
+            results.append(dict(error='k = {} has no inverse mod {}'.format(r['k'], n)))
+            continue
+        if s == 0:
+            results.append(dict(error='s = 0, choose another k'))
+            continue
+        results.append(dict(z=r['z'], r=x, s=s, n=n))
+    return results
+
+
+def _verify(batch):
+    orders = batch.orders('G')
+    u1, u2, valid = [], [], []
+    for r, n in zip(batch.requests, orders):
+        z, r_, s = r['z'], r['r'], r['s']
+        ok = 0 < r_ < n and 0 < s < n and math.gcd(s, n) == 1
+        s_inv = arith.inverse(s, n) if ok else 0
+        u1.append(z*s_inv % n)
+        u2.append(r_*s_inv % n)
+        valid.append(ok)
+    P = (batch.points('G').multiply(np.array(u1, dtype=object))
+         + batch.points('H').multiply(np.array(u2, dtype=object))).to_list()
+    return [dict(valid=bool(ok and P_ is not None and P_[0] % n == r['r']))
+            for ok, P_, n, r in zip(valid, P, orders, batch.requests)]
+
+
+operations = {
+    'add': _add,
+    'multiply': _multiply,
+    'inverse-multiply': _inverse_multiply,
+    'order': _order,
+    'subgroup-order': _subgroup_order,
+    'sign': _sign,
+    'verify': _verify,
+    }
+
+
+def run(operation, requests, curve=None, max_p=max_prime, max_bits=max_scalar_bits):
+    """results of a list of requests, in order"""
+    if operation not in operations:
+        raise KeyError(operation)
+    results = [None]*len(requests)
+    batches = {}
+    for i, request in enumerate(requests):
+        try:
+            p, a, b = parse_curve(request.get('curve', curve) or {}, max_p)
+            request = dict(request)
+            for field in point_fields[operation]:
+                request[field] = parse_point(request[field], p, a, b)
+            for field in int_fields.get(operation, []):
+                request[field] = parse_int(request[field], max_bits)
+            if operation in ('sign', 'verify'):
+                request['z'] = message_z(request, max_bits)
+        except (KeyError, TypeError, ValueError) as e:
+            results[i] = dict(error='{}: {}'.format(type(e).__name__, e))
+            continue
+        batch = batches.setdefault((p, a, b), Batch(p, a, b))
+        batch.index.append(i)
+        batch.requests.append(request)
+
+    for batch in batches.values():
+        try:
+            batch_results = operations[operation](batch)
+        except (KeyError, TypeError, ValueError) as e:
+            batch_results = [dict(error='{}: {}'.format(type(e).__name__, e))]*len(batch.index)
+        for i, result in zip(batch.index, batch_results):
+            results[i] = result
+    return results
+
+
+def register_routes(server, url_base='/api/', max_requests=max_batch, max_p=max_prime,
+                    max_bits=max_scalar_bits):
+    """add the /api/<operation> routes to the flask server"""
+    from flask import abort, jsonify, request
+
+    def api(operation):
+        if operation not in operations:
+            abort(404)
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or not isinstance(body.get('requests'), list):
+            abort(400, 'expected {"curve": {...}, "requests": [...]}')
+        if len(body['requests']) > max_requests:
+            abort(413, 'at most {} requests per call'.format(max_requests))
+        if not all(isinstance(r, dict) for r in body['requests']):
+            abort(400, 'every request must be an object')
+        return jsonify(results=run(operation, body['requests'], body.get('curve'), max_p, max_bits))
+
+    def index():
+        return jsonify(operations=sorted(operations), max_requests=max_requests,
+                       max_prime=max_p, max_scalar_bits=max_bits)
+
+    server.add_url_rule(url_base + '<operation>', 'api', api, methods=['POST'])
+    server.add_url_rule(url_base, 'api_index', index)
@@ -0,0 +1,272 @@
+"""Modular arithmetic backends
+
+Modular multiplication, powers, inverses and square roots go through the
+selected backend:
+
+    from elliptic import arith
+    arith.inverse(k, n)    # ValueError if there is none
+    arith.sqrt(c, p)       # a root, None for non-residues
+    arith.is_prime(n)      # Miller-Rabin
+    P = arith.num(p)       # p in the backend's integer type
+
+The module functions return ints. Numbers made with num() mix with ints, so
+hot loops (see elliptic.secp256k1) keep their operators and run in the
+backend's type once their modulus is a num.
+
+PythonBackend uses CPython ints. GMPBackend uses gmpy2 (pip install gmpy2)
+and is chosen automatically when it imports. Set ELLIPTIC_ARITH=python or
+ELLIPTIC_ARITH=gmp to choose explicitly.
+
+    python -m elliptic.arith    # benchmark the backends at 64 and 256 bits
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+
+class PythonBackend:
+    """CPython ints"""
+
+    name = 'python'
+
+    def num(self, n):
+        return int(n)
+
+    def mul(self, a, b, m):
+        return a*b % m
+
+    def powmod(self, a, e, m):
+        return pow(a, e, m)
+
+    def inverse(self, a, m):
+        """a^-1 mod m, ValueError if gcd(a, m) != 1"""
+        return pow(a, -1, m)
+
+    def is_residue(self, a, p):
+        """True for nonzero squares mod the odd prime p"""
+        return self.powmod(a, (p - 1)//2, p) == 1
+
+    def sqrt(self, a, p):
+        """a root of a mod the odd prime p, None if a is not a square (Tonelli-Shanks)"""
+        a %= p
+        if a == 0:
+            return a
+        if not self.is_residue(a, p):
+            return None
+        if p % 4 == 3:
+            return self.powmod(a, (p + 1)//4, p)
+        q, s = p - 1, 0
+        while q % 2 == 0:
+            q, s = q//2, s + 1
+        z = 2
+        while self.is_residue(z, p):
+            z += 1
+        c, t, r = self.powmod(z, q, p), self.powmod(a, q, p), self.powmod(a, (q + 1)//2, p)
+        while t != 1:
+            i, t2 = 0, t
+            while t2 != 1:
+                t2, i = t2*t2 % p, i + 1
+            b = self.powmod(c, 1 << (s - i - 1), p)
+            s, c = i, b*b % p
+            t, r = t*c % p, r*b % p
+        return r
+
+
+class GMPBackend(PythonBackend):
+    """gmpy2 mpz numbers"""
+
+    name = 'gmp'
+
+    def num(self, n):
+        return gmpy2.mpz(n)
+
+    def mul(self, a, b, m):
+        return gmpy2.mpz(a)*b % m
+
+    def powmod(self, a, e, m):
+        return gmpy2.powmod(a, e, m)
+
+    def inverse(self, a, m):
+        try:
+            return gmpy2.invert(a, m)
+        except ZeroDivisionError:
+            raise ValueError('{} is not invertible mod {}'.format(a, m)) from None
+
+    def is_residue(self, a, p):
+        return gmpy2.legendre(a, p) == 1
+
+
+backends = {'python': PythonBackend}
+if gmpy2 is not None:
+    backends['gmp'] = GMPBackend
+
+
+def select(name=None):
+    """the backend called name, else $ELLIPTIC_ARITH, else gmp when installed"""
+    name = name or os.environ.get('ELLIPTIC_ARITH') or ('gmp' if 'gmp' in backends else 'python')
+    if name not in backends:
+        logging.warning('arithmetic backend {} is not available, using python'.format(name))
+        name = 'python'
+    return backends[name]()
+
+
+backend = select()
+
+
+def num(n):
+    return backend.num(n)
+
+
+def mul(a, b, m):
+    return int(backend.mul(a, b, m))
+
+
+def powmod(a, e, m):
+    return int(backend.powmod(a, e, m))
+
+
+def inverse(a, m):
+    return int(backend.inverse(a, m))
+
+
+def sqrt(a, p):
+    root = backend.sqrt(a, p)
+    return None if root is None else int(root)
+
+
+_bases = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+def is_prime(n):
+    """Miller-Rabin, deterministic for n < 3.3e24"""
+    n = int(n)
+    if n < 2:
+        return False
+    for q in _bases:
+        if n % q == 0:
+            return n == q
+    d, r = n - 1, 0
+    while d % 2 == 0:
+        d, r = d//2, r + 1
+    for base in _bases:
+        x = powmod(base, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(r - 1):
+            x = x*x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+
+# benchmark
+
+primes = {
+    64: 2**64 - 59,
+    256: 2**256 - 2**32 - 977, # secp256k1
+    }
+
+
+def _time(func, *args, repeat=5, number=None):
+    """best seconds per call"""
+    number = number or max(1, int(0.05/_once(func, *args)))
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func(*args)
+        best = min(best, (time.perf_counter() - start)/number)
+    return best
+
+
+def _once(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return max(time.perf_counter() - start, 1e-7)
+
+
+def benchmark(bits, seed=0):
+    """seconds per operation on the current backend at a field size"""
+    p = backend.num(primes[bits])
+    rng = random.Random(seed)
+    a, b = (backend.num(rng.randrange(1, int(p))) for _ in range(2))
+    square = a*a % p
+
+    def mul_chain():
+        x = a
+        for _ in range(100):
+            x = x*b % p
+        return x
+
+    results = dict(
+        mul=_time(mul_chain)/100,
+        pow=_time(backend.powmod, a, p - 2, p),
+        inverse=_time(backend.inverse, a, p),
+        sqrt=_time(backend.sqrt, square, p),
+        )
+
+    # 16 points of y^2 = x^3 + 7 times random scalars, as one PointBatch
+    import numpy as np
+    from elliptic.batch import PointBatch
+    xs, ys = [], []
+    x = 0
+    while len(xs) < 16:
+        x += 1
+        y = sqrt(x**3 + 7, int(p))
+        if y is not None:
+            xs.append(x)
+            ys.append(y)
+    scalars = np.array([rng.randrange(int(p)) for _ in xs], dtype=object)
+    batch = PointBatch(np.array(xs, dtype=object), np.array(ys, dtype=object), 0, 7, int(p))
+    results['batch_multiply'] = _time(batch.multiply, scalars, repeat=3)/len(xs)
+
+    if bits == 256:
+        from elliptic import secp256k1
+        d = rng.randrange(1, secp256k1.N)
+        z = rng.randrange(secp256k1.N)
+        Q = secp256k1.public_key(d)
+        signature = secp256k1.ecdsa_sign(d, z)
+        results['ecdsa_sign'] = _time(secp256k1.ecdsa_sign, d, z, repeat=3)
+        results['ecdsa_verify'] = _time(secp256k1.ecdsa_verify, Q, z, signature, repeat=3)
+    return results
+
+
+def _run(name):
+    """benchmark results of a backend, measured in a fresh interpreter"""
+    env = dict(os.environ, ELLIPTIC_ARITH=name)
+    out = subprocess.run([sys.executable, '-m', 'elliptic.arith', '--worker'],
+                         env=env, capture_output=True, text=True, check=True).stdout
+    return {int(bits): ops for bits, ops in json.loads(out).items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps({bits: benchmark(bits) for bits in primes}))
+        sys.exit()
+
+    results = {name: _run(name) for name in backends}
+    print('{:>5} {:<13}'.format('bits', 'operation') +
+          ''.join('{:>12}'.format(name + ' us') for name in results) +
+          ('{:>9}'.format('speedup') if 'gmp' in results else ''))
+    for bits in primes:
+        for op in results['python'][bits]:
+            times = [results[name][bits][op] for name in results]
+            row = '{:>5} {:<13}'.format(bits, op) + ''.join('{:>12.2f}'.format(1e6*t) for t in times)
+            if 'gmp' in results:
+                row += '{:>8.1f}x'.format(results['python'][bits][op]/results['gmp'][bits][op])
+            print(row)
@@ -0,0 +1,354 @@
+"""Array-backed field elements and point batches
+
+FieldArray and PointBatch mirror FieldElement and Point from Programming
+Bitcoin, but each instance holds many residues in numpy arrays so that curve
+checks, negation, addition, doubling and scalar multiplication run over a
+whole batch at once.
+
+Products of two residues must not overflow: for p < 2**31 arrays are int64
+(p**2 < 2**62), for larger p they fall back to object arrays of python ints,
+which numpy still applies elementwise. Those stay ints with the gmp backend
+of elliptic.arith too: numpy's per-element dispatch costs more than the
+products, so only the one inversion of batch_inverse goes through arith.
+"""
+import numpy as np
+
+from elliptic import arith
+
+
+def field_dtype(prime):
+    """int64 while products of residues fit, python ints otherwise"""
+    if prime < 2**31:
+        return np.int64
+    return object
+
+
+def as_residues(num, prime):
+    """numpy array of num mod prime with a dtype safe for multiplication"""
+    dtype = field_dtype(prime)
+    if dtype is object:
+        num = np.array(num, dtype=object)
+        if num.ndim == 0:
+            return np.array(int(num) % prime, dtype=object)
+        return np.vectorize(lambda n: int(n) % prime, otypes=[object])(num)
+    return np.asarray(num).astype(np.int64) % prime
+
+
+def batch_inverse(num, prime):
+    """inverses of an array of residues with Montgomery's trick (0 maps to 0)
+
+    pairwise products are taken level by level up to a single product, which
+    is the only number inverted. Going back down, each inverse times its
+    sibling is the inverse of the other one, so N inverses cost one inversion
+    and about 3N multiplications, in 2 log2(N) array operations.
+    """
+    flat = num.ravel()
+    if len(flat) == 0:
+        return num.copy()
+    zero = flat == 0
+    level = np.where(zero, 1, flat).astype(flat.dtype)
+    levels = []
+    while len(level) > 1:
+        if len(level) % 2:
+            level = np.concatenate([level, np.ones(1, dtype=level.dtype)])
+        levels.append(level)
+        level = level[0::2]*level[1::2] % prime
+
+    inv = np.array([arith.inverse(int(level[0]), prime)], dtype=flat.dtype)
+    for level in reversed(levels):
+        inv = inv[:len(level)//2] # drop the inverse of a padding 1
+        down = np.empty_like(level)
+        down[0::2] = inv*level[1::2] % prime
+        down[1::2] = inv*level[0::2] % prime
+        inv = down
+    inv = inv[:len(flat)]
+    inv[zero] = 0
+    return inv.reshape(num.shape)
+
+
+class FieldArray:
+    """many elements of F_p"""
+
+    __array_priority__ = 100 # so int * FieldArray uses __rmul__
+
+    def __init__(self, num, prime):
+        self.prime = prime
+        self.num = as_residues(num, prime)
+
+    @classmethod
+    def _wrap(cls, num, prime):
+        """trusted constructor, num already reduced with the right dtype"""
+        field = cls.__new__(cls)
+        field.prime = prime
+        field.num = num
+        return field
+
+    def __repr__(self):
+        return 'FieldArray_{}({})'.format(self.prime, self.num)
+
+    def __len__(self):
+        return len(self.num)
+
+    @property
+    def shape(self):
+        return self.num.shape
+
+    def _other(self, other):
+        if isinstance(other, FieldArray):
+            if other.prime != self.prime:
+                raise TypeError('Cannot combine elements of different fields')
+            return other.num
+        return as_residues(other, self.prime)
+
+    def __eq__(self, other):
+        return self.num == self._other(other)
+
+    def __ne__(self, other):
+        return self.num != self._other(other)
+
+    def __add__(self, other):
+        return self._wrap((self.num + self._other(other)) % self.prime, self.prime)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self._wrap((self.num - self._other(other)) % self.prime, self.prime)
+
+    def __rsub__(self, other):
+        return self._wrap((self._other(other) - self.num) % self.prime, self.prime)
+
+    def __neg__(self):
+        return self._wrap((-self.num) % self.prime, self.prime)
+
+    def __mul__(self, other):
+        return self._wrap((self.num * self._other(other)) % self.prime, self.prime)
+
+    __rmul__ = __mul__
+
+    def __pow__(self, exponent):
+        """elementwise power for a single integer exponent"""
+        exponent = exponent % (self.prime - 1)
+        result = np.ones_like(self.num)
+        base = self.num
+        while exponent:
+            if exponent & 1:
+                result = (result * base) % self.prime
+            base = (base * base) % self.prime
+            exponent >>= 1
+        return self._wrap(result, self.prime)
+
+    def inverse(self):
+        """elementwise inverse (0 maps to 0), see batch_inverse"""
+        return self._wrap(batch_inverse(self.num, self.prime), self.prime)
+
+    def __truediv__(self, other):
+        other = other if isinstance(other, FieldArray) else FieldArray(other, self.prime)
+        return self*other.inverse()
+
+    def where(self, condition, other):
+        """self where condition holds, other elsewhere"""
+        return self._wrap(np.where(condition, self.num, self._other(other)), self.prime)
+
+
+class PointBatch:
+    """many affine points on y^2 = x^3 + ax + b over F_p
+
+    inf marks points at infinity (their x, y are ignored)
+    """
+
+    def __init__(self, x, y, a, b, prime, inf=None):
+        self.prime = prime
+        self.a = a % prime
+        self.b = b % prime
+        self.x = x if isinstance(x, FieldArray) else FieldArray(x, prime)
+        self.y = y if isinstance(y, FieldArray) else FieldArray(y, prime)
+        if inf is None:
+            inf = np.zeros(self.x.shape, dtype=bool)
+        self.inf = np.asarray(inf, dtype=bool)
+
+    @classmethod
+    def infinity(cls, shape, a, b, prime):
+        zeros = np.zeros(shape, dtype=np.int64)
+        return cls(zeros, zeros, a, b, prime, inf=np.ones(shape, dtype=bool))
+
+    @classmethod
+    def repeat(cls, x, y, a, b, prime, n):
+        """n copies of the point (x, y)"""
+        return cls(np.full(n, x, dtype=object), np.full(n, y, dtype=object), a, b, prime)
+
+    def __repr__(self):
+        return 'PointBatch_{}({} points)'.format(self.prime, len(self))
+
+    def __len__(self):
+        return len(self.inf)
+
+    def _check(self, other):
+        if (self.a, self.b, self.prime) != (other.a, other.b, other.prime):
+            raise TypeError('Points are not on the same curve')
+
+    def on_curve(self):
+        """bool array, True where the point satisfies the curve equation"""
+        lhs = self.y*self.y
+        rhs = self.x*self.x*self.x + self.a*self.x + self.b
+        return self.inf | (lhs == rhs)
+
+    def where(self, condition, other):
+        """points of self where condition holds, other elsewhere"""
+        return PointBatch(self.x.where(condition, other.x),
+                          self.y.where(condition, other.y),
+                          self.a, self.b, self.prime,
+                          inf=np.where(condition, self.inf, other.inf))
+
+    def __neg__(self):
+        return PointBatch(self.x, -self.y, self.a, self.b, self.prime, inf=self.inf)
+
+    def __add__(self, other):
+        self._check(other)
+        x1, y1, x2, y2 = self.x, self.y, other.x, other.y
+
+        same_x = x1 == x2
+        doubling = same_x & (y1 == y2) & (y1 != 0)
+        vertical = same_x & ~doubling # P + (-P), including 2P with y = 0
+        inf = self.inf | other.inf | vertical
+
+        # slope of the chord, or the tangent when doubling
+        num = (3*x1*x1 + self.a).where(doubling, y2 - y1)
+        den = (2*y1).where(doubling, x2 - x1).where(~inf, 1)
+        s = num*den.inverse()
+
+        x3 = s*s - x1 - x2
+        y3 = s*(x1 - x3) - y1
+        result = PointBatch(x3, y3, self.a, self.b, self.prime, inf=vertical)
+
+        # infinity is the identity
+        result = other.where(self.inf, result)
+        result = self.where(other.inf & ~self.inf, result)
+        return result
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def double(self):
+        return self + self
+
+    def multiply(self, k):
+        """k * P elementwise, k an integer or an array of integers"""
+        k = np.broadcast_to(np.asarray(k, dtype=object), self.inf.shape)
+        negative = np.array(k < 0, dtype=bool)
+        k = np.where(negative, -k, k)
+
+        result = PointBatch.infinity(self.inf.shape, self.a, self.b, self.prime)
+        current = (-self).where(negative, self)
+        while np.any(k > 0):
+            bit = np.array(k & 1, dtype=bool)
+            result = (result + current).where(bit, result)
+            current = current.double()
+            k = k >> 1
+        return result
+
+    def __rmul__(self, k):
+        return self.multiply(k)
+
+    def to_list(self, infinity=None):
+        """list of (x, y) tuples, `infinity` in place of points at infinity"""
+        return [infinity if inf else (int(x), int(y))
+                for x, y, inf in zip(self.x.num, self.y.num, self.inf)]
+
+
+def _powmod(num, exponent, p):
+    """elementwise num^exponent mod p for int64 arrays (p < 2**31)"""
+    result = np.ones_like(num)
+    while exponent:
+        if exponent & 1:
+            result = result*num % p
+        num = num*num % p
+        exponent >>= 1
+    return result
+
+
+def sqrt_mod(num, p):
+    """the square root r <= p/2 of each residue in num, -1 for non-squares (p < 2**31)
+
+    Tonelli-Shanks over the whole array: each round finds, per unfinished
+    element, the least i with t^(2^i) = 1 and squares c down to the matching
+    b. Only the unfinished elements go into the next round, so the cost grows
+    with len(num) and log2(p), without a table of all of F_p.
+    """
+    num = np.asarray(num, dtype=np.int64) % p
+    residue = _powmod(num, (p - 1)//2, p) == 1
+    if p % 4 == 3:
+        r = _powmod(num, (p + 1)//4, p)
+    else:
+        q, s = p - 1, 0
+        while q % 2 == 0:
+            q, s = q//2, s + 1
+        z = 2
+        while pow(z, (p - 1)//2, p) == 1:
+            z += 1
+        t = _powmod(num, q, p)
+        r = _powmod(num, (q + 1)//2, p)
+        todo = np.nonzero(residue & (t != 1))[0]
+        m = np.full(len(todo), s, dtype=np.int64)
+        c = np.full(len(todo), pow(z, q, p), dtype=np.int64)
+        while len(todo):
+            t_, r_ = t[todo], r[todo]
+            i = np.zeros(len(todo), dtype=np.int64)
+            t2 = t_
+            for k in range(1, s):
+                t2 = t2*t2 % p
+                i[(i == 0) & (t2 == 1)] = k
+                if i.all():
+                    break
+            b = c
+            for k in range(int((m - i - 1).max())):
+                b = np.where(k < m - i - 1, b*b % p, b)
+            c = b*b % p
+            t[todo] = t_ = t_*c % p
+            r[todo] = r_*b % p
+            keep = t_ != 1
+            todo, m, c = todo[keep], i[keep], c[keep]
+    r = np.minimum(r, p - r)
+    return np.where(num == 0, 0, np.where(residue, r, -1))
+
+
+def sqrt_table(p):
+    """the square root r <= p/2 of every v in F_p, -1 for non-squares (p < 2**31)
+
+    every nonzero square has exactly two roots y and p - y, one of them below
+    p/2, so squaring those fills the table. Its sign is the Legendre symbol
+    """
+    half = np.arange((p + 1)//2, dtype=np.int64)
+    roots = np.full(p, -1, dtype=np.int64)
+    roots[half*half % p] = half
+    return roots
+
+
+def curve_points(p, a, b):
+    """all affine points of y^2 = x^3 + ax + b over F_p as (xs, ys) arrays"""
+    x = FieldArray(np.arange(p), p)
+    rhs = (x*x*x + a*x + b).num
+    r = sqrt_table(p)[rhs]
+
+    has_root = r >= 0
+    two_roots = r > 0
+    counts = has_root.astype(np.int64) + two_roots
+    starts = np.cumsum(counts) - counts
+
+    xs = np.repeat(np.arange(p), counts)
+    ys = np.empty(len(xs), dtype=np.int64)
+    ys[starts[has_root]] = r[has_root]
+    ys[starts[two_roots] + 1] = p - r[two_roots]
+    return xs, ys
+
+
+def on_curve(xs, ys, p, a, b):
+    """bool array, True where (xs[i], ys[i]) is on the curve"""
+    xs = np.asarray(xs)
+    ys = np.asarray(ys)
+    in_range = (xs >= 0) & (xs < p) & (ys >= 0) & (ys < p)
+    return in_range & PointBatch(xs, ys, a, b, p).on_curve()
+
+
+def multiples(x, y, p, a, b, n):
+    """[0*P, 1*P, ..., (n-1)*P] for P = (x, y) as a PointBatch"""
+    return PointBatch.repeat(x, y, a, b, p, n).multiply(np.arange(n))
@@ -0,0 +1,98 @@
+"""Addition (Cayley) tables for small curves
+
+The points of E(F_p) are numbered 0 for infinity and 1..N-1 in the order of
+curve_points. table[i, j] is the number of point i + point j, so once a
+curve's table is built every addition is a lookup. Rows are filled with
+PointBatch additions, a block of rows at a time.
+
+Tables are only built for groups of at most max_order points (a 2048 x 2048
+table of int16 is 8 MB).
+"""
+import math
+
+import numpy as np
+
+from elliptic.batch import PointBatch, curve_points
+
+
+max_order = 2048
+block_size = 2**20 # point additions per batch while building
+
+
+class CayleyTable:
+    """addition table of E(F_p) for y^2 = x^3 + ax + b"""
+
+    def __init__(self, p, a, b):
+        self.p, self.a, self.b = p, a, b
+        self.xs, self.ys = curve_points(p, a, b)
+        self.order = len(self.xs) + 1
+        dtype = np.int16 if self.order < 2**15 else np.int32
+
+        # sorted codes x*p + y to turn coordinates back into point numbers
+        codes = self.xs*p + self.ys
+        self._sort = np.argsort(codes)
+        self._codes = codes[self._sort]
+
+        n = self.order - 1
+        self.table = np.empty((self.order, self.order), dtype=dtype)
+        self.table[0, :] = np.arange(self.order)
+        self.table[:, 0] = np.arange(self.order)
+
+        rows = max(1, block_size//max(n, 1))
+        for start in range(0, n, rows):
+            i = np.arange(start, min(start + rows, n))
+            P = PointBatch(np.repeat(self.xs[i], n), np.repeat(self.ys[i], n), a, b, p)
+            Q = PointBatch(np.tile(self.xs, len(i)), np.tile(self.ys, len(i)), a, b, p)
+            R = P + Q
+            self.table[i[0] + 1:i[-1] + 2, 1:] = self._numbers(R).reshape(len(i), n)
+
+    def __repr__(self):
+        return 'CayleyTable(p={}, a={}, b={}: {} points)'.format(self.p, self.a, self.b, self.order)
+
+    def _numbers(self, batch):
+        """point numbers of a PointBatch"""
+        codes = batch.x.num.astype(np.int64)*self.p + batch.y.num.astype(np.int64)
+        found = np.searchsorted(self._codes, codes)
+        found = np.minimum(found, len(self._codes) - 1)
+        return np.where(batch.inf, 0, self._sort[found] + 1)
+
+    def number(self, x, y):
+        """point number of (x, y), 0 for infinity, None if not on the curve"""
+        if x is None:
+            return 0
+        code = x*self.p + y
+        found = np.searchsorted(self._codes, code)
+        if found == len(self._codes) or self._codes[found] != code:
+            return None
+        return int(self._sort[found]) + 1
+
+    def point(self, i):
+        """(x, y) of point number i, None for infinity"""
+        if i == 0:
+            return None
+        return int(self.xs[i - 1]), int(self.ys[i - 1])
+
+    def add(self, P, Q):
+        """P + Q for (x, y) tuples (None is infinity)"""
+        i = self.number(*(P or (None, None)))
+        j = self.number(*(Q or (None, None)))
+        if i is None or j is None:
+            raise ValueError('Points are not on the curve')
+        return self.point(int(self.table[i, j]))
+
+
+cayley_dict = {} # cache results
+
+def cayley_table(p, a, b):
+    """cached CayleyTable for the curve (p, a, b), None above max_order"""
+    try:
+        return cayley_dict[(p, a, b)] # elliptic.memory may clear the cache at any time
+    except KeyError:
+        pass
+    # Hasse: N >= p + 1 - 2 sqrt(p), so large p is rejected without counting
+    if p + 1 - 2*(math.isqrt(p) + 1) > max_order or len(curve_points(p, a, b)[0]) + 1 > max_order:
+        table = None
+    else:
+        table = CayleyTable(p, a, b)
+    cayley_dict[(p, a, b)] = table
+    return table
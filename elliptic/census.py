@@ -0,0 +1,190 @@
+"""Statistics of every curve y^2 = x^3 + ax + b over F_p
+
+For odd p the number of points is
+
+    #E = p + 1 + sum_x chi(x^3 + ax + b)
+
+with chi the Legendre symbol, so one table of chi over F_p replaces counting
+points on a p x p grid. For a fixed a the sum over x for every b at once is
+the correlation of chi with the histogram of x^3 + ax, computed with an FFT.
+The a values are spread over worker processes.
+
+For each nonsingular curve the table holds the order N, the trace
+t = p + 1 - N (|t| <= 2 sqrt(p) by Hasse), the largest prime factor of N,
+the cofactor N / that prime and whether the group is cyclic.
+
+    python -m elliptic.census 97 --processes 4 --out census-97.csv
+"""
+import argparse
+import csv
+import functools
+import multiprocessing
+import sys
+
+import numpy as np
+
+from elliptic import arith, batch
+from elliptic.batch import PointBatch
+from elliptic.group import factorize
+
+
+columns = ['p', 'a', 'b', 'order', 'trace', 'prime', 'cofactor', 'cyclic']
+
+
+sqrt_table = functools.lru_cache(maxsize=8)(batch.sqrt_table) # shared by the rows of a census
+
+
+@functools.lru_cache(maxsize=8)
+def legendre_table(p):
+    """chi(v) for v in F_p: 0 for v = 0, 1 for nonzero squares, -1 otherwise"""
+    return np.sign(sqrt_table(p))
+
+
+def cubic_histogram(p, a):
+    """number of x in F_p with x^3 + ax = v, for every v"""
+    x = np.arange(p, dtype=np.int64)
+    return np.bincount((x*x % p*x + a*x) % p, minlength=p)
+
+
+def character_sums(p, a):
+    """sum_x chi(x^3 + ax + b) for b = 0..p-1
+
+    sum_v hist[v] chi(v + b), a cyclic correlation of the histogram with chi
+    """
+    hist = cubic_histogram(p, a)
+    chi = legendre_table(p)
+    sums = np.fft.irfft(np.conj(np.fft.rfft(hist))*np.fft.rfft(chi), n=p)
+    return np.rint(sums).astype(np.int64)
+
+
+def curve_orders(p, a):
+    """#E(F_p) for y^2 = x^3 + ax + b, b = 0..p-1"""
+    return p + 1 + character_sums(p, a)
+
+
+def nonsingular(p, a):
+    """bool array over b, True where 4a^3 + 27b^2 != 0 mod p"""
+    b = np.arange(p, dtype=np.int64)
+    return (4*pow(a, 3, p) + 27*(b*b % p)) % p != 0
+
+
+@functools.lru_cache(maxsize=None)
+def _torsion_candidates(p, N):
+    """primes q with q^2 | N and q | p - 1, the only ways E(F_p) can fail to be cyclic
+
+    (E(F_p) = Z_n1 x Z_n2 with n2 | p - 1 and n2^2 | N)
+    """
+    return [q for q, e in factorize(N).items() if e >= 2 and (p - 1) % q == 0]
+
+
+def full_3_torsion(p, a, bs):
+    """bool array over bs, True where all 9 points of E[3] are in E(F_p)
+
+    points of order 3 have x a root of psi_3 = 3x^4 + 6ax^2 + 12bx - a^2,
+    so E[3] is rational when psi_3 has 4 roots, each with y in F_p (y != 0)
+    """
+    x = np.arange(p, dtype=np.int64)
+    bs = np.asarray(bs, dtype=np.int64)[:, None]
+    x2 = x*x % p
+    psi = (3*x2*x2 + 6*a*x2 - a*a + 12*(bs*x % p)) % p
+    rhs = ((x2*x + a*x) % p + bs) % p
+    rational = (psi == 0) & (legendre_table(p)[rhs] == 1)
+    return 2*rational.sum(axis=1) + 1 == 9
+
+
+def curve_points_many(p, a, bs):
+    """points of the curves (a, b) for every b in bs as (curve index, xs, ys)"""
+    x = np.arange(p, dtype=np.int64)
+    cubic = (x*x % p*x + a*x) % p
+    r = sqrt_table(p)[(cubic[None, :] + np.asarray(bs)[:, None]) % p]
+    curve, xs = np.nonzero(r >= 0)
+    ys = r[curve, xs]
+    twin = ys > 0 # p - y is the other root
+    return (np.concatenate([curve, curve[twin]]), np.concatenate([xs, xs[twin]]),
+            np.concatenate([ys, p - ys[twin]]))
+
+
+def full_torsion(p, a, bs, q):
+    """bool array over bs, True where all q^2 points of E[q] are in E(F_p)
+
+    the addition law does not involve b, so the points of all curves with
+    this a go through one PointBatch
+    """
+    curve, xs, ys = curve_points_many(p, a, bs)
+    killed = PointBatch(xs, ys, a, 0, p).multiply(q).inf
+    return np.bincount(curve[killed], minlength=len(bs)) + 1 == q*q
+
+
+def census_row(p, a):
+    """columns of every nonsingular curve with this a, as a dict of arrays"""
+    b = np.arange(p, dtype=np.int64)
+    orders = curve_orders(p, a)
+    keep = nonsingular(p, a)
+    b, orders = b[keep], orders[keep]
+
+    # x^3 + ax + b has 3 roots exactly when E[2] is in E(F_p)
+    roots = cubic_histogram(p, a)[(-b) % p]
+
+    largest, candidates = {}, {}
+    for N in np.unique(orders).tolist():
+        largest[N] = max(factorize(N)) if N > 1 else 1
+        for q in _torsion_candidates(p, N):
+            candidates.setdefault(q, []).append(N)
+
+    cyclic = np.ones(len(b), dtype=bool)
+    for q, Ns in candidates.items():
+        i = np.nonzero(np.isin(orders, Ns) & cyclic)[0]
+        if q == 2:
+            cyclic[i] = roots[i] != 3
+        elif q == 3:
+            cyclic[i] = ~full_3_torsion(p, a, b[i])
+        elif len(i) > 0:
+            cyclic[i] = ~full_torsion(p, a, b[i], q)
+
+    prime = np.array([largest[N] for N in orders.tolist()], dtype=np.int64)
+    return dict(p=np.full(len(b), p), a=np.full(len(b), a), b=b,
+                order=orders, trace=p + 1 - orders,
+                prime=prime, cofactor=orders//prime, cyclic=cyclic)
+
+
+def census(p, processes=None):
+    """census_row for every a, in order of a"""
+    if p < 5 or not arith.is_prime(p):
+        raise ValueError('census needs a prime p >= 5, got {}'.format(p))
+    if processes == 1:
+        return [census_row(p, a) for a in range(p)]
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(functools.partial(census_row, p), range(p), chunksize=max(1, p//64))
+
+
+def write_csv(rows, f):
+    writer = csv.writer(f)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerows(zip(*[row[column].tolist() for column in columns]))
+
+
+def summary(rows):
+    """totals over a census"""
+    orders = np.concatenate([row['order'] for row in rows])
+    cofactors = np.concatenate([row['cofactor'] for row in rows])
+    cyclic = np.concatenate([row['cyclic'] for row in rows])
+    return dict(curves=len(orders), prime_order=int((cofactors == 1).sum()),
+                cyclic=int(cyclic.sum()), min_order=int(orders.min()),
+                max_order=int(orders.max()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('p', type=int, help='prime')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes (default: all cpus)')
+    parser.add_argument('--out', help='csv file (default: stdout)')
+    args = parser.parse_args()
+
+    rows = census(args.p, args.processes)
+    if args.out:
+        with open(args.out, 'w', newline='') as f:
+            write_csv(rows, f)
+    else:
+        write_csv(rows, sys.stdout)
+    print(summary(rows), file=sys.stderr)
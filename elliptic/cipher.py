@@ -0,0 +1,166 @@
+"""Streaming encryption keyed by the shared secret
+
+The shared secret string (e.g. '**(12, 5)**') is stretched into an AES-256 key
+with HKDF-SHA256 once and cached. Payloads are encrypted in fixed-size chunks
+with AES-GCM so a multi-megabyte file never has to be held in memory:
+
+    MAGIC | nonce prefix (7 bytes)
+    then per chunk: last flag (1 byte) | length (4 bytes) | ciphertext + tag
+
+Each chunk's nonce is prefix | chunk counter | last flag, so reordered,
+dropped or truncated chunks fail authentication. All failures raise
+cryptography.fernet.InvalidToken, like the Fernet tokens used before.
+
+Files dropped on the dashboard arrive as one base64 string, so they are
+capped at max_upload bytes. They are encrypted into a download directory and
+served back by the routes added with register_routes. Those routes also
+accept raw streams of any size, in constant memory, with the secret in a
+header (never the URL, which ends up in access logs):
+
+    curl --data-binary @big.txt -H 'X-Shared-Secret: (12, 5)' \\
+        localhost:8050/secret-sharing/encrypt > big.txt.enc
+"""
+import base64
+import functools
+import os
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from elliptic.spool import Spool, read_chunks
+
+
+MAGIC = b'ELC1'
+PREFIX_SIZE = 7
+MAX_FRAME = 16*1024*1024 # refuse frames larger than this when decrypting
+max_upload = 8*1024*1024 # bytes of a file dropped on the dashboard
+SALT = b'elliptic secret sharing'
+
+downloads = Spool('.downloads', ttl=600) # encrypted/decrypted uploads
+
+
+def normalize_secret(secret):
+    """'**(12, 5)**' and '(12,5)' give the same key"""
+    return ''.join(str(secret).strip('*').split())
+
+
+@functools.lru_cache(maxsize=256)
+def get_aead(secret):
+    """AES-GCM cipher for a shared secret, key derived once and cached"""
+    key = HKDF(algorithm=hashes.SHA256(), length=32, salt=SALT,
+               info=b'elliptic stream v1').derive(normalize_secret(secret).encode())
+    return AESGCM(key)
+
+
+def _nonce(prefix, counter, last):
+    return prefix + counter.to_bytes(4, 'big') + bytes([last])
+
+
+def encrypt_chunks(secret, chunks):
+    """yield the encrypted stream for an iterable of plaintext byte chunks"""
+    aead = get_aead(secret)
+    prefix = os.urandom(PREFIX_SIZE)
+    yield MAGIC + prefix
+
+    chunks = iter(chunks)
+    current = next(chunks, b'')
+    counter = 0
+    last = False
+    while not last:
+        following = next(chunks, None)
+        last = following is None
+        ciphertext = aead.encrypt(_nonce(prefix, counter, last), bytes(current), None)
+        yield bytes([last]) + len(ciphertext).to_bytes(4, 'big') + ciphertext
+        current = following
+        counter += 1
+
+
+def decrypt_chunks(secret, chunks):
+    """yield plaintext from an iterable of encrypted byte chunks"""
+    aead = get_aead(secret)
+    chunks = iter(chunks)
+    buffer = bytearray()
+
+    def fill(n):
+        while len(buffer) < n:
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise InvalidToken('truncated stream')
+            buffer.extend(chunk)
+
+    header_size = len(MAGIC) + PREFIX_SIZE
+    fill(header_size)
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise InvalidToken('not an encrypted stream')
+    prefix = bytes(buffer[len(MAGIC):header_size])
+    del buffer[:header_size]
+
+    counter = 0
+    last = False
+    while not last:
+        fill(5)
+        last = buffer[0] == 1
+        size = int.from_bytes(buffer[1:5], 'big')
+        if size > MAX_FRAME:
+            raise InvalidToken('frame too large')
+        fill(5 + size)
+        try:
+            yield aead.decrypt(_nonce(prefix, counter, last), bytes(buffer[5:5 + size]), None)
+        except InvalidTag:
+            raise InvalidToken('authentication failed')
+        del buffer[:5 + size]
+        counter += 1
+
+    if len(buffer) > 0 or next(chunks, b'') != b'':
+        raise InvalidToken('trailing data')
+
+
+def encrypt_message(secret, message):
+    """encrypt a text message into an ascii token"""
+    stream = b''.join(encrypt_chunks(secret, [message.encode()]))
+    return base64.urlsafe_b64encode(stream).decode('ascii')
+
+
+def decrypt_message(secret, token):
+    """decrypt an ascii token from encrypt_message"""
+    try:
+        stream = base64.urlsafe_b64decode(token.encode('ascii'))
+    except (ValueError, UnicodeEncodeError):
+        raise InvalidToken('not a token')
+    return b''.join(decrypt_chunks(secret, [stream])).decode()
+
+
+def register_routes(server, url_base='/secret-sharing/'):
+    """add download and streaming encrypt/decrypt routes to the flask server"""
+    from flask import Response, abort, request, send_file
+
+    def download(token, name):
+        path = downloads.path(token)
+        if path is None:
+            abort(404)
+        return send_file(os.path.abspath(path), as_attachment=True, download_name=name,
+                         mimetype='application/octet-stream')
+
+    def stream(transform):
+        secret = request.headers.get('X-Shared-Secret')
+        if not secret:
+            abort(400, 'X-Shared-Secret header required')
+        chunks = transform(secret, read_chunks(request.stream))
+        try:
+            first = next(chunks) # fail before streaming if the header is bad
+        except InvalidToken as e:
+            abort(400, str(e))
+
+        def generate():
+            yield first
+            yield from chunks
+        return Response(generate(), mimetype='application/octet-stream')
+
+    server.add_url_rule(url_base + 'download/<token>/<name>', 'secret_sharing_download', download)
+    server.add_url_rule(url_base + 'encrypt', 'secret_sharing_encrypt',
+                        lambda: stream(encrypt_chunks), methods=['POST'])
+    server.add_url_rule(url_base + 'decrypt', 'secret_sharing_decrypt',
+                        lambda: stream(decrypt_chunks), methods=['POST'])
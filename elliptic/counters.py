@@ -0,0 +1,201 @@
+"""Per-request counts of elliptic curve operations
+
+Once install() has run, the arithmetic of elliptic.curve and of the numpy
+FieldArray/PointBatch types counts what it does into the counts of the
+current request:
+
+    field_add, field_mul, field_pow, field_inv  (arrays per element, and the
+                                                 slope formulas of Curve)
+    point_add, point_double, scalar_mul
+
+Requests are counted between start() and stop(), which init_app hooks into
+every dash callback request. Finished requests are logged and the most
+recent ones per callback are kept for the debug panel. Without install()
+the classes are untouched, so switching the counters off costs nothing.
+"""
+import collections
+import contextvars
+import functools
+import logging
+import threading
+
+import numpy as np
+
+
+_current = contextvars.ContextVar('op_counts', default=None)
+
+history = {} # callback name -> deque of recent counts
+history_size = 20
+_history_lock = threading.Lock()
+_installed = []
+
+
+def count(name, n=1):
+    """add n to the named operation of the current request, if counting"""
+    counts = _current.get()
+    if counts is not None:
+        counts[name] += n
+
+
+def start():
+    """begin counting for the current request"""
+    return _current.set(collections.Counter())
+
+
+def stop(token, callback_name=None):
+    """end counting, record and return the counts"""
+    counts = _current.get()
+    try:
+        _current.reset(token)
+    except ValueError: # token from another context
+        _current.set(None)
+    if counts is None:
+        return None
+    if callback_name is not None:
+        with _history_lock:
+            history.setdefault(callback_name, collections.deque(maxlen=history_size)).append(dict(counts))
+        logging.info('op counts {}: {}'.format(callback_name, dict(counts)))
+    return counts
+
+
+def _size(obj):
+    """number of elements an array operation works on"""
+    return obj.num.size if hasattr(obj.num, 'size') else 1
+
+
+def _counted(method, name, size=None, classify=None, field_ops=None):
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        counts = _current.get()
+        if counts is not None:
+            counts[classify(self, *args) if classify else name] += size(self) if size else 1
+            if field_ops is not None:
+                counts.update(field_ops(*args))
+        return method(self, *args)
+    wrapper.uncounted = method
+    return wrapper
+
+
+def _instrument(cls, methods):
+    for attr, kwargs in methods.items():
+        method = cls.__dict__[attr]
+        setattr(cls, attr, _counted(method, **kwargs))
+        _installed.append((cls, attr, method))
+
+
+def _point_kind(self, P, Q):
+    """doubling for P + P (both finite), addition otherwise"""
+    if P is not None and P == Q:
+        return 'point_double'
+    return 'point_add'
+
+
+# field operations of the formulas of Curve on int coordinates
+_chord_ops = dict(field_inv=1, field_mul=3, field_add=6) # Curve.add, P != Q
+_add_tangent_ops = dict(field_inv=1, field_mul=6, field_add=5) # Curve.add, P == Q
+_double_ops = dict(field_inv=1, field_mul=7, field_add=4) # Curve.double
+
+
+def _add_field_ops(P, Q):
+    """field operations of Curve.add(P, Q), none when the sum is trivial"""
+    if P is None or Q is None:
+        return {}
+    if P[0] != Q[0]:
+        return _chord_ops
+    if P[1] != Q[1] or P[1] == 0:
+        return {}
+    return _add_tangent_ops
+
+
+def _double_field_ops(P):
+    """field operations of Curve.double(P)"""
+    if P is None or P[1] == 0:
+        return {}
+    return _double_ops
+
+
+def install():
+    """wrap the field and point arithmetic with counters (idempotent)"""
+    if _installed:
+        return
+    from elliptic.curve import Curve
+    from elliptic.batch import FieldArray, PointBatch
+
+    # int coordinates: the field arithmetic is plain ints, counted per formula
+    _instrument(Curve, {
+        'add': dict(name='point_add', classify=_point_kind, field_ops=_add_field_ops),
+        'double': dict(name='point_double', field_ops=_double_field_ops),
+        'multiply': dict(name='scalar_mul'),
+        })
+
+    array_size = dict(size=_size)
+    _instrument(FieldArray, {
+        '__add__': dict(name='field_add', **array_size),
+        '__sub__': dict(name='field_add', **array_size),
+        '__rsub__': dict(name='field_add', **array_size),
+        '__mul__': dict(name='field_mul', **array_size),
+        '__pow__': dict(name='field_pow', **array_size),
+        'inverse': dict(name='field_inv', **array_size),
+        })
+    # __radd__/__rmul__ are aliases of the originals, point them at the wrappers
+    FieldArray.__radd__ = FieldArray.__add__
+    FieldArray.__rmul__ = FieldArray.__mul__
+
+    # batch doubling runs the unified addition formula, so it counts as point_add
+    _instrument(PointBatch, {
+        '__add__': dict(name='point_add', size=len),
+        'multiply': dict(name='scalar_mul', size=len),
+        })
+    _installed.append((FieldArray, '__radd__', FieldArray.__add__.uncounted))
+    _installed.append((FieldArray, '__rmul__', FieldArray.__mul__.uncounted))
+
+
+def uninstall():
+    """restore the original arithmetic"""
+    while _installed:
+        cls, attr, method = _installed.pop()
+        setattr(cls, attr, method)
+
+
+def clear():
+    """forget the recorded requests"""
+    with _history_lock:
+        history.clear()
+
+
+def summary():
+    """{callback: mean count per operation} over the recorded requests"""
+    with _history_lock:
+        recent = {name: list(deque) for name, deque in history.items()}
+    means = {}
+    for name, requests in recent.items():
+        ops = sorted(set().union(*requests))
+        means[name] = {op: float(np.mean([r.get(op, 0) for r in requests])) for op in ops}
+        means[name]['requests'] = len(requests)
+    return means
+
+
+def init_app(app, enabled=True, keep=20):
+    """install the counters and count every dash callback request"""
+    global history_size
+    if not enabled:
+        return
+    history_size = keep
+    install()
+
+    from flask import g, request
+    from elliptic.profiling import callback_name
+
+    server = app.server
+    update_path = app.config.requests_pathname_prefix + '_dash-update-component'
+
+    @server.before_request
+    def start_counting():
+        if request.path == update_path:
+            g.op_counts = start(), callback_name(app, request.get_json(silent=True) or {})
+
+    @server.teardown_request
+    def stop_counting(exc):
+        if 'op_counts' in g:
+            token, name = g.pop('op_counts')
+            stop(token, name)
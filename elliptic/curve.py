@@ -0,0 +1,250 @@
+"""Elliptic curve points with int coordinates
+
+A Curve holds p, a and b once, and its points keep only that curve and their
+x, y as ints (None for the point at infinity):
+
+    curve = get_curve(37, 0, 7) # y^2 = x^3 + 7 over F_37, shared by its points
+    G = curve.point(18, 17) # ValueError if (18, 17) is not on the curve
+    3*G, G + G, -G, G - G == curve.infinity
+    G.x, G.y, G.xy # 18, 17, (18, 17)
+
+Both classes use __slots__. Curve.add, Curve.double and Curve.multiply work
+on (x, y) tuples, so scalar multiplication and subgroup walks only build a
+Point for the result. Programming Bitcoin's ecc.Point keeps a FieldElement
+with its own prime for each coordinate and allocates new ones per operation.
+
+    python -m elliptic.curve # memory and time of a subgroup walk against ecc
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+from elliptic import arith
+
+
+class Curve:
+    """y^2 = x^3 + ax + b over F_p"""
+
+    __slots__ = ('p', 'a', 'b', 'infinity')
+
+    def __init__(self, p, a, b):
+        self.p = p
+        self.a = a % p
+        self.b = b % p
+        self.infinity = Point(self, None, None)
+
+    def __repr__(self):
+        return 'Curve(p={}, a={}, b={})'.format(self.p, self.a, self.b)
+
+    def __eq__(self, other):
+        return isinstance(other, Curve) and (self.p, self.a, self.b) == (other.p, other.a, other.b)
+
+    def __hash__(self):
+        return hash((self.p, self.a, self.b))
+
+    def contains(self, x, y):
+        return (y*y - x*x*x - self.a*x - self.b) % self.p == 0
+
+    def point(self, x, y):
+        """the point (x, y), ValueError unless it is on the curve"""
+        if not (0 <= x < self.p and 0 <= y < self.p) or not self.contains(x, y):
+            raise ValueError('({}, {}) is not on the curve'.format(x, y))
+        return Point(self, x, y)
+
+    # arithmetic of (x, y) tuples, None for infinity
+
+    def negate(self, P):
+        if P is None:
+            return None
+        return P[0], -P[1] % self.p
+
+    def double(self, P):
+        if P is None or P[1] == 0:
+            return None
+        p = self.p
+        x, y = P
+        s = (3*x*x + self.a)*arith.inverse(2*y, p) % p
+        x_ = (s*s - 2*x) % p
+        return x_, (s*(x - x_) - y) % p
+
+    def add(self, P, Q):
+        if P is None:
+            return Q
+        if Q is None:
+            return P
+        p = self.p
+        (x1, y1), (x2, y2) = P, Q
+        if x1 == x2:
+            if y1 != y2 or y1 == 0:
+                return None
+            s = (3*x1*x1 + self.a)*arith.inverse(2*y1, p) % p # P + P, as in double
+        else:
+            s = (y2 - y1)*arith.inverse(x2 - x1, p) % p
+        x_ = (s*s - x1 - x2) % p
+        return x_, (s*(x1 - x_) - y1) % p
+
+    def multiply(self, P, n):
+        """n*P by double-and-add"""
+        if n < 0:
+            P, n = self.negate(P), -n
+        result = None
+        while n:
+            if n & 1:
+                result = self.add(result, P)
+            n >>= 1
+            if n:
+                P = self.double(P)
+        return result
+
+    def walk(self, P):
+        """P, 2P, 3P, ... up to the last point before infinity"""
+        Q = P
+        while Q is not None:
+            yield Q
+            Q = self.add(Q, P)
+
+
+_curves = {} # (p, a, b) -> Curve
+
+
+def get_curve(p, a, b):
+    """the shared Curve of (p, a, b)"""
+    key = p, a % p, b % p
+    curve = _curves.get(key)
+    if curve is None:
+        curve = _curves[key] = Curve(*key)
+    return curve
+
+
+class Point:
+    """a point of a Curve, x and y are None at infinity"""
+
+    __slots__ = ('curve', 'x', 'y')
+
+    def __init__(self, curve, x, y):
+        self.curve = curve
+        self.x = x
+        self.y = y
+
+    @classmethod
+    def _of(cls, curve, xy):
+        if xy is None:
+            return curve.infinity
+        return cls(curve, *xy)
+
+    @property
+    def xy(self):
+        """(x, y), None at infinity"""
+        return None if self.x is None else (self.x, self.y)
+
+    def __repr__(self):
+        if self.x is None:
+            return 'Point(infinity)'
+        return 'Point({},{})_{}_{} mod {}'.format(self.x, self.y, self.curve.a, self.curve.b, self.curve.p)
+
+    def __eq__(self, other):
+        return (isinstance(other, Point) and self.curve == other.curve
+                and self.x == other.x and self.y == other.y)
+
+    def __hash__(self):
+        return hash((self.curve, self.x, self.y))
+
+    def _check(self, other):
+        if not isinstance(other, Point):
+            return NotImplemented
+        if self.curve != other.curve:
+            raise TypeError('points of different curves: {} and {}'.format(self.curve, other.curve))
+        return other
+
+    def __add__(self, other):
+        if self._check(other) is NotImplemented:
+            return NotImplemented
+        return self._of(self.curve, self.curve.add(self.xy, other.xy))
+
+    def __neg__(self):
+        return self._of(self.curve, self.curve.negate(self.xy))
+
+    def __sub__(self, other):
+        if self._check(other) is NotImplemented:
+            return NotImplemented
+        return self + -other
+
+    def __rmul__(self, n):
+        return self._of(self.curve, self.curve.multiply(self.xy, n))
+
+    __mul__ = __rmul__
+
+    def multiples(self):
+        """the points P, 2P, ... of the subgroup of P, without infinity"""
+        return [self._of(self.curve, xy) for xy in self.curve.walk(self.xy)]
+
+
+# benchmark against programmingbitcoin's ecc
+
+def _ecc():
+    """ecc.FieldElement and ecc.Point where the dashboard finds them, None if missing"""
+    for path in ['../programmingbitcoin/code-ch03/', '/home/programmingbitcoin/code-ch03']:
+        if path not in sys.path:
+            sys.path.append(path)
+    try:
+        from ecc import FieldElement, Point as EccPoint
+    except ImportError:
+        return None
+    return FieldElement, EccPoint
+
+
+def _walk_ecc(x, y, p, a, b):
+    FieldElement, EccPoint = _ecc()
+    P = EccPoint(FieldElement(x, p), FieldElement(y, p), FieldElement(a, p), FieldElement(b, p))
+    points, Q = [], P
+    while Q.x is not None:
+        points.append(Q)
+        Q = Q + P
+    return points
+
+
+def _walk(x, y, p, a, b):
+    return get_curve(p, a, b).point(x, y).multiples()
+
+
+def _measure(walk, *args):
+    """seconds, peak bytes and bytes, blocks kept by the points of one walk"""
+    start = time.perf_counter()
+    walk(*args)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    points = walk(*args)
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = snapshot.statistics('filename')
+    kept = sum(stat.size for stat in stats), sum(stat.count for stat in stats)
+    return dict(points=len(points), seconds=seconds, peak=peak, bytes=kept[0], blocks=kept[1])
+
+
+if __name__ == '__main__':
+    from elliptic.group import group_structure
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('p', type=int, nargs='?', default=10007)
+    parser.add_argument('-a', type=int, default=0)
+    parser.add_argument('-b', type=int, default=7)
+    args = parser.parse_args()
+
+    p, a, b = args.p, args.a % args.p, args.b % args.p
+    group = group_structure(p, a, b)
+    x, y = group.generators()[0]
+    print('walk of ({}, {}) on y^2 = x^3 + {}x + {} mod {}, order {}'.format(x, y, a, b, p, group.n1))
+
+    walks = dict(curve=_walk)
+    if _ecc() is not None:
+        walks['ecc'] = _walk_ecc
+    print('{:<6}{:>8}{:>10}{:>12}{:>14}{:>12}'.format(
+        'types', 'points', 'ms', 'peak KiB', 'bytes/point', 'blocks/pt'))
+    for name, walk in walks.items():
+        r = _measure(walk, x, y, p, a, b)
+        print('{:<6}{:>8}{:>10.1f}{:>12.1f}{:>14.1f}{:>12.2f}'.format(
+            name, r['points'], 1e3*r['seconds'], r['peak']/1024,
+            r['bytes']/r['points'], r['blocks']/r['points']))
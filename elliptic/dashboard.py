@@ -3,17 +3,15 @@ import numpy as np
 
 from dash.exceptions import PreventUpdate
 import dash
-import sys
+import os
+import time
 import logging
 
-from cryptography.fernet import Fernet, InvalidToken
-import base64
-import json
-from omegaconf import OmegaConf
+from cryptography.fernet import InvalidToken
+from urllib.parse import quote
 import dash_bootstrap_components as dbc
 import dash.html as html
 
-from cryptography.hazmat.primitives import hashes
 
 
 logging.basicConfig(filename='elliptic.log',
@@ -22,13 +20,25 @@ logging.basicConfig(filename='elliptic.log',
                     datefmt='%H:%M:%S',
                     level=logging.DEBUG)
 
-sys.path.append('../programmingbitcoin/code-ch03/')
-
-sys.path.append('/home/programmingbitcoin/code-ch03')
-
-from ecc import Point, FieldElement
 from dash import dcc
 
+from elliptic.problem_bank import ProblemBank, normalize
+from elliptic.sessions import session_store
+from elliptic.curve import get_curve
+from elliptic.batch import PointBatch, curve_points, on_curve, multiples
+from elliptic.raster import get_viewport, rasterize
+from elliptic.group import curve_order, group_structure
+from elliptic.cayley import cayley_table
+from elliptic import counters
+from elliptic import tabs
+from elliptic import patterns
+from elliptic import cipher
+from elliptic.spool import b64_chunks
+from elliptic.digest import ECDSA_Z_SIZE, digest, to_z, uploads, upload_parts, upload_digest
+from elliptic import secp256k1
+from elliptic import arith
+from elliptic.arith import is_prime
+
 def get_primes(n):
     from itertools import count, islice
     primes = (n for n in count(2) if all(n % d for d in range(2, n)))
@@ -41,9 +51,11 @@ def update_p_slider_label(p_i):
     return str(primes_[p_i])
 
 def elliptic(p, a, b):
-    x = y = np.arange(p)
-    xx, yy = np.meshgrid(x,y)
-    return (((yy**2)%p - ((xx**3)%p+(a*xx)%p+b)%p) == 0)*1.0
+    """p x p grid with 1.0 at (y, x) for every point on the curve"""
+    curve = np.zeros((p, p))
+    xs, ys = curve_points(p, a, b)
+    curve[ys, xs] = 1.0
+    return curve
 
 def sign_str(a, unity=True):
     if a > 0:
@@ -112,18 +124,6 @@ def get_pnt_annotation(x, y, text):
 def point_str(x, y):
     return "({},{})".format(x,y)
 
-def is_prime(n):
-    prime_flag = 0
-      
-    if(n > 1):
-        for i in range(2, int(np.sqrt(n)) + 1):
-            if (n % i == 0):
-                prime_flag = 1
-                break
-        if (prime_flag == 0):
-            return True
-    return False
-
 def show_hide_pub(mode):
     # show the pub key
     if mode == 1:
@@ -148,6 +148,7 @@ def show_hide_message(mode):
 
 def multiply_graph(p_i, a, b, n, points, *args):
     """multiply points by n"""
+    points = session_store.curves(points, str((primes_[p_i],a,b)))
     if n is None:
         raise PreventUpdate
 
@@ -158,9 +159,9 @@ def multiply_graph(p_i, a, b, n, points, *args):
     else:
         sharing_mode = None # multiply tab
 
-    if 'multiply' not in ctx.outputs_list['id']:
+    if 'multiply' not in str(ctx.outputs_list):
         active_tab = 'secret-sharing'
-    if 'multiply' in ctx.outputs_list['id']:
+    if 'multiply' in str(ctx.outputs_list):
         active_tab = 'point-multiplication'
 
 
@@ -194,10 +195,8 @@ def multiply_graph(p_i, a, b, n, points, *args):
         elif sharing_mode == 3:
             pass
 
-    order_ = order(p, a, b)
-
     if active_tab == 'point-multiplication':
-        title_str += f"\quad N:{order_}"
+        title_str += f"\quad N:{order(p, a, b)}"
 
     if points is not None:
         curve_key = str((p,a,b))
@@ -239,11 +238,9 @@ def multiply_graph(p_i, a, b, n, points, *args):
                 else:
                     title_str += ' = {}'.format(str((x_n, y_n)))
 
-            if len(pts) > 0:
+            if len(pts) > 0 and active_tab == 'point-multiplication':
                 subgroup_order_ = subgroup_order(point_in_curve(x_0, y_0, p, a, b))
-
-                if active_tab == 'point-multiplication':
-                    title_str += "\quad N_{" + point_str(x_0, y_0) + "}" + f":{subgroup_order_}"
+                title_str += "\quad N_{" + point_str(x_0, y_0) + "}" + f":{subgroup_order_}"
 
             for p_ in pts:
                 x_, y_ = p_
@@ -265,6 +262,7 @@ def multiply_graph(p_i, a, b, n, points, *args):
 
 def schnorr_graph_sign(p_i, a, b, n, points, k):
     """multiply points by n"""
+    points = session_store.curves(points, str((primes_[p_i],a,b)))
     if n is None:
         raise PreventUpdate
 
@@ -360,30 +358,12 @@ def schnorr_graph_sign(p_i, a, b, n, points, k):
 
     return fig
 
-def extended_gcd(aa, bb):
-    # from https://rosettacode.org/wiki/Modular_inverse#Python
-    lastremainder, remainder = abs(aa), abs(bb)
-    x, lastx, y, lasty = 0, 1, 1, 0
-    while remainder:
-        lastremainder, (quotient, remainder) = remainder, divmod(lastremainder, remainder)
-        x, lastx = lastx - quotient*x, x
-        y, lasty = lasty - quotient*y, y
-    return lastremainder, lastx * (-1 if aa < 0 else 1), lasty * (-1 if bb < 0 else 1)
-
 def modinv(a, m):
-    # from https://rosettacode.org/wiki/Modular_inverse#Python
     if not is_prime(m):
         raise ValueError('{} is not prime!'.format(m))
-    g, x, y = extended_gcd(a, m)
-    if g%m != 1:
-        raise ValueError(f'{g%m} != 1')
-    return x % m
-
-G_ = Point(x=FieldElement(18, 37),
-           y=FieldElement(17, 37),
-           a=FieldElement(0, 37),
-           b=FieldElement(7, 37)
-          )
+    return arith.inverse(a, m)
+
+G_ = get_curve(37, 0, 7).point(18, 17)
 G_
 
 n_ = 13
@@ -393,6 +373,7 @@ for k in [-3%n_, 3, 5, 7, 15]: # 0^-1 does not exist
 
 def multiply_inverse_clock(p_i, a, b, n, points, mode, *args):
     """render points around a clock"""
+    points = session_store.curves(points, str((primes_[p_i], a, b, mode)))
 
     empty_graph = go.Figure(
         data=[go.Scatterpolar(
@@ -479,16 +460,8 @@ def multiply_inverse_clock(p_i, a, b, n, points, mode, *args):
                 G_0 = point_in_curve(x_0, y_0, p, a, b)
                 subgroup_order_ = subgroup_order(G_0)
                 rotate = int(subgroup_order_/4)
-                theta_ = []
-                for i in range(subgroup_order_):
-                    x_ = []
-                    y_ = []
-
-                    P_i = i*G_0
-                    if P_i.x is not None:
-                        x_.append(P_i.x.num)
-                        y_.append(P_i.y.num)
-                        theta_.append(str((P_i.x.num, P_i.y.num)))
+                theta_ = [str(P_i) for P_i in multiples(x_0, y_0, p, a, b, subgroup_order_).to_list()
+                          if P_i is not None]
 
                 theta_.append('$\infty$')
 
@@ -534,6 +507,7 @@ def multiply_inverse_clock(p_i, a, b, n, points, mode, *args):
 
 def multiply_inverse_graph(p_i, a, b, n, points, mode, show_subgroup):
     """multiply points by n"""
+    points = session_store.curves(points, str((primes_[p_i], a, b, mode)))
     if n is None:
         raise PreventUpdate
 
@@ -619,13 +593,9 @@ def multiply_inverse_graph(p_i, a, b, n, points, mode, show_subgroup):
                     rhs_str = ' = \\textrm{DIV0}'
 
                 if show_subgroup:
-                    x_ = []
-                    y_ = []
-                    for i in range(subgroup_order_):
-                        P_i = i*G_0
-                        if P_i.x is not None:
-                            x_.append(P_i.x.num)
-                            y_.append(P_i.y.num)
+                    subgroup_ = multiples(x_0, y_0, p, a, b, subgroup_order_)
+                    x_ = subgroup_.x.num[~subgroup_.inf].tolist()
+                    y_ = subgroup_.y.num[~subgroup_.inf].tolist()
                     subgroup = go.Scatter(x=x_, y=y_,
                         text = [],
                         marker_symbol='square',
@@ -688,27 +658,143 @@ def multiply_inverse_graph(p_i, a, b, n, points, mode, show_subgroup):
 
     return fig, error_msg
 
-def priv_in_bounds(p_i, a, b, clickData, current_priv):
-    """set bounds of the private key"""
+
+heatmap_dict = {} # cache results
+
+def curve_heatmap(p, a, b):
+    """heatmap trace of the curve, without hover text (shared by animations)"""
+    heatmap = heatmap_dict.get((p, a, b)) # read once, elliptic.memory may clear the cache
+    if heatmap is None:
+        heatmap = heatmap_dict[(p, a, b)] = go.Heatmap(z=elliptic(p, a, b).astype(np.uint8),
+                                                       showscale=False,
+                                                       colorscale='gray',
+                                                       hoverinfo='skip')
+    return heatmap
+
+max_animation_frames = 1024
+
+def ladder_scalars(n):
+    """scalars of the double-and-add steps for n, with the step names
+
+    bits of n from the top: double, then add when the bit is set
+    """
+    k, scalars, steps = 0, [0], ['start']
+    for bit in bin(n)[2:]:
+        if k > 0:
+            k *= 2
+            scalars.append(k)
+            steps.append('double')
+        if bit == '1':
+            k += 1
+            scalars.append(k)
+            steps.append('add')
+    return scalars, steps
+
+def multiply_animation(p_i, a, b, n, points, mode, kind):
+    """n*G_0 as plotly frames, played and scrubbed in the browser
+
+    multiples: G_0, 2G_0, ... around the whole subgroup (n only picks the start)
+    ladder: the double-and-add steps for n
+    """
+    if n is None:
+        raise PreventUpdate
+    if kind == 'multiples' and get_triggered() == 'user-input-n':
+        raise PreventUpdate # frames do not depend on n
+
     p = primes_[p_i]
-    max_val = order(p, a, b)
+    pts = stored_points(points, str((p, a, b, mode)))
+    if len(pts) == 0:
+        raise PreventUpdate
+    x_0, y_0 = pts[0]
+    subgroup_order_ = subgroup_order(point_in_curve(x_0, y_0, p, a, b))
 
-    logging.debug('max val: {}'.format(max_val))
+    if kind == 'ladder':
+        scalars, steps = ladder_scalars(n)
+        labels = ['{} {}'.format(step, k) for step, k in zip(steps, scalars)]
+        active = len(scalars) - 1
+        trail_length = len(scalars)
+    else:
+        scalars = list(range(min(subgroup_order_, max_animation_frames)))
+        labels = [str(k) for k in scalars]
+        active = n % subgroup_order_ if n % subgroup_order_ < len(scalars) else 0
+        trail_length = 4 # keeps the frames small for large subgroups
+
+    walk = PointBatch.repeat(x_0, y_0, a, b, p, len(scalars)).multiply(np.array(scalars, dtype=object))
+    walk = walk.to_list()
+
+    size = get_p_size(p_i)
+    def walk_traces(i):
+        trail = [pt for pt in walk[max(0, i - trail_length):i + 1] if pt is not None]
+        current = [walk[i]] if walk[i] is not None else []
+        return [go.Scatter(x=[_[0] for _ in trail], y=[_[1] for _ in trail],
+                           mode='lines+markers', line=dict(width=1, color='orange'),
+                           marker=dict(size=size/2), hoverinfo='skip', showlegend=False),
+                go.Scatter(x=[_[0] for _ in current], y=[_[1] for _ in current],
+                           mode='markers', marker_symbol='square',
+                           marker=dict(size=size, color='orange'),
+                           hoverinfo='skip', showlegend=False)]
+
+    base_point = go.Scatter(x=[x_0], y=[y_0], mode='markers', marker_symbol='square',
+                            marker=dict(size=size), hoverinfo='skip', showlegend=False)
+    frames = [go.Frame(name=str(i), data=walk_traces(i), traces=[2, 3]) for i in range(len(scalars))]
+
+    play = dict(frame=dict(duration=300, redraw=False), transition=dict(duration=0),
+                fromcurrent=True, mode='immediate')
+    pause = dict(frame=dict(duration=0, redraw=False), mode='immediate')
+    fig = go.Figure(
+        data=[curve_heatmap(p, a, b), base_point] + walk_traces(active),
+        frames=frames,
+        layout=dict(
+            paper_bgcolor="rgba(0,0,0,0)",
+            plot_bgcolor="rgba(0,0,0,0)",
+            xaxis=dict(visible=False, range=[0, p-1]),
+            yaxis=dict(visible=False, range=[0, p-1]),
+            width=500, height=600,
+            title=dict(font=dict(color='white'),
+                       text="$ k \\cdot {} \\quad N_G:{} $".format(point_str(x_0, y_0), subgroup_order_)),
+            updatemenus=[dict(type='buttons', direction='left', x=0, y=-0.05, showactive=False,
+                              buttons=[dict(label='Play', method='animate', args=[None, play]),
+                                       dict(label='Pause', method='animate', args=[[None], pause])])],
+            sliders=[dict(active=active, x=0.2, len=0.8, y=-0.02,
+                          currentvalue=dict(prefix='k = ', font=dict(color='white')),
+                          steps=[dict(label=label, method='animate', args=[[str(i)], pause])
+                                 for i, label in enumerate(labels)])],
+            ))
+    return fig
 
-    if clickData is not None:
-        # replace the first point
-        p_0 = clickData['points'][0]
-        x_0, y_0 = p_0['x'], p_0['y']
+def priv_in_bounds(context, current_priv):
+    """set bounds of the private key from a key_context"""
+    if context is None:
+        raise PreventUpdate
+    max_val = context['order']
+
+    logging.debug('max val: {}'.format(max_val))
 
-        G_0 = point_in_curve(x_0, y_0, p, a, b)
-        max_val = subgroup_order(G_0) - 1
+    if context['generator'] is not None:
+        if not context['on_curve']:
+            raise PreventUpdate
+        max_val = context['subgroup_order'] - 1
     logging.debug('max val of priv key: {}'.format(max_val))
     current_priv = min(current_priv, max_val)
     return max_val, current_priv
 
 
+def add_points(P, Q, p, a, b):
+    """P + Q for (x, y) tuples, None for infinity
+
+    small curves use a precomputed addition table
+    """
+    table = cayley_table(p, a, b)
+    if table is not None:
+        return table.add(P, Q)
+    R = point_in_curve(*P, p, a, b) + point_in_curve(*Q, p, a, b)
+    if R.x is None:
+        return None
+    return R.xy
+
 def add_graph(p_i, a, b, points):
     """add points on click"""
+    points = session_store.curves(points, str((primes_[p_i],a,b)))
     p = primes_[p_i]
 
     curve = elliptic(p, a, b)
@@ -752,13 +838,11 @@ def add_graph(p_i, a, b, points):
             title_str +=  "\qquad" + '+'.join([str(tuple(p_)) for p_ in pts])
 
             if len(pts) == 2:
-                P = point_in_curve(pts[0][0], pts[0][1], p, a, b)
-                Q = point_in_curve(pts[1][0], pts[1][1], p, a, b)
-                R = P+Q
-                if R.x is not None:
-                    R_str = str((R.x.num, R.y.num))
+                R = add_points(tuple(pts[0]), tuple(pts[1]), p, a, b)
+                if R is not None:
+                    R_str = str(R)
                     title_str += ' = {}'.format(R_str)
-                    R_trace = go.Scatter(x = [R.x.num], y = [R.y.num],
+                    R_trace = go.Scatter(x = [R[0]], y = [R[1]],
                         text = [R_str],
                         marker_symbol = 'square',
                         marker=dict(size=get_p_size(p_i)),
@@ -781,6 +865,100 @@ def add_graph(p_i, a, b, points):
                     text="$ {} $".format(title_str))))
     return fig
 
+def details_open(summary_clicks):
+    """whether an html.Details is open, from the clicks on its html.Summary (closed at first)"""
+    return bool(summary_clicks) and summary_clicks % 2 == 1
+
+def cayley_graph(p_i, a, b, summary_clicks):
+    """heatmap of the addition table, colored by the number of P + Q
+
+    nothing is rendered while the panel is closed, opening it renders the current curve
+    """
+    if not details_open(summary_clicks):
+        raise PreventUpdate
+    p = primes_[p_i]
+    table = cayley_table(p, a, b)
+    if table is None:
+        raise PreventUpdate
+
+    labels = ['O'] + [str(pt) for pt in zip(table.xs.tolist(), table.ys.tolist())]
+    if table.order <= 256:
+        customdata = np.array(labels, dtype=object)[table.table]
+        hovertemplate = '%{y} + %{x} = %{customdata}<extra></extra>'
+    else: # spell out only the operands, the sums would dominate the payload
+        customdata = None
+        hovertemplate = '%{y} + %{x} = point #%{z}<extra></extra>'
+
+    fig = go.Figure(
+            data=go.Heatmap(z=table.table,
+                showscale=False,
+                colorscale='viridis',
+                customdata=customdata,
+                hovertemplate=hovertemplate,
+                x=labels,
+                y=labels,
+                ),
+            layout=dict(paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+                xaxis=dict(visible=False),
+                yaxis=dict(visible=False, autorange='reversed'),
+                width=700, height=700,
+                title=dict(font=dict(color='white'),
+                    text="$ {} \\quad N:{} $".format(get_eqn_str(p, a, b), table.order)))
+            )
+    return fig
+
+def stored_points(store, curve_key):
+    """points kept in the session store for this curve (empty if none)"""
+    curves = session_store.curves(store, curve_key)
+    if curves is None or curve_key not in curves:
+        return []
+    return [tuple(v) for v in curves[curve_key]]
+
+raster_max_p = 10**7 # largest prime of the raster view
+raster_order_max_p = 2**20 # above this the title leaves out N, counted over all of F_p
+
+def raster_graph(p, a, b, relayout_data, summary_clicks):
+    """density image of a large curve, re-rendered for the zoomed viewport
+
+    nothing is rendered while the panel is closed, opening it renders the current curve
+    """
+    if None in (p, a, b) or not details_open(summary_clicks):
+        raise PreventUpdate
+
+    p = int(p)
+    if p < 5 or p > raster_max_p or not is_prime(p):
+        raise PreventUpdate
+
+    if 'raster-graph' not in get_triggered():
+        relayout_data = None # new curve, show the whole field
+
+    viewport = get_viewport(relayout_data, p)
+    z, x0, dx, y0, dy, exact = rasterize(p, a, b, viewport)
+
+    title_str = get_eqn_str(p, a, b)
+    if p <= raster_order_max_p:
+        title_str += f"\\quad N:{curve_order(p, a % p, b % p)}"
+    if not exact:
+        title_str += "\\quad \\textrm{(sampled)}"
+
+    fig = go.Figure(
+            data=go.Heatmap(z=z, x0=x0, dx=dx, y0=y0, dy=dy,
+                showscale=False,
+                colorscale='gray',
+                hoverinfo='x+y+z',
+                ),
+            layout=dict(paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(0,0,0,0)",
+                width=700, height=700,
+                uirevision=str((p, a, b)),
+                xaxis=dict(range=viewport[:2], showgrid=False, color='white'),
+                yaxis=dict(range=viewport[2:], showgrid=False, color='white'),
+                title=dict(font=dict(color='white'),
+                    text="$ {} $".format(title_str)))
+            )
+    return fig
+
 def update_multiply_inverse_points(p_i, a, b, n, clickData, mode, store):
     if n is None:
         raise PreventUpdate
@@ -791,14 +969,7 @@ def update_multiply_inverse_points(p_i, a, b, n, clickData, mode, store):
 
     curve_key = str((p, a, b, mode))
     
-    if store is not None:
-        if curve_key in store:
-            points = [tuple(v) for v in store[curve_key]]
-        else:
-            points = []
-    else:
-        points = []
-        store = {curve_key: points}
+    points = stored_points(store, curve_key)
 
 
     if clickData is not None:
@@ -824,53 +995,39 @@ def update_multiply_inverse_points(p_i, a, b, n, clickData, mode, store):
                 if n != 0:
                     p_n = modinv(n%subgroup_order_, subgroup_order_)*G_0
                 else:
-                    p_n = Point(None, None, None, None)
+                    p_n = G_0.curve.infinity
         if 1 in mode:
             logging.debug('no inverse, mode = {}'.format(mode))
             p_n = n*p_n
         if p_n.x is not None:
-            points.append((p_n.x.num, p_n.y.num))
+            points.append((p_n.x, p_n.y))
         else:
             points.append((-1, -1))
         
-    store[curve_key] = points
-    return store
+    return session_store.update(store, curve_key, points)
 
-def update_multiply_points(p_i, a, b, n, clickData, store):
-    if n is None:
+def update_multiply_points(n, context, store):
+    """the generator of a key_context and n times it, looked up in generator_multiples"""
+    if n is None or context is None:
         raise PreventUpdate
 
-    p = primes_[p_i]
+    p, a, b = context['curve']
 
     curve_key = str((p, a, b))
 
-    if store is not None:
-        if curve_key in store:
-            points = [tuple(v) for v in store[curve_key]]
-        else:
-            points = []
-    else:
-        points = []
-        store = {curve_key: points}
+    points = stored_points(store, curve_key)
 
-    if clickData is not None:
+    if context['generator'] is not None:
         # replace the first point
-        p_0 = clickData['points'][0]
-        x_0, y_0 = p_0['x'], p_0['y']
-        try:
-            G_0 = point_in_curve(x_0, y_0, p, a, b)
-            points = [(x_0, y_0)]
-        except ValueError:
+        if not context['on_curve']:
             raise PreventUpdate
+        x_0, y_0 = context['generator']
+        multiples_ = generator_multiples(p, a, b, x_0, y_0, context['subgroup_order'])
+        k = n % len(multiples_)
+        nG = (-1, -1) if multiples_.inf[k] else (int(multiples_.x.num[k]), int(multiples_.y.num[k]))
+        points = [(x_0, y_0), nG]
 
-        p_n = n*G_0
-        if p_n.x is not None:
-            points.append((p_n.x.num, p_n.y.num))
-        else:
-            points.append((-1, -1))
-        
-    store[curve_key] = points
-    return store
+    return session_store.update(store, curve_key, points)
 
 def update_schnorr_points(p_i, a, b, n, k, clickData, store):
     if n is None:
@@ -883,14 +1040,7 @@ def update_schnorr_points(p_i, a, b, n, k, clickData, store):
 
     curve_key = str((p, a, b))
 
-    if store is not None:
-        if curve_key in store:
-            points = [tuple(v) for v in store[curve_key]]
-        else:
-            points = []
-    else:
-        points = []
-        store = {curve_key: points}
+    points = stored_points(store, curve_key)
 
     if clickData is not None:
         # replace the first point
@@ -904,18 +1054,17 @@ def update_schnorr_points(p_i, a, b, n, k, clickData, store):
 
         p_n = n*G_0
         if p_n.x is not None:
-            points.append((p_n.x.num, p_n.y.num))
+            points.append((p_n.x, p_n.y))
         else:
             points.append((-1, -1))
 
         p_k = k*G_0
         if p_k.x is not None:
-            points.append((p_k.x.num, p_k.y.num))
+            points.append((p_k.x, p_k.y))
         else:
             points.append((-1, -1))
         
-    store[curve_key] = points
-    return store
+    return session_store.update(store, curve_key, points)
 
 def update_add_points(p_i, a, b, clickData, store):
     p = primes_[p_i]
@@ -923,34 +1072,21 @@ def update_add_points(p_i, a, b, clickData, store):
 
     curve_key = str((p,a,b))
 
-    if store is not None:
-        if curve_key in store:
-            points = [tuple(v) for v in store[curve_key]]
-        else:
-            points = []
-    else:
-        points = []
-        store = {curve_key: points}
+    points = stored_points(store, curve_key)
     
     if clickData is not None:
         new_points = [(p_['x'], p_['y']) for p_ in clickData['points']]
-        for p_ in new_points:
-            if p_ not in points:
-                try:
-                    point_in_curve(p_[0], p_[1], p, a, b)
-                    points.append(p_)
-                except ValueError:
-                    raise PreventUpdate
-            else:
-                # add point to itself
-                point_in_curve(p_[0], p_[1], p, a, b)
-                points.append(p_)
+        if len(new_points) > 0:
+            xs, ys = zip(*new_points)
+            if not on_curve(xs, ys, p, a, b).all():
+                raise PreventUpdate
+        # a point already in the list is added to itself
+        points.extend(new_points)
                 
-    store[curve_key] = points[-2:] # keep the last two points
-
-    return store
+    return session_store.update(store, curve_key, points[-2:]) # keep the last two points
 
 def render_pub_key(p_i, a, b, points):
+    points = session_store.curves(points, str((primes_[p_i],a,b)))
     p = primes_[p_i]
     points_str = ''
     if points is not None:
@@ -962,7 +1098,121 @@ def render_pub_key(p_i, a, b, points):
     return points_str
 
 
+# the keys of the signature and secret-sharing tabs, by the index of their
+# components: key-context and key-points (stores), key-graph, key-text and the
+# key-scalar (private key or nonce) multiplying the clicked generator
+key_scalars = {
+    'sign-pub': 'sign-priv',
+    'sign-secret': 'sign-k',
+    'alice-pub': 'alice-priv',
+    'alice-secret': 'alice-priv',
+    'bob-pub': 'bob-priv',
+    'bob-secret': 'bob-priv',
+    }
+
+# the graph whose generator bounds each scalar
+scalar_graphs = {'sign-priv': 'sign-pub', 'sign-k': 'sign-secret',
+                 'alice-priv': 'alice-pub', 'bob-priv': 'bob-pub'}
+
+# the sharing-mode a secret-sharing graph is shown in, which sets its title
+key_sharing_modes = {'alice-pub': 1, 'alice-secret': 2, 'bob-pub': 1, 'bob-secret': 2}
+
+multiples_dict = {} # cache results
+
+def generator_multiples(p, a, b, x, y, n):
+    """0*G, 1*G, ..., (n-1)*G for G = (x, y) of order n as a PointBatch
+
+    kept here rather than in the key-context stores, so the browser never
+    holds (or posts back) a whole subgroup
+    """
+    multiples_ = multiples_dict.get((p, a, b, x, y)) # read once, elliptic.memory may clear the cache
+    if multiples_ is None:
+        multiples_ = multiples_dict[(p, a, b, x, y)] = multiples(x, y, p, a, b, n)
+    return multiples_
+
+def key_context(p, a, b, clickData):
+    """everything the key callbacks need to know about a clicked generator
+
+    the curve order, the generator, whether it is on the curve and its
+    subgroup order. Its multiples stay on the server, see generator_multiples
+    """
+    context = dict(curve=[p, a, b], order=group_structure(p, a, b).order,
+                   generator=None, on_curve=False, subgroup_order=None)
+    if clickData is None:
+        return context
+    p_0 = clickData['points'][0]
+    x_0, y_0 = p_0['x'], p_0['y']
+    context['generator'] = [x_0, y_0]
+    subgroup_order_ = group_structure(p, a, b).point_order(x_0, y_0)
+    if subgroup_order_ is None:
+        return context
+    context.update(on_curve=True, subgroup_order=subgroup_order_)
+    return context
+
+def changed_keys():
+    """indices of the keys whose components fired the callback, None for all"""
+    triggered = patterns.triggered_indices()
+    if triggered is None:
+        return None
+    keys = set()
+    for kind in ['key-graph', 'key-points', 'key-context']:
+        keys.update(triggered.get(kind, ()))
+    for scalar in triggered.get('key-scalar', ()):
+        keys.update(key for key, scalar_ in key_scalars.items() if scalar_ == scalar)
+    return keys
+
+def key_contexts(p_i, a, b, clicks):
+    """key_context for every key whose generator or curve changed
+
+    the only key callback doing curve math, the others read its output
+    """
+    ctx = dash.callback_context
+    clicks = patterns.by_index(clicks, ctx.inputs_list[3])
+    p = primes_[p_i]
+    return patterns.map_indices(ctx.outputs_list, changed_keys(),
+        lambda key: key_context(p, a, b, clicks.get(key)))
+
+def update_key_points(scalars, contexts, stores):
+    """update_multiply_points for every key that changed"""
+    ctx = dash.callback_context
+    scalars = patterns.by_index(scalars, ctx.inputs_list[0])
+    contexts = patterns.by_index(contexts, ctx.inputs_list[1])
+    stores = patterns.by_index(stores, ctx.states_list[0])
+    return patterns.map_indices(ctx.outputs_list, changed_keys(),
+        lambda key: update_multiply_points(
+            scalars.get(key_scalars[key]), contexts.get(key), stores.get(key)))
+
+def key_bounds(contexts, scalars):
+    """priv_in_bounds for every scalar whose generator changed"""
+    ctx = dash.callback_context
+    contexts = patterns.by_index(contexts, ctx.inputs_list[0])
+    scalars = patterns.by_index(scalars, ctx.states_list[0])
+    keys = changed_keys()
+    changed = None if keys is None else {s for s, key in scalar_graphs.items() if key in keys}
+    bounds = patterns.map_indices(ctx.outputs_list[0], changed,
+        lambda scalar: priv_in_bounds(contexts.get(scalar_graphs[scalar]), scalars[scalar]))
+    return ([dash.no_update if _ is dash.no_update else _[0] for _ in bounds],
+            [dash.no_update if _ is dash.no_update else _[1] for _ in bounds])
+
+def key_graphs(p_i, a, b, scalars, stores):
+    """multiply_graph for every key that changed"""
+    ctx = dash.callback_context
+    scalars = patterns.by_index(scalars, ctx.inputs_list[3])
+    stores = patterns.by_index(stores, ctx.inputs_list[4])
+    return patterns.map_indices(ctx.outputs_list, changed_keys(),
+        lambda key: multiply_graph(
+            p_i, a, b, scalars.get(key_scalars[key]), stores.get(key), key_sharing_modes.get(key)))
+
+def render_keys(p_i, a, b, stores):
+    """render_pub_key for every key that changed"""
+    ctx = dash.callback_context
+    stores = patterns.by_index(stores, ctx.inputs_list[3])
+    return patterns.map_indices(ctx.outputs_list, changed_keys(),
+        lambda key: render_pub_key(p_i, a, b, stores.get(key)))
+
+
 def render_schnorr_keys(p_i, a, b, points):
+    points = session_store.curves(points, str((primes_[p_i],a,b)))
     p = primes_[p_i]
     points_str = '', '', ''
     if points is not None:
@@ -977,6 +1227,7 @@ def render_schnorr_keys(p_i, a, b, points):
 
 
 def render_points(p_i, a, b, points):
+    points = session_store.curves(points, str((primes_[p_i],a,b)))
     p = primes_[p_i]
     if points is not None:
         curve_key = str((p,a,b))
@@ -996,10 +1247,7 @@ def point_in_curve(x, y, p, a, b):
 
     """
     try:
-        return Point(FieldElement(x, p),
-                    FieldElement(y, p),
-                    FieldElement(a, p),
-                    FieldElement(b, p),)
+        return get_curve(p, a, b).point(x, y)
     except:
         raise PreventUpdate
 
@@ -1008,45 +1256,46 @@ order_dict = {} # cache results
 
 def order(p, a, b):
     """calculate the order of the field including the point at infinity"""
-    if (p,a,b) not in order_dict:
+    order_ = order_dict.get((p,a,b))
+    if order_ is None:
         order_ = int(elliptic(p, a, b).sum()+1) # brute force
         order_dict[(p,a,b)] = order_
-    else:
-        order_ = order_dict[(p,a,b)]
     return order_
 
-def divisors(n):
-    for i in range(1, int(n / 2) + 1):
-        if n % i == 0:
-            yield i
-    yield n
-
 def subgroup_order(P):
     """find the subgroup order of input P
     
     For prime field of size N, the subgroup order for P
     is the smallest divisor n of N s.t. n*P = inf
+
+    The orders of all points are computed once per curve (see elliptic.group)
     """
-    p = P.x.prime
-    a = P.a.num
-    b = P.b.num
+    curve = P.curve
 
-    N = order(p, a, b) # brute force
-    
-    for _ in divisors(N):
-        P_ = _*P
-        if P_.x is None:
-            break
-    return _
+    return group_structure(curve.p, curve.a, curve.b).point_order(P.x, P.y)
 
+def render_group_structure(p_i, a, b):
+    """describe the group and suggest prime-order generators"""
+    if a is None or b is None:
+        raise PreventUpdate
+    p = primes_[p_i]
+    group = group_structure(p, a, b)
+
+    if group.cyclic:
+        structure_str = "$E(F_{" + str(p) + "}) \\cong Z_{" + str(group.n1) + "}$ (cyclic)"
+    else:
+        structure_str = "$E(F_{" + str(p) + "}) \\cong Z_{" + str(group.n1) + "} \\times Z_{" + str(group.n2) + "}$"
+
+    generators = group.prime_order_generators(limit=6)
+    if len(generators) == 0:
+        return structure_str
 
-def get_fernet(key_str):
-    fernet_key = base64.urlsafe_b64encode(bytes(key_str.ljust(32).encode()))
-    return Fernet(fernet_key)
+    n = group.prime_orders()[0]
+    generators_str = ', '.join([str(g) for g in generators])
+    return structure_str + "\n\nprime order {} generators: {}".format(n, generators_str)
 
 
 def encrypt(key, message):
-    # Fernet(base64.urlsafe_b64encode(b'(3,4)'.ljust(32)))
     if message is None:
         raise PreventUpdate
 
@@ -1056,12 +1305,7 @@ def encrypt(key, message):
     key_str = str(key)
     logging.debug('key str:{}'.format(key_str))
 
-    f = get_fernet(key_str)
-    token = f.encrypt(message.encode())
-
-    encrypted_msg = token.decode('ascii')
-
-    return encrypted_msg
+    return cipher.encrypt_message(key_str, message)
 
 
 def send(n_clicks, message):
@@ -1077,10 +1321,7 @@ def decrypt(key, message):
     if key == '':
         raise PreventUpdate
 
-    f = get_fernet(str(key))
-    decrypted_msg = f.decrypt(message.encode()).decode('ascii')
-
-    return decrypted_msg
+    return cipher.decrypt_message(str(key), message)
 
 
 def get_triggered():
@@ -1120,6 +1361,41 @@ def update_message(key, encrypt_click, decrypt_click, send_click, receive_messag
 
     return None, error_msg
 
+def crypt_upload(key, contents, filename):
+    """encrypt an uploaded file, or decrypt it if it ends in .enc
+
+    the upload is decoded and encrypted chunk by chunk into a download file;
+    dash delivers it as one string, so files over cipher.max_upload are refused
+    """
+    if contents is None:
+        raise PreventUpdate
+
+    if key == '' or key is None:
+        return 'cannot encrypt without shared secret!'
+
+    data = contents.split(',', 1)[-1]
+    if len(data)//4*3 > cipher.max_upload:
+        return 'Files over {} MB go through /secret-sharing/encrypt (see the README)'.format(
+            cipher.max_upload//2**20)
+
+    filename = filename or 'message'
+    chunks = b64_chunks(data)
+    if filename.endswith('.enc'):
+        out_name = filename[:-len('.enc')]
+        transform = cipher.decrypt_chunks
+    else:
+        out_name = filename + '.enc'
+        transform = cipher.encrypt_chunks
+
+    try:
+        token = cipher.downloads.save(transform(str(key), chunks))
+    except InvalidToken:
+        return 'Cannot decrypt with {}!'.format(key.strip('**'))
+
+    return html.A('Download ' + out_name,
+                  href='/secret-sharing/download/{}/{}'.format(token, quote(out_name)),
+                  download=out_name)
+
 def update_crypto_buttons(key):
     if key == '':
         return 'secondary', 'secondary'
@@ -1127,10 +1403,7 @@ def update_crypto_buttons(key):
         return 'primary', 'primary'
 
 def sha256(message):
-    digest = hashes.Hash(hashes.SHA256())
-    digest.update(message.encode())
-    digest.update(b"123")
-    return digest.finalize()
+    return digest([message])
 
 def get_z(message, size_=30):
     """assign a somewhat unique integer to an input message
@@ -1138,9 +1411,28 @@ def get_z(message, size_=30):
 
     note: input will be cast into string before hashing
     """
-    z = int.from_bytes(sha256(str(message))[:size_], "big")
+    z = to_z(sha256(str(message)), size_)
     return z
 
+def upload_message(contents, message, filename):
+    """keep an uploaded document to sign on the server
+
+    typing a message switches back to signing the text. dash delivers the
+    upload as one string, so as in crypt_upload files over cipher.max_upload
+    are refused before decoding
+    """
+    if get_triggered().endswith('message') or contents is None:
+        return None, 'Drop or select a file to sign instead'
+
+    data = contents.split(',', 1)[-1]
+    if len(data)//4*3 > cipher.max_upload:
+        return None, 'Files over {} MB cannot be signed here, drop a smaller one'.format(
+            cipher.max_upload//2**20)
+
+    token = uploads.save(b64_chunks(data))
+    size = os.path.getsize(uploads.path(token))
+    return dict(token=token, filename=filename), 'Signing {} ({} bytes)'.format(filename, size)
+
 def get_s(k, z, r, d_a, n):
     k_inv = modinv(k, n)
     return (k_inv*((z%n + (r*d_a)%n)%n))%n
@@ -1170,6 +1462,7 @@ u_2 = 𝑠^-11 r mod_n = {u_2}
 
 
 def validate_signature(p_i, a, b, z_r_s, gen_points, pub_key_str):
+    gen_points = session_store.curves(gen_points, str((primes_[p_i],a,b)))
     p = primes_[p_i]
 
     curve_key = str((p,a,b))
@@ -1211,11 +1504,13 @@ def validate_signature(p_i, a, b, z_r_s, gen_points, pub_key_str):
     return verify_message.format(
         u_1=u_1,
         u_2=u_2,
-        G_0 = tuple([G_0.x.num, G_0.y.num]),
-        H_A = tuple([H_A.x.num, H_A.y.num]),
-        P=tuple([P.x.num, P.y.num]))
+        G_0 = tuple([G_0.x, G_0.y]),
+        H_A = tuple([H_A.x, H_A.y]),
+        P=tuple([P.x, P.y]))
 
-def render_sign_params(p_i, a, b, priv_key, k, pub_points, secret_points, message):
+def render_sign_params(p_i, a, b, priv_key, k, pub_points, secret_points, message, message_file=None):
+    pub_points = session_store.curves(pub_points, str((primes_[p_i],a,b)))
+    secret_points = session_store.curves(secret_points, str((primes_[p_i],a,b)))
     p = primes_[p_i]
 
     curve_key = str((p,a,b))
@@ -1244,20 +1539,24 @@ def render_sign_params(p_i, a, b, priv_key, k, pub_points, secret_points, messag
     x_0, y_0 = secret_points[0]
     subgroup_order_ = subgroup_order(point_in_curve(x_0, y_0, p, a, b))
 
-    try:
-        r = modinv(secret_points[-1][0], subgroup_order_)
-    except:
+    if not is_prime(subgroup_order_):
         return 'could not compute prime inverse for {}'.format(subgroup_order_), ''
+    r = secret_points[-1][0] % subgroup_order_ # r = P_x mod n, as in the lesson
 
     if r == 0:
         return "$P_{kx}$ = 0! please choose another (random) k!", ''
 
-    if message is None:
+    if message is None and message_file is None:
         return "Message required to proceed.", ''
 
-    z_size = 2
+    z_size = ECDSA_Z_SIZE
     n = int.from_bytes((subgroup_order_).to_bytes(2, 'big'),'big')
-    z = get_z(message, z_size)
+    if message_file is not None:
+        if upload_parts(message_file) is None:
+            return "Uploaded message expired, please upload it again.", ''
+        z = to_z(upload_digest(message_file['token']), z_size)
+    else:
+        z = get_z(message, z_size)
 
     try:
         # return f'modinv({k},{n})={modinv(k,n)}'
@@ -1297,11 +1596,11 @@ def input_type(kind, id_, type_):
     return html.Div()
 
 
-problems = OmegaConf.to_container(OmegaConf.load('problems.yaml'))
+problem_bank = ProblemBank(['problems.yaml', 'problems/*.yaml'])
 
 def load_multiply_problems(url):
     problem_set = []
-    for i, problem in enumerate(problems['point-multiplication']):
+    for i, problem in enumerate(problem_bank.problems('point-multiplication')):
         problem_set.append(dcc.Markdown(children=problem['question']))
         problem_set.append(
             dbc.Row(justify="center", children=[
@@ -1324,23 +1623,23 @@ def validate_user_answer(answer):
     answer = str(answer)
 
 
-    triggered = get_triggered()
+    triggered = dash.callback_context.triggered_id
     logging.debug("triggered ({}): {}".format(type(triggered), triggered))
-    if ':' not in triggered:
+    if not isinstance(triggered, dict):
         raise PreventUpdate
 
     if len(answer) == 0:
         return False, False, ''
 
-    triggered_dict = json.loads(triggered)
-    problem_set = triggered_dict['kind']
-    problem_index = triggered_dict['index']
-    problem = problems[problem_set][problem_index]
+    problem = problem_bank.lookup(triggered['kind'], triggered['index'])
+    if problem is None:
+        raise PreventUpdate
+    answer_z30, type_, rules = problem
 
-    z30 = get_z(answer, 30)
-    # logging.debug(answer, z30, problem['answer_z30'])
+    z30 = get_z(normalize(answer, rules), 30)
+    # logging.debug(answer, z30, answer_z30)
 
-    valid = problem['answer_z30'] == z30
+    valid = answer_z30 == z30
     invalid = not valid
     if valid:
         message = 'correct!'
@@ -1350,20 +1649,33 @@ def validate_user_answer(answer):
     return valid, invalid, message
 
 
-def cat(pub_key, secret_r, message):
-    """concatonate all str arguments"""
-    for _ in pub_key, secret_r, message:
-        if _ is None:
+def schnorr_parts(pub_key, secret_r, message, message_file=None):
+    """the parts of R||H_A||m, with an uploaded message as a stream of chunks"""
+    for _ in pub_key, secret_r:
+        if _ is None or len(_) == 0:
             raise PreventUpdate
 
-    # print(pub_key, secret_r, message)
-    for _ in [pub_key, secret_r, message]:
-        if len(_) == 0:
+    if message_file is not None:
+        message = upload_parts(message_file)
+        if message is None:
             raise PreventUpdate
-    return ''.join([pub_key.strip('**'), secret_r.strip('**'), message])
+    elif message is None or len(message) == 0:
+        raise PreventUpdate
+    return [pub_key.strip('**'), secret_r.strip('**'), message]
 
+def cat(pub_key, secret_r, message, message_file=None):
+    """concatonate all str arguments (long messages are abbreviated)"""
+    pub_key, secret_r, message = schnorr_parts(pub_key, secret_r, message, message_file)
+    if message_file is not None:
+        message = '[{}]'.format(message_file['filename'])
+    elif len(message) > 280:
+        message = message[:280] + '...'
+    return ''.join([pub_key, secret_r, message])
 
-def hash_concat(p_i, a, b, pub_points, message, d_a, k):
+
+def hash_concat(p_i, a, b, pub_points, pub_key, secret_r, message, d_a, k, message_file=None):
+    parts = schnorr_parts(pub_key, secret_r, message, message_file)
+    pub_points = session_store.curves(pub_points, str((primes_[p_i],a,b)))
     p = primes_[p_i]
 
     curve_key = str((p,a,b))
@@ -1383,7 +1695,7 @@ def hash_concat(p_i, a, b, pub_points, message, d_a, k):
     G = point_in_curve(G_0[0], G_0[1], p, a, b)
     subgroup_order_ = subgroup_order(G)
 
-    h = get_z(message)%subgroup_order_
+    h = to_z(digest(parts))%subgroup_order_
 
     s = (k%subgroup_order_ + (h%subgroup_order_)*(d_a%subgroup_order_))%subgroup_order_
 
@@ -1399,6 +1711,7 @@ def render_signature_schnorr(s,R):
     return renderable_sig
 
 def validate_schnorr_signature(p_i, a, b, h, s, points):
+    points = session_store.curves(points, str((primes_[p_i],a,b)))
     p = primes_[p_i]
 
     curve_key = str((p,a,b))
@@ -1419,10 +1732,107 @@ def validate_schnorr_signature(p_i, a, b, h, s, points):
     sG = s*G_0
 
     validate = f"""
-        ${s} \\cdot ({G_0.x.num}, {G_0.y.num}) = ({sG.x.num}, {sG.y.num})$
+        ${s} \\cdot ({G_0.x}, {G_0.y}) = ({sG.x}, {sG.y})$
 
-        $({R.x.num}, {R.y.num}) + {h} \\cdot ({H_A.x.num}, {H_A.y.num}) = ({sG_v.x.num}, {sG_v.y.num})$
+        $({R.x}, {R.y}) + {h} \\cdot ({H_A.x}, {H_A.y}) = ({sG_v.x}, {sG_v.y})$
         """
     return validate
 
 
+
+
+def real_message_hash(message, message_file):
+    """plain sha256 of the typed or uploaded message (no suffix), None if missing"""
+    if message_file is not None:
+        parts = upload_parts(message_file)
+    elif message is not None and len(message) > 0:
+        parts = message
+    else:
+        return None
+    if parts is None:
+        return None
+    return digest([parts], suffix=b'')
+
+def real_private_key(key):
+    try:
+        return secp256k1.parse_private_key(key), ''
+    except ValueError as m:
+        return None, 'Invalid private key: {}'.format(m)
+
+def secp256k1_ecdsa(key, message, message_file):
+    """sign and verify the message with ECDSA on the real secp256k1"""
+    d, error = real_private_key(key)
+    if d is None:
+        return error
+    hash_ = real_message_hash(message, message_file)
+    if hash_ is None:
+        return "Message required to proceed."
+
+    z = secp256k1.to_int(hash_)
+    pub = secp256k1.public_key(d)
+    r, s = secp256k1.ecdsa_sign(d, z)
+
+    start = time.perf_counter()
+    verified = secp256k1.ecdsa_verify(pub, z, (r, s))
+    elapsed = time.perf_counter() - start
+
+    return '\n\n'.join([
+        'public key: `{}`'.format(secp256k1.compressed(pub)),
+        'z = sha256(m): `{:064x}`'.format(z),
+        'signature (RFC 6979 k, low s):',
+        'r: `{:064x}`'.format(r),
+        's: `{:064x}`'.format(s),
+        '{} in {:.2f} ms'.format('VERIFIED!' if verified else 'NOT VERIFIED', 1000*elapsed)])
+
+def secp256k1_schnorr(key, message, message_file):
+    """sign and verify sha256(message) with BIP-340 Schnorr on the real secp256k1"""
+    d, error = real_private_key(key)
+    if d is None:
+        return error
+    hash_ = real_message_hash(message, message_file)
+    if hash_ is None:
+        return "Message required to proceed."
+
+    pub_x = secp256k1.public_key(d)[0]
+    signature = secp256k1.schnorr_sign(d, hash_)
+
+    start = time.perf_counter()
+    verified = secp256k1.schnorr_verify(pub_x, hash_, signature)
+    elapsed = time.perf_counter() - start
+
+    return '\n\n'.join([
+        'public key (x only): `{:064x}`'.format(pub_x),
+        'm = sha256(message): `{}`'.format(hash_.hex()),
+        'signature (R, s):',
+        'R: `{}`'.format(signature[:32].hex()),
+        's: `{}`'.format(signature[32:].hex()),
+        '{} in {:.2f} ms'.format('VERIFIED!' if verified else 'NOT VERIFIED', 1000*elapsed)])
+
+def render_tab(active_tab, loaded):
+    """send a tab's contents the first time it is opened"""
+    loaded = loaded or []
+    if active_tab in loaded or active_tab not in tabs.contents:
+        raise PreventUpdate
+
+    outputs = []
+    for output in dash.callback_context.outputs_list[:-1]:
+        if output['id'] == tabs.placeholder_id(active_tab):
+            outputs.append(tabs.contents[active_tab])
+        else:
+            outputs.append(dash.no_update)
+    return outputs + [loaded + [active_tab]]
+
+def render_op_counts(n_clicks):
+    """mean operation counts per callback over recent requests"""
+    ops = ['field_add', 'field_mul', 'field_pow', 'field_inv', 'point_add', 'point_double', 'scalar_mul']
+    rows = [(name, counts) for name, counts in sorted(counters.summary().items())
+            if any(counts.get(op, 0) for op in ops)]
+    if len(rows) == 0:
+        return 'No operations counted yet (counters are set in elliptic.yaml under op_counters).'
+
+    table = '| callback | requests | ' + ' | '.join(ops) + ' |\n'
+    table += '|---' * (len(ops) + 2) + '|\n'
+    for name, counts in rows:
+        table += '| {} | {} | '.format(name, counts['requests'])
+        table += ' | '.join('{:.0f}'.format(counts.get(op, 0)) for op in ops) + ' |\n'
+    return table
@@ -0,0 +1,57 @@
+"""Incremental message hashing for the signature tabs
+
+A message to sign can be typed, uploaded, or given as any iterable of byte
+chunks. Parts are fed to SHA-256 one chunk at a time, so R||H_A||m is hashed
+without building the concatenation, and an uploaded document is read back
+from its spool file chunk by chunk. Dash still delivers each upload as one
+base64 string, so uploads are capped at cipher.max_upload. The digest
+matches hashing the concatenated text in one go, so a file gives the same z
+as typing its contents.
+"""
+import functools
+
+from cryptography.hazmat.primitives import hashes
+
+from elliptic.spool import Spool
+
+
+SUFFIX = b"123" # appended to messages signed on the small curves
+ECDSA_Z_SIZE = 2 # digest bytes used as z by the ECDSA tab and /api sign and verify
+
+uploads = Spool('.uploads', ttl=3600) # documents to sign
+
+
+def digest(parts, suffix=SUFFIX):
+    """sha256 of the concatenated parts plus suffix
+
+    parts: str, bytes, or iterables of byte chunks
+    """
+    hash_ = hashes.Hash(hashes.SHA256())
+    for part in parts:
+        if isinstance(part, str):
+            part = [part.encode()]
+        elif isinstance(part, (bytes, bytearray)):
+            part = [part]
+        for chunk in part:
+            hash_.update(chunk)
+    hash_.update(suffix)
+    return hash_.finalize()
+
+
+def to_z(digest_, size_=30):
+    """integer from the first size_ bytes of a digest"""
+    return int.from_bytes(digest_[:size_], "big")
+
+
+def upload_parts(message_file):
+    """byte chunks for an uploaded message, None if it expired"""
+    token = message_file['token']
+    if uploads.path(token) is None:
+        return None
+    return uploads.chunks(token)
+
+
+@functools.lru_cache(maxsize=64)
+def upload_digest(token):
+    """digest of an uploaded message on its own (uploads never change)"""
+    return digest([uploads.chunks(token)])
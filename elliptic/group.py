@@ -0,0 +1,150 @@
+"""Group structure of E(F_p), computed once per curve
+
+Every elliptic curve group over F_p is isomorphic to Z_n1 x Z_n2 with n2
+dividing n1 (the curve is cyclic when n2 = 1). Here the order of every point
+is found at once with batched scalar multiplication, which gives n1 (the
+largest point order), n2 = N/n1, the generators of maximal cyclic subgroups
+and each point's cofactor. Lookups afterwards are dict lookups.
+"""
+import numpy as np
+
+from elliptic.batch import PointBatch, curve_points, sqrt_table
+
+
+def factorize(n):
+    """prime factorization of n as {prime: exponent}"""
+    factors = {}
+    d = 2
+    while d*d <= n:
+        while n % d == 0:
+            factors[d] = factors.get(d, 0) + 1
+            n //= d
+        d += 1
+    if n > 1:
+        factors[n] = factors.get(n, 0) + 1
+    return factors
+
+
+def point_orders(xs, ys, p, a, b, N):
+    """order of every affine point (xs[i], ys[i]) in a group of order N
+
+    start from N and divide out each prime q while (m/q)*P is still infinity
+    """
+    P = PointBatch(xs, ys, a, b, p)
+    orders = np.full(len(xs), N, dtype=np.int64)
+    for q, e in factorize(N).items():
+        for _ in range(e):
+            divisible = orders % q == 0
+            candidate = np.where(divisible, orders//q, orders)
+            reduce_ = divisible & P.multiply(candidate).inf
+            orders = np.where(reduce_, candidate, orders)
+    return orders
+
+
+def curve_order(p, a, b):
+    """#E(F_p) = p + 1 + sum_x chi(x^3 + ax + b), without listing the points (p < 2**31)"""
+    x = np.arange(p, dtype=np.int64)
+    rhs = (x*x % p*x + a*x + b) % p
+    return p + 1 + int(np.sign(sqrt_table(p)[rhs]).sum())
+
+
+def group_invariants(p, a, b):
+    """(N, n1, n2) with E(F_p) = Z_n1 x Z_n2, without the order of every point
+
+    n2 divides p - 1 and n2^2 divides N, so only primes q with q^2 | N and
+    q | p - 1 are checked: q^j divides n2 when all q^2j points of E[q^j]
+    are in E(F_p), counted as the points killed by q^j
+    """
+    N = curve_order(p, a, b)
+    n2 = 1
+    candidates = [(q, e) for q, e in factorize(N).items() if e >= 2 and (p - 1) % q == 0]
+    if candidates:
+        xs, ys = curve_points(p, a, b)
+        P = PointBatch(xs, ys, a, b, p)
+        for q, e in candidates:
+            j = 1
+            while 2*j <= e and (p - 1) % q**j == 0:
+                if int(P.multiply(q**j).inf.sum()) + 1 != q**(2*j):
+                    break
+                n2 *= q
+                j += 1
+    return N, N//n2, n2
+
+
+class GroupStructure:
+    """E(F_p) for y^2 = x^3 + ax + b as Z_n1 x Z_n2"""
+
+    def __init__(self, p, a, b):
+        self.p, self.a, self.b = p, a, b
+        self.xs, self.ys = curve_points(p, a, b)
+        self.order = len(self.xs) + 1 # including the point at infinity
+        self.orders = point_orders(self.xs, self.ys, p, a, b, self.order)
+        self.n1 = int(self.orders.max()) if len(self.orders) > 0 else 1
+        self.n2 = self.order//self.n1
+        self._index = {(x, y): i for i, (x, y) in
+                       enumerate(zip(self.xs.tolist(), self.ys.tolist()))}
+
+    def __repr__(self):
+        return 'GroupStructure(p={}, a={}, b={}: Z_{} x Z_{})'.format(
+            self.p, self.a, self.b, self.n1, self.n2)
+
+    @property
+    def cyclic(self):
+        return self.n2 == 1
+
+    def point_order(self, x, y):
+        """order of the point (x, y), 1 for infinity, None if not on the curve"""
+        if x is None or x == -1:
+            return 1
+        i = self._index.get((x, y))
+        if i is None:
+            return None
+        return int(self.orders[i])
+
+    def cofactor(self, x, y):
+        """N / order of (x, y)"""
+        order_ = self.point_order(x, y)
+        if order_ is None:
+            return None
+        return self.order//order_
+
+    def points_of_order(self, n):
+        """all points of order n as (x, y) tuples"""
+        i = np.nonzero(self.orders == n)[0]
+        return list(zip(self.xs[i].tolist(), self.ys[i].tolist()))
+
+    def generators(self):
+        """points generating a cyclic subgroup of maximal order n1
+
+        (these generate the whole group when it is cyclic)
+        """
+        return self.points_of_order(self.n1)
+
+    def prime_orders(self):
+        """distinct prime point orders, largest first"""
+        return sorted(factorize(self.order), reverse=True)
+
+    def prime_order_generators(self, limit=None):
+        """points of the largest prime order, the usual choice for signatures"""
+        primes = self.prime_orders()
+        if len(primes) == 0:
+            return []
+        return self.points_of_order(primes[0])[:limit]
+
+    def to_dict(self, limit=10):
+        return dict(p=self.p, a=self.a, b=self.b,
+                    order=self.order, n1=self.n1, n2=self.n2,
+                    cyclic=self.cyclic,
+                    generators=self.generators()[:limit],
+                    prime_order=self.prime_orders()[0] if self.order > 1 else None,
+                    prime_order_generators=self.prime_order_generators(limit))
+
+
+group_dict = {} # cache results
+
+def group_structure(p, a, b):
+    """cached GroupStructure for the curve (p, a, b)"""
+    group = group_dict.get((p, a, b)) # read once, elliptic.memory may clear the cache
+    if group is None:
+        group = group_dict[(p, a, b)] = GroupStructure(p, a, b)
+    return group
@@ -0,0 +1,322 @@
+"""Headless load test for the dashboard
+
+Run from the base of this repo (next to elliptic.yaml):
+
+    python -m elliptic.loadtest --users 20 --rounds 3
+
+The app from main.py is served in-process on a local port. Each simulated
+student keeps its own copy of the component props from app.layout and replays
+a lesson (open page, pick p, click a generator, drag n, sign, verify) by
+posting to _dash-update-component. As in the browser, every changed prop fires
+the callbacks that take it as input and their outputs fire the next ones.
+
+Nothing leaves the machine. Per-callback throughput, latency percentiles and
+error rates are printed at the end.
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+import numpy as np
+
+from elliptic.scheduler import cookie_name
+
+
+def stringify_id(id_):
+    """'id' of a component as dash keys it, sorted json for dict ids"""
+    if isinstance(id_, dict):
+        return json.dumps(id_, sort_keys=True, separators=(',', ':'))
+    return id_
+
+
+def matches(dep, prop_id):
+    """True if the 'id.prop' of a component is the dependency or matches its ALL pattern"""
+    if dep == prop_id or not dep.startswith('{') or not prop_id.startswith('{'):
+        return dep == prop_id
+    pattern, prop = dep.rsplit('.', 1)
+    id_, prop_ = prop_id.rsplit('.', 1)
+    pattern, id_ = json.loads(pattern), json.loads(id_)
+    return (prop == prop_ and pattern.keys() == id_.keys()
+            and all(v == ['ALL'] or v == id_[k] for k, v in pattern.items()))
+
+
+class Callback:
+    """one entry of app.callback_map, with ids as 'id.prop' strings
+
+    dict ids are sorted json, with ["ALL"] for the wildcard
+    """
+
+    def __init__(self, key, spec):
+        self.key = key
+        self.multi = key.startswith('..')
+        self.outputs = key.strip('.').split('...')
+        self.inputs = ['{}.{}'.format(d['id'], d['property']) for d in spec['inputs']]
+        self.state = ['{}.{}'.format(d['id'], d['property']) for d in spec.get('state', [])]
+        self.label = ','.join(self.outputs)
+
+    def triggered_by(self, changed):
+        """the changed 'id.prop's that are inputs of this callback, in input order"""
+        triggered = []
+        for dep in self.inputs:
+            if '["ALL"]' in dep:
+                triggered.extend(sorted(_ for _ in changed if '["ALL"]' not in _ and matches(dep, _)))
+            elif dep in changed:
+                triggered.append(dep)
+        return triggered
+
+    def body(self, props, changed):
+        def component(prop_id):
+            id_, prop = prop_id.rsplit('.', 1)
+            return dict(id=json.loads(id_) if id_.startswith('{') else id_, property=prop)
+
+        def expand(prop_id):
+            """the components an ALL pattern stands for (in the browser, those in the layout)"""
+            id_, prop = prop_id.rsplit('.', 1)
+            return ['{}.{}'.format(key.rsplit('.', 1)[0], prop) for key in props
+                    if key.endswith('.id') and matches(prop_id, '{}.{}'.format(key.rsplit('.', 1)[0], prop))]
+
+        def dep(prop_id):
+            if '["ALL"]' in prop_id:
+                return [dict(component(_), value=props.get(_)) for _ in expand(prop_id)]
+            return dict(component(prop_id), value=props.get(prop_id))
+
+        def output(prop_id):
+            if '["ALL"]' in prop_id:
+                return [component(_) for _ in expand(prop_id)]
+            return component(prop_id)
+
+        outputs = [output(_) for _ in self.outputs]
+        return dict(
+            output=self.key,
+            outputs=outputs if self.multi else outputs[0],
+            inputs=[dep(_) for _ in self.inputs],
+            state=[dep(_) for _ in self.state],
+            changedPropIds=self.triggered_by(changed))
+
+
+def get_callbacks(app):
+    """callbacks the simulated browser can fire (MATCH and ALLSMALLER ids are skipped)"""
+    callbacks = []
+    for key, spec in app.callback_map.items():
+        deps = [key] + [d['id'] for d in spec['inputs'] + spec.get('state', [])]
+        if any('["MATCH"]' in _ or '["ALLSMALLER"]' in _ for _ in deps):
+            continue
+        callbacks.append(Callback(key, spec))
+    return callbacks
+
+
+def get_layout_props(layout):
+    """initial 'id.prop' values for every component with an id
+
+    components with dict ids keep their 'id' too, to expand ALL patterns against
+    """
+    props = {}
+    for component in [layout] + [c for _, c in layout._traverse_with_paths()]:
+        id_ = getattr(component, 'id', None)
+        if not isinstance(id_, (str, dict)):
+            continue
+        for prop, value in component.to_plotly_json()['props'].items():
+            if prop == 'id' and isinstance(id_, str):
+                continue
+            if prop == 'children' and not isinstance(value, (str, int, float)):
+                continue
+            props['{}.{}'.format(stringify_id(id_), prop)] = value
+    return props
+
+
+class Stats:
+    """latencies, errors and busy (429) answers per callback label"""
+
+    def __init__(self):
+        self.latency = {}
+        self.errors = {}
+        self.busy = {}
+        self._lock = threading.Lock()
+
+    def record(self, label, seconds, error=False, busy=False):
+        with self._lock:
+            self.latency.setdefault(label, []).append(seconds)
+            if error:
+                self.errors[label] = self.errors.get(label, 0) + 1
+            if busy:
+                self.busy[label] = self.busy.get(label, 0) + 1
+
+    def report(self, elapsed):
+        rows = []
+        for label, latency in sorted(self.latency.items(), key=lambda kv: -sum(kv[1])):
+            ms = 1000*np.array(latency)
+            p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+            rows.append(dict(callback=label,
+                             requests=len(ms),
+                             rate=len(ms)/elapsed,
+                             p50=p50, p90=p90, p99=p99, max=ms.max(),
+                             errors=self.errors.get(label, 0)/len(ms),
+                             busy=self.busy.get(label, 0)/len(ms)))
+        return rows
+
+
+class Student:
+    """one simulated browser"""
+
+    def __init__(self, url, callbacks, props, stats, rng, max_rounds=10):
+        self.url = url + '_dash-update-component'
+        self.callbacks = callbacks
+        self.props = dict(props)
+        self.stats = stats
+        self.rng = rng
+        self.max_rounds = max_rounds
+        self.headers = {'Content-Type': 'application/json',
+                        'Cookie': '{}={}'.format(cookie_name, uuid.UUID(int=rng.getrandbits(128)).hex)}
+
+    def post(self, callback, changed):
+        data = json.dumps(callback.body(self.props, changed)).encode()
+        request = urllib.request.Request(self.url, data=data, headers=self.headers)
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                payload = response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            # 429: turned away by the scheduler, the browser keeps its props
+            self.stats.record(callback.label, time.perf_counter() - start,
+                              error=e.code != 429, busy=e.code == 429)
+            return {}
+        except OSError:
+            self.stats.record(callback.label, time.perf_counter() - start, error=True)
+            return {}
+        self.stats.record(callback.label, time.perf_counter() - start)
+
+        if status == 204: # PreventUpdate
+            return {}
+        updated = {}
+        for id_, props in json.loads(payload)['response'].items():
+            for prop, value in props.items():
+                updated['{}.{}'.format(id_, prop)] = value
+        return updated
+
+    def fire(self, changed=None, **values):
+        """set props and run the callbacks they trigger until nothing changes
+
+        changed=None fires every callback, as on page load
+        """
+        for key, value in values.items():
+            self.props[key] = value
+        changed = set(values) if changed is None and values else changed
+
+        for _ in range(self.max_rounds):
+            if changed is None:
+                triggered = self.callbacks
+            else:
+                triggered = [cb for cb in self.callbacks if cb.triggered_by(changed)]
+            if len(triggered) == 0:
+                break
+            updated = {}
+            for callback in triggered:
+                updated.update(self.post(callback, changed or set(callback.inputs) | set(self.props)))
+            self.props.update(updated)
+            changed = set(updated)
+
+    def click(self, graph_id, x, y):
+        self.fire(**{stringify_id(graph_id) + '.clickData': dict(points=[dict(x=x, y=y)])})
+
+    def lesson(self, p_range, n_max):
+        from elliptic.dashboard import primes_, elliptic
+
+        p_i = self.rng.randint(*p_range)
+        self.fire(**{'user-input-p.value': p_i})
+
+        a = self.props.get('user-input-a.value', 0)
+        b = self.props.get('user-input-b.value', 7)
+        ys, xs = np.nonzero(elliptic(primes_[p_i], a, b))
+        if len(xs) == 0:
+            return
+        j = self.rng.randrange(len(xs))
+        x, y = int(xs[j]), int(ys[j])
+
+        # point multiplication: click a generator and drag n
+        self.click('multiply-graph', x, y)
+        for n in range(1, n_max + 1):
+            self.fire(**{'user-input-n.value': n})
+
+        # ECDSA: same generator for pub key and k, then sign (verify follows)
+        self.click(dict(kind='key-graph', index='sign-pub'), x, y)
+        self.click(dict(kind='key-graph', index='sign-secret'), x, y)
+        self.fire(**{'sign-message.value': 'message {}'.format(self.rng.random())})
+
+    def run(self, rounds, p_range, n_max):
+        self.fire() # page load
+        for _ in range(rounds):
+            self.lesson(p_range, n_max)
+
+
+def serve(app):
+    """serve the flask app on a free local port in a background thread"""
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR) # no per-request lines
+    server = make_server('127.0.0.1', 0, app.server, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, 'http://127.0.0.1:{}/'.format(server.server_port)
+
+
+def run(app, users=10, rounds=3, p_range=(5, 20), n_max=5, seed=0):
+    """replay lessons for concurrent students, return (report rows, elapsed seconds)"""
+    server, url = serve(app)
+    callbacks = get_callbacks(app)
+    props = get_layout_props(getattr(app, 'validation_layout', None) or app.layout) # all tabs loaded
+    stats = Stats()
+
+    students = [Student(url, callbacks, props, stats, random.Random(seed + i))
+                for i in range(users)]
+    threads = [threading.Thread(target=s.run, args=(rounds, p_range, n_max)) for s in students]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    server.shutdown()
+    return stats.report(elapsed), elapsed
+
+
+def print_report(rows, elapsed):
+    total = sum(row['requests'] for row in rows)
+    errors = sum(row['errors']*row['requests'] for row in rows)
+    busy = sum(row['busy']*row['requests'] for row in rows)
+    print('{} requests in {:.1f}s ({:.1f} req/s), {:.0f} errors, {:.0f} busy'.format(
+        total, elapsed, total/elapsed, errors, busy))
+    header = '{:<60} {:>8} {:>8} {:>8} {:>8} {:>8} {:>8} {:>7} {:>7}'
+    print(header.format('callback', 'requests', 'req/s', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms', 'errors', 'busy'))
+    for row in rows:
+        print('{:<60} {:>8} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.1f} {:>8.1f} {:>6.1f}% {:>6.1f}%'.format(
+            row['callback'][:60], row['requests'], row['rate'],
+            row['p50'], row['p90'], row['p99'], row['max'], 100*row['errors'], 100*row['busy']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--users', type=int, default=10, help='concurrent students')
+    parser.add_argument('--rounds', type=int, default=3, help='lessons per student')
+    parser.add_argument('--p-min', type=int, default=5, help='smallest prime index')
+    parser.add_argument('--p-max', type=int, default=20, help='largest prime index')
+    parser.add_argument('--n-max', type=int, default=5, help='steps of the n slider')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write the report to this file')
+    args = parser.parse_args()
+
+    from main import app
+
+    rows, elapsed = run(app, args.users, args.rounds, (args.p_min, args.p_max), args.n_max, args.seed)
+    print_report(rows, elapsed)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(elapsed=elapsed, callbacks=rows), f, indent=2)
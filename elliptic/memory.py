@@ -0,0 +1,238 @@
+"""Memory gauges, soft limits and heap snapshots for a long-running server
+
+Enable in elliptic.yaml (off by default, /_memory has no authentication):
+
+    memory:
+      enabled: True
+      interval: 60 # seconds between samples
+      keep: 120 # samples kept for /_memory
+      soft_limit: 1024 # MB of resident memory before caches are shed, 0 for none
+      max_entries: # per cache, cleared when it grows past this
+        group_dict: 4096
+      shed: [heatmap_dict, cayley_dict, ...] # order in which caches are cleared
+      heap_snapshots: False # tracemalloc, for /_memory/snapshot and /_memory/diff
+      frames: 1 # stack frames per traced allocation
+
+A daemon thread samples the resident set size (RSS) and the number of entries
+of every registered cache. A cache over its max_entries is cleared. While RSS
+is over soft_limit, the caches listed in shed are cleared one at a time, in
+that order, until it is back under. Every cache is rebuilt on demand, so
+shedding only costs recomputation. /_memory shows the latest samples and
+shed counts as JSON.
+
+With heap_snapshots on, tracemalloc traces every allocation.
+/_memory/snapshot keeps a snapshot of the python heap and lists its largest
+allocation sites, and /_memory/diff lists what grew since that snapshot.
+Tracing slows every allocation, so leave it off unless you are chasing a leak.
+"""
+import collections
+import gc
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError: # windows
+    resource = None
+
+
+caches = {} # name -> (entries, clear)
+
+_own_traces = [tracemalloc.Filter(False, tracemalloc.__file__)] # left out of snapshots
+
+
+def register(name, entries, clear):
+    """add a cache: entries() counts it, clear() empties it"""
+    caches[name] = entries, clear
+
+
+def register_dict(name, cache):
+    register(name, cache.__len__, cache.clear)
+
+
+def register_lru(name, func):
+    """a functools.lru_cache function"""
+    register(name, lambda: func.cache_info().currsize, func.cache_clear)
+
+
+def register_defaults():
+    """the caches of the elliptic modules"""
+    from elliptic import cayley, cipher, counters, curve, dashboard, digest, group
+    from elliptic.sessions import session_store
+
+    register_dict('order_dict', dashboard.order_dict)
+    register_dict('heatmap_dict', dashboard.heatmap_dict)
+    register_dict('multiples_dict', dashboard.multiples_dict)
+    register_dict('group_dict', group.group_dict)
+    register_dict('cayley_dict', cayley.cayley_dict)
+    register_dict('curves', curve._curves)
+    register('op_counts', counters.history.__len__, counters.clear)
+    register_lru('upload_digest', digest.upload_digest)
+    register_lru('aead', cipher.get_aead)
+    register('sessions', session_store.__len__, session_store.purge) # only drops expired ones
+
+
+def rss():
+    """resident set size in bytes, None where it cannot be read"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1])*os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss():
+    """largest resident set size so far in bytes, None without the resource module"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else 1024*peak # bytes on macOS, KiB elsewhere
+
+
+def cache_entries():
+    entries = {}
+    for name, (count, _) in list(caches.items()):
+        try:
+            entries[name] = count()
+        except Exception as e:
+            logging.debug('cannot count cache {}: {}'.format(name, e))
+    return entries
+
+
+class Watchdog:
+    """samples memory and sheds caches past the soft limits"""
+
+    def __init__(self, interval=60, keep=120, soft_limit=0, max_entries=None, shed=(),
+                 top=25):
+        self.interval = interval
+        self.soft_limit = soft_limit*2**20 # MB -> bytes
+        self.max_entries = dict(max_entries or {})
+        self.shed_order = list(shed)
+        self.top = top
+        self.samples = collections.deque(maxlen=keep)
+        self.shed_counts = collections.Counter() # cache -> times cleared
+        self.baseline = None # tracemalloc snapshot
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def clear(self, name, reason):
+        entries, clear = caches[name]
+        logging.info('memory: clearing {} ({} entries): {}'.format(name, entries(), reason))
+        clear()
+        self.shed_counts[name] += 1
+
+    def check(self):
+        """take a sample, clear caches over their limits, return the sample"""
+        with self._lock:
+            entries = cache_entries()
+            for name, limit in self.max_entries.items():
+                if name in caches and entries.get(name, 0) > limit:
+                    self.clear(name, 'over {} entries'.format(limit))
+
+            rss_ = rss()
+            if self.soft_limit and rss_ is not None and rss_ > self.soft_limit:
+                for name in self.shed_order:
+                    if name not in caches:
+                        continue
+                    self.clear(name, 'rss {:.0f} MB over the soft limit'.format(rss_/2**20))
+                    gc.collect()
+                    rss_ = rss()
+                    if rss_ <= self.soft_limit:
+                        break
+                else:
+                    logging.warning('memory: rss {:.0f} MB still over the soft limit of {:.0f} MB '
+                                    'with every cache shed'.format(rss_/2**20, self.soft_limit/2**20))
+
+            sample = dict(time=time.time(), rss=rss_, caches=cache_entries())
+            self.samples.append(sample)
+        logging.debug('memory: {}'.format(sample))
+        return sample
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logging.exception('memory watchdog')
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name='memory-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        with self._lock:
+            samples = list(self.samples)
+        return dict(rss=rss(), peak_rss=peak_rss(), soft_limit=self.soft_limit or None,
+                    caches=cache_entries(), max_entries=self.max_entries,
+                    shed=dict(self.shed_counts), tracing=tracemalloc.is_tracing(),
+                    samples=samples)
+
+    # tracemalloc
+
+    def snapshot(self):
+        """keep a heap snapshot as the baseline and report its largest allocation sites"""
+        snapshot = tracemalloc.take_snapshot().filter_traces(_own_traces)
+        self.baseline = snapshot
+        stats = snapshot.statistics('lineno')
+        total = sum(stat.size for stat in stats)
+        lines = ['{:.1f} MB traced in {} allocation sites, top {}:'.format(
+            total/2**20, len(stats), self.top)]
+        lines += [str(stat) for stat in stats[:self.top]]
+        return '\n'.join(lines)
+
+    def diff(self):
+        """allocation sites that grew the most since the baseline snapshot"""
+        if self.baseline is None:
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces(_own_traces)
+        stats = snapshot.compare_to(self.baseline, 'lineno')
+        growth = sum(stat.size_diff for stat in stats)
+        lines = ['{:+.1f} MB since the snapshot, top {}:'.format(growth/2**20, self.top)]
+        lines += [str(stat) for stat in stats[:self.top]]
+        return '\n'.join(lines)
+
+
+def init_app(app, enabled=False, url_base='/_memory', heap_snapshots=False, frames=1, **kwargs):
+    """start the watchdog and add its routes (only if enabled)"""
+    if not enabled:
+        return None
+
+    from flask import Response, abort, jsonify
+
+    register_defaults()
+    watchdog = Watchdog(**kwargs)
+    watchdog.start()
+    if heap_snapshots:
+        tracemalloc.start(frames)
+
+    server = app.server
+
+    def status():
+        return jsonify(watchdog.status())
+
+    def snapshot():
+        if not tracemalloc.is_tracing():
+            abort(404, 'heap snapshots are off, set memory.heap_snapshots: True')
+        return Response(watchdog.snapshot(), mimetype='text/plain')
+
+    def diff():
+        if not tracemalloc.is_tracing():
+            abort(404, 'heap snapshots are off, set memory.heap_snapshots: True')
+        report = watchdog.diff()
+        if report is None:
+            abort(404, 'no snapshot yet, open {}/snapshot first'.format(url_base))
+        return Response(report, mimetype='text/plain')
+
+    server.add_url_rule(url_base, 'memory', status)
+    server.add_url_rule(url_base + '/snapshot', 'memory_snapshot', snapshot)
+    server.add_url_rule(url_base + '/diff', 'memory_diff', diff)
+    return watchdog
+
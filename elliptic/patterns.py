@@ -0,0 +1,94 @@
+"""Pattern-matching ids in the callbacks of elliptic.yaml
+
+A component id may be a dict, and a callback may name its inputs, states
+and outputs with MATCH, ALL or ALLSMALLER in place of a value:
+
+    key_graphs:
+      input:
+        - id:
+            kind: key-points
+            index: ALL
+          attr: data
+      output:
+        - id:
+            kind: key-graph
+            index: ALL
+          attr: figure
+      callback: elliptic.dashboard.key_graphs
+
+resolve turns those strings into dash wildcards before psidash registers the
+callbacks. An ALL callback is called once with a list per wildcard dependency,
+in the order of dash.callback_context.inputs_list/states_list/outputs_list;
+the helpers below key those lists by the index of each component.
+"""
+import json
+
+import dash
+from dash.dependencies import ALL, ALLSMALLER, MATCH
+from dash.exceptions import PreventUpdate
+
+
+wildcards = dict(MATCH=MATCH, ALL=ALL, ALLSMALLER=ALLSMALLER)
+
+
+def resolve_id(id_):
+    """dict id with wildcard strings replaced, other ids unchanged"""
+    if not isinstance(id_, dict):
+        return id_
+    return {k: wildcards.get(v, v) if isinstance(v, str) else v for k, v in id_.items()}
+
+
+def resolve(callbacks_conf):
+    """copy of the `callbacks:` section with wildcards in its ids"""
+    resolved = {}
+    for name, spec in callbacks_conf.items():
+        spec = dict(spec)
+        for section in ['input', 'state', 'output']:
+            if section in spec:
+                spec[section] = [dict(dep, id=resolve_id(dep['id'])) for dep in spec[section]]
+        resolved[name] = spec
+    return resolved
+
+
+def by_index(values, specs):
+    """{index: value} for the values of one ALL dependency"""
+    return {spec['id']['index']: value for spec, value in zip(specs, values)}
+
+
+def indices(specs):
+    """indices of the components matched by one ALL dependency"""
+    return [spec['id']['index'] for spec in specs]
+
+
+def triggered_indices():
+    """{kind: set of indices} of the dict ids that fired the callback
+
+    None when a plain id (or the initial call) fired it, meaning all of them
+    """
+    triggered = {}
+    for trigger in dash.callback_context.triggered:
+        id_ = trigger['prop_id'].rsplit('.', 1)[0]
+        if not id_.startswith('{'):
+            return None
+        id_ = json.loads(id_)
+        triggered.setdefault(id_['kind'], set()).add(id_['index'])
+    return triggered
+
+
+def map_indices(specs, changed, compute):
+    """compute(index) for each changed index of an ALL output, no_update for the rest
+
+    changed=None computes all of them; an index raising PreventUpdate keeps its value
+    """
+    results = []
+    for index in indices(specs):
+        if changed is not None and index not in changed:
+            results.append(dash.no_update)
+            continue
+        try:
+            results.append(compute(index))
+        except PreventUpdate:
+            results.append(dash.no_update)
+    if all(result is dash.no_update for result in results):
+        raise PreventUpdate
+    return results
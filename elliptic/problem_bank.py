@@ -0,0 +1,140 @@
+"""Hot-reloadable problem bank
+
+Problems live in one or more yaml files whose top-level keys are named after
+the active tab (see problems.yaml). Files are re-read only when their mtime or
+size changes, and every problem is indexed by (kind, index) so answer
+validation is a single dict lookup.
+"""
+import glob
+import logging
+import os
+import threading
+import time
+
+from omegaconf import OmegaConf
+
+
+# rules that may be listed under a problem's `normalize` key
+NORMALIZERS = {
+    'strip': lambda s: s.strip(),
+    'nospace': lambda s: ''.join(s.split()),
+    'lower': lambda s: s.lower(),
+}
+
+
+def normalize(answer, rules):
+    """apply normalization rules (in order) to a user answer string"""
+    for rule in rules:
+        answer = NORMALIZERS[rule](answer)
+    return answer
+
+
+class ProblemBank:
+    """problem sets loaded from yaml files, reloaded when the files change
+
+    patterns - file names or glob patterns, expanded in sorted order
+    check_interval - minimum seconds between checks of the files on disk
+
+    Problems of the same kind found in several files are concatenated in file
+    order, so a large bank may be split as problems.yaml, problems/01.yaml, ...
+    """
+
+    def __init__(self, patterns, check_interval=1.0):
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        self.patterns = list(patterns)
+        self.check_interval = check_interval
+        self._files = {} # path -> ((mtime, size), {kind: [problem, ...]})
+        self._bad = {} # path -> (mtime, size) of a version that failed to load
+        self._problems = {} # kind -> [problem, ...]
+        self._index = {} # (kind, index) -> (answer_z30, type, normalize)
+        self._last_check = None
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def paths(self):
+        paths = []
+        for pattern in self.patterns:
+            for path in sorted(glob.glob(pattern)):
+                if path not in paths:
+                    paths.append(path)
+        return paths
+
+    def refresh(self, force=False):
+        """re-read changed files and rebuild the index if anything changed"""
+        now = time.monotonic()
+        if not force and self._last_check is not None:
+            if now - self._last_check < self.check_interval:
+                return False
+
+        with self._lock:
+            self._last_check = now
+            paths = self.paths()
+            changed = False
+
+            for path in list(self._bad):
+                if path not in paths:
+                    del self._bad[path]
+
+            for path in list(self._files):
+                if path not in paths:
+                    logging.debug('problem bank: dropping {}'.format(path))
+                    del self._files[path]
+                    changed = True
+
+            for path in paths:
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                stamp = (st.st_mtime_ns, st.st_size)
+                if path in self._files and self._files[path][0] == stamp:
+                    continue
+                if self._bad.get(path) == stamp: # retried once it changes
+                    continue
+                try:
+                    problem_sets = OmegaConf.to_container(OmegaConf.load(path))
+                except Exception as e:
+                    # keep the previous version, the file may be half-written
+                    logging.warning('problem bank: could not load {}: {}'.format(path, e))
+                    self._bad[path] = stamp
+                    continue
+                self._bad.pop(path, None)
+                logging.debug('problem bank: loaded {}'.format(path))
+                self._files[path] = (stamp, problem_sets or {})
+                changed = True
+
+            if changed:
+                self._rebuild(paths)
+            return changed
+
+    def _rebuild(self, paths):
+        problems = {}
+        for path in paths:
+            if path not in self._files:
+                continue
+            for kind, problem_set in self._files[path][1].items():
+                problems.setdefault(kind, []).extend(problem_set or [])
+
+        index = {}
+        for kind, problem_set in problems.items():
+            for i, problem in enumerate(problem_set):
+                rules = tuple(problem.get('normalize', ()))
+                for rule in rules:
+                    if rule not in NORMALIZERS:
+                        logging.warning('problem bank: unknown rule {} for {}[{}]'.format(rule, kind, i))
+                rules = tuple(rule for rule in rules if rule in NORMALIZERS)
+                index[(kind, i)] = (problem.get('answer_z30'), problem.get('type'), rules)
+
+        self._problems = problems
+        self._index = index
+
+    def problems(self, kind):
+        """all problems of a given kind"""
+        self.refresh()
+        return self._problems.get(kind, [])
+
+    def lookup(self, kind, index):
+        """return (answer_z30, type, normalize rules) or None"""
+        self.refresh()
+        return self._index.get((kind, index))
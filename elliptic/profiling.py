@@ -0,0 +1,146 @@
+"""Opt-in cProfile profiling of dashboard callbacks
+
+Enable in elliptic.yaml:
+
+    profiling:
+      enabled: True
+      callbacks: [multiply_inverse_clock] # always profile these
+      sample_rate: 0.01 # and this fraction of all other callback requests
+
+Any callback request is also profiled when it carries the header
+`X-Profile: 1` or comes from a page opened with `?profile=1`.
+
+Profiles are written to `path` (the newest `keep` are kept) and listed at
+/_profiles, where each one links to its top functions. When profiling is
+not enabled no hooks or routes are registered at all.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import time
+from urllib.parse import parse_qs, urlparse
+
+
+_name_pattern = re.compile(r'[0-9]+-[0-9]+-[A-Za-z0-9_]+\.prof')
+
+
+class Profiler:
+    """decides which requests to profile and stores the results"""
+
+    def __init__(self, path='.profiles', keep=50, sample_rate=0.0, callbacks=(), top=40):
+        self.path = path
+        self.keep = keep
+        self.sample_rate = sample_rate
+        self.callbacks = set(callbacks)
+        self.top = top
+
+    def wanted(self, request, callback_name):
+        """True if this callback request should be profiled"""
+        if request.headers.get('X-Profile', '') not in ('', '0'):
+            return True
+        referrer = request.headers.get('Referer')
+        if referrer and parse_qs(urlparse(referrer).query).get('profile', ['0'])[0] != '0':
+            return True
+        if callback_name in self.callbacks:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def save(self, profile, callback_name, elapsed):
+        """dump the profile and drop the oldest beyond keep"""
+        os.makedirs(self.path, exist_ok=True)
+        fname = '{}-{}-{}.prof'.format(time.time_ns(), int(elapsed*1e6), callback_name)
+        profile.dump_stats(os.path.join(self.path, fname))
+        for old in self.profiles()[self.keep:]:
+            try:
+                os.remove(os.path.join(self.path, old['name']))
+            except OSError:
+                pass
+
+    def profiles(self):
+        """stored profiles, newest first"""
+        if not os.path.isdir(self.path):
+            return []
+        profiles = []
+        for fname in os.listdir(self.path):
+            if not _name_pattern.fullmatch(fname):
+                continue
+            stamp, elapsed, callback_name = fname[:-len('.prof')].split('-', 2)
+            profiles.append(dict(name=fname, time=int(stamp)/1e9,
+                                 ms=int(elapsed)/1000, callback=callback_name))
+        return sorted(profiles, key=lambda prof: -prof['time'])
+
+    def report(self, fname, sort='cumulative'):
+        """top functions of a stored profile as text, None if there is no such profile"""
+        if not _name_pattern.fullmatch(fname):
+            return None
+        path = os.path.join(self.path, fname)
+        if not os.path.isfile(path):
+            return None
+        if sort not in pstats.Stats.sort_arg_dict_default:
+            sort = 'cumulative'
+        out = io.StringIO()
+        stats = pstats.Stats(path, stream=out)
+        stats.strip_dirs().sort_stats(sort).print_stats(self.top)
+        return out.getvalue()
+
+
+def callback_name(app, body):
+    """name of the dashboard function handling a _dash-update-component body"""
+    callback = app.callback_map.get(body.get('output'), {}).get('callback')
+    return getattr(callback, '__name__', 'unknown')
+
+
+def init_app(app, enabled=False, url_base='/_profiles', **kwargs):
+    """register the profiling hooks and routes on a dash app (only if enabled)"""
+    if not enabled:
+        return None
+
+    from flask import Response, abort, g, request
+
+    profiler = Profiler(**kwargs)
+    server = app.server
+    update_path = app.config.requests_pathname_prefix + '_dash-update-component'
+
+    @server.before_request
+    def start_profile():
+        if request.path != update_path:
+            return
+        name = callback_name(app, request.get_json(silent=True) or {})
+        if not profiler.wanted(request, name):
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError: # another profiler is active (python >= 3.12)
+            return
+        g.profile = profile, name, time.perf_counter()
+
+    @server.teardown_request
+    def stop_profile(exc):
+        if 'profile' not in g:
+            return
+        profile, name, start = g.pop('profile')
+        profile.disable()
+        profiler.save(profile, name, time.perf_counter() - start)
+
+    def index():
+        rows = ''.join(
+            '<tr><td>{}</td><td>{}</td><td>{:.1f}</td><td><a href="{}/{}">top functions</a></td></tr>'.format(
+                time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(prof['time'])),
+                prof['callback'], prof['ms'], url_base, prof['name'])
+            for prof in profiler.profiles())
+        return ('<table><tr><th>time</th><th>callback</th><th>ms</th><th></th></tr>{}</table>'
+                .format(rows))
+
+    def show(fname):
+        report = profiler.report(fname, request.args.get('sort', 'cumulative'))
+        if report is None:
+            abort(404)
+        return Response(report, mimetype='text/plain')
+
+    server.add_url_rule(url_base, 'profiles', index)
+    server.add_url_rule(url_base + '/<fname>', 'profile', show)
+    return profiler
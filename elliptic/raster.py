@@ -0,0 +1,75 @@
+"""Server-side rasterized rendering for large curves
+
+Once p is in the millions a scatter or heatmap of every point is unusable in
+the browser. Instead the points (the same set elliptic() draws) are binned on
+the server into a fixed-size density image covering only the current
+viewport of the graph.
+
+Only the x values inside the viewport are looked at. The y of each is found
+with sqrt_mod over the whole column of x values at once, so no array of
+every point of the field is built or kept. When the viewport holds more than
+`budget` x values they are sampled with a uniform stride and the counts are
+scaled back up, so each render costs about `budget` square roots no matter
+how large p is. Zooming in shrinks the range until every point is binned
+exactly.
+"""
+import math
+
+import numpy as np
+
+from elliptic.batch import sqrt_mod
+
+
+def get_viewport(relayout_data, p):
+    """(x0, x1, y0, y1) from dcc.Graph relayoutData, the whole field by default"""
+    viewport = [-0.5, p - 0.5, -0.5, p - 0.5]
+    if relayout_data:
+        for i, axis in enumerate(['xaxis', 'yaxis']):
+            if axis + '.range[0]' in relayout_data:
+                lo = relayout_data[axis + '.range[0]']
+                hi = relayout_data[axis + '.range[1]']
+            elif axis + '.range' in relayout_data:
+                lo, hi = relayout_data[axis + '.range']
+            else:
+                continue
+            lo, hi = sorted([float(lo), float(hi)])
+            lo = min(max(lo, -0.5), p - 1.5)
+            hi = max(min(hi, p - 0.5), lo + 1)
+            viewport[2*i:2*i + 2] = lo, hi
+    return tuple(viewport)
+
+
+def column_points(p, a, b, xs):
+    """the points (xs, ys) of the curve with x in xs (p < 2**31)"""
+    xs = np.asarray(xs, dtype=np.int64)
+    a, b = a % p, b % p
+    r = sqrt_mod((xs*xs % p*xs + a*xs + b) % p, p)
+    has_root = r >= 0
+    two_roots = r > 0
+    return (np.concatenate([xs[has_root], xs[two_roots]]),
+            np.concatenate([r[has_root], p - r[two_roots]]))
+
+
+def rasterize(p, a, b, viewport, width=500, height=500, budget=250000):
+    """density image of the curve points inside viewport
+
+    returns (z, x0, dx, y0, dy, exact) where z[j, i] counts the points in the
+    pixel centered at (x0 + i*dx, y0 + j*dy) and exact is False when the
+    counts were estimated from a sample
+    """
+    x_lo, x_hi, y_lo, y_hi = viewport
+
+    # one pixel per integer coordinate once zoomed in that far
+    nx = max(1, min(width, math.ceil(x_hi - x_lo)))
+    ny = max(1, min(height, math.ceil(y_hi - y_lo)))
+
+    first, last = max(0, math.ceil(x_lo)), min(p - 1, math.floor(x_hi))
+    stride = max(1, math.ceil((last - first + 1)/budget))
+    vx, vy = column_points(p, a, b, np.arange(first, last + 1, stride, dtype=np.int64))
+
+    z, _, _ = np.histogram2d(vy, vx, bins=[ny, nx], range=[[y_lo, y_hi], [x_lo, x_hi]])
+    z *= stride
+
+    dx = (x_hi - x_lo)/nx
+    dy = (y_hi - y_lo)/ny
+    return z, x_lo + dx/2, dx, y_lo + dy/2, dy, stride == 1
@@ -0,0 +1,210 @@
+"""Fair scheduling of dashboard callbacks between students
+
+Every dash callback request takes a slot before it runs. Enable in
+elliptic.yaml:
+
+    scheduler:
+      enabled: True
+      slots: 8 # callbacks running at once
+      heavy_slots: 4 # of which heavy curve renders
+      per_session: 2 # heavy callbacks running at once per browser
+      rate: 4.0 # heavy callbacks per second per browser (token bucket)
+      burst: 8
+      max_wait: 2.0 # seconds a callback may wait for a slot
+      heavy: [multiply_inverse_graph, ...]
+
+Callbacks are interactive (priority 0) unless listed as heavy (priority 1).
+Waiting callbacks start in order of priority, then the fewest running heavy
+callbacks of their session, then the most tokens left in its bucket (the
+least recent heavy use), then arrival. So cheap UI updates overtake renders,
+and one student dragging a slider on a large prime mostly queues behind their
+own renders.
+
+A heavy callback over its session's per_session limit waits for one of that
+session's renders to finish, since one input change fans out to several
+renders at once. A heavy callback over its session's rate gets an immediate
+429 "busy" response, and so does any callback still waiting after max_wait;
+the browser keeps the last figure. Browsers are told apart by a session
+cookie.
+"""
+import collections
+import itertools
+import json
+import threading
+import time
+import uuid
+
+
+cookie_name = 'elliptic_session'
+
+INTERACTIVE, HEAVY = 'interactive', 'heavy'
+priorities = {INTERACTIVE: 0, HEAVY: 1}
+
+
+class Busy(Exception):
+    """the callback should not run now"""
+
+    def __init__(self, reason, retry_after=1.0):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class Scheduler:
+    """slots for running callbacks, handed out by priority and session load"""
+
+    def __init__(self, slots=8, heavy_slots=4, per_session=2, rate=4.0, burst=8,
+                 max_wait=2.0, heavy=(), purge_every=256):
+        self.slots = slots
+        self.heavy_slots = min(heavy_slots, slots)
+        self.per_session = per_session
+        self.rate = rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.heavy = set(heavy)
+        self.purge_every = purge_every
+
+        self._cond = threading.Condition()
+        self._running = collections.Counter() # kind -> running callbacks
+        self._heavy_running = collections.Counter() # session -> running heavy callbacks
+        self._buckets = {} # session -> (tokens, time)
+        self._waiting = []
+        self._arrival = itertools.count()
+        self._acquires = 0
+        self.counts = collections.Counter() # ran, and busy per reason
+
+    def kind(self, callback_name):
+        return HEAVY if callback_name in self.heavy else INTERACTIVE
+
+    def _take_token(self, session, now):
+        tokens, last = self._buckets.get(session, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last)*self.rate)
+        if tokens < 1:
+            self._buckets[session] = tokens, now
+            return False
+        self._buckets[session] = tokens - 1, now
+        return True
+
+    def _free(self, session, kind):
+        if sum(self._running.values()) >= self.slots:
+            return False
+        if kind != HEAVY:
+            return True
+        return (self._running[HEAVY] < self.heavy_slots
+                and self._heavy_running[session] < self.per_session)
+
+    def _next(self):
+        """the waiting entry that should start now, None if none can"""
+        runnable = [entry for entry in self._waiting if self._free(entry[1], entry[2])]
+        if not runnable:
+            return None
+        return min(runnable, key=lambda entry: (
+            priorities[entry[2]], self._heavy_running[entry[1]],
+            -self._buckets.get(entry[1], (self.burst,))[0], entry[0]))
+
+    def acquire(self, session, callback_name):
+        """wait for a slot and return a ticket for release, raise Busy instead"""
+        kind = self.kind(callback_name)
+        with self._cond:
+            now = time.monotonic()
+            self._acquires += 1
+            if self._acquires % self.purge_every == 0:
+                self._purge(now)
+            if kind == HEAVY and not self._take_token(session, now):
+                self.counts['busy_rate'] += 1
+                raise Busy('rate limit', 1/self.rate if self.rate > 0 else 1.0)
+
+            entry = (next(self._arrival), session, kind)
+            self._waiting.append(entry)
+            deadline = now + self.max_wait
+            while self._next() is not entry:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(entry)
+                    self.counts['busy_wait'] += 1
+                    self._cond.notify_all()
+                    raise Busy('no free slot', self.max_wait)
+                self._cond.wait(remaining)
+
+            self._waiting.remove(entry)
+            self._running[kind] += 1
+            if kind == HEAVY:
+                self._heavy_running[session] += 1
+            self.counts['ran'] += 1
+            self._cond.notify_all() # the next waiter may fit too
+            return session, kind
+
+    def release(self, ticket):
+        session, kind = ticket
+        with self._cond:
+            self._running[kind] -= 1
+            if kind == HEAVY:
+                self._heavy_running[session] -= 1
+                if self._heavy_running[session] <= 0:
+                    del self._heavy_running[session]
+            self._cond.notify_all()
+
+    def _purge(self, now):
+        # a bucket idle for burst/rate seconds is full again, the same as no bucket
+        max_age = self.burst/self.rate if self.rate > 0 else float('inf')
+        for session, (_, last) in list(self._buckets.items()):
+            if now - last > max_age:
+                del self._buckets[session]
+
+    def purge(self):
+        """forget the token buckets that have refilled (also every purge_every acquires)"""
+        with self._cond:
+            self._purge(time.monotonic())
+
+    def status(self):
+        with self._cond:
+            return dict(running=dict(self._running), waiting=len(self._waiting),
+                        sessions=len(self._heavy_running), buckets=len(self._buckets),
+                        counts=dict(self.counts))
+
+
+def init_app(app, enabled=False, url_base='/_scheduler', **kwargs):
+    """schedule every dash callback request (only if enabled)"""
+    if not enabled:
+        return None
+
+    from flask import Response, g, jsonify, request
+    from elliptic.profiling import callback_name
+
+    scheduler = Scheduler(**kwargs)
+    server = app.server
+    update_path = app.config.requests_pathname_prefix + '_dash-update-component'
+
+    def session_id():
+        return request.cookies.get(cookie_name) or request.remote_addr or 'unknown'
+
+    @server.before_request
+    def take_slot():
+        if request.path != update_path:
+            return None
+        name = callback_name(app, request.get_json(silent=True) or {})
+        try:
+            g.schedule_ticket = scheduler.acquire(session_id(), name)
+        except Busy as busy:
+            return Response(json.dumps(dict(busy=True, reason=busy.reason)), status=429,
+                            mimetype='application/json',
+                            headers={'Retry-After': str(max(1, round(busy.retry_after)))})
+        return None
+
+    @server.teardown_request
+    def release_slot(exc):
+        if 'schedule_ticket' in g:
+            scheduler.release(g.pop('schedule_ticket'))
+
+    @server.after_request
+    def set_session_cookie(response):
+        if cookie_name not in request.cookies and response.mimetype == 'text/html':
+            response.set_cookie(cookie_name, uuid.uuid4().hex, httponly=True, samesite='Lax')
+        return response
+
+    def status():
+        scheduler.purge()
+        return jsonify(scheduler.status())
+
+    server.add_url_rule(url_base, 'scheduler_status', status)
+    return scheduler
@@ -0,0 +1,356 @@
+"""secp256k1 at full size: y^2 = x^3 + 7 over a 256-bit prime
+
+Points are affine (x, y) tuples with None for infinity; arithmetic runs in
+Jacobian coordinates so only one inversion is needed per result.
+
+Scalar multiplication uses the GLV endomorphism of a=0 curves:
+phi(x, y) = (beta*x, y) equals lambda*(x, y), so k*P = k1*P + k2*phi(P) with
+k1, k2 about 128 bits each. Both halves are written in width-w NAF and
+evaluated in one interleaved double-and-add loop, which halves the number of
+doublings. Verification (u1*G + u2*Q) interleaves four such half-scalars,
+with the table of odd multiples of G computed once.
+
+Signatures are ECDSA with RFC 6979 nonces and low s, and BIP-340 Schnorr.
+
+P is a number of the elliptic.arith backend (a gmpy2 mpz when installed), so
+the field arithmetic below runs in that backend. Coordinates handed out are ints.
+"""
+import functools
+import hashlib
+import hmac
+
+from elliptic import arith
+
+P = arith.num(2**256 - 2**32 - 977)
+N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+A = 0
+B = 7
+G = (0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+     0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8)
+
+# phi(x, y) = (BETA*x, y) = LAMBDA*(x, y)
+BETA = 0x7AE96A2B657C07106E64479EAC3434E99CF0497512F58995C1396C28719501EE
+LAMBDA = 0x5363AD4CC05C30E0A5261C028812645A122E22EA20816678DF02967C1B23BD72
+
+# short basis of the lattice {(k1, k2): k1 + k2*LAMBDA = 0 mod N}
+A1 = 0x3086D221A7D46BCDE86C90E49284EB15
+B1 = -0xE4437ED6010E88286F547FA90ABFE4C3
+A2 = 0x114CA50F7A8E2F3F657C1108D9D44CFD8
+B2 = A1
+
+W = 5 # window for arbitrary points
+W_G = 8 # window for the generator, its table is built once
+
+
+def on_curve(point):
+    if point is None:
+        return True
+    x, y = point
+    return (y*y - x*x*x - B) % P == 0
+
+
+def negate(point):
+    if point is None:
+        return None
+    return point[0], int(P - point[1])
+
+
+def endomorphism(point):
+    """phi(P) = LAMBDA*P, one field multiplication"""
+    if point is None:
+        return None
+    return BETA*point[0] % P, point[1]
+
+
+# Jacobian coordinates: (X, Y, Z) is (X/Z^2, Y/Z^3), Z = 0 is infinity
+
+def _double(X1, Y1, Z1):
+    if Z1 == 0 or Y1 == 0:
+        return 1, 1, 0
+    YY = Y1*Y1 % P
+    S = 4*X1*YY % P
+    M = 3*X1*X1 % P
+    X3 = (M*M - 2*S) % P
+    Y3 = (M*(S - X3) - 8*YY*YY) % P
+    Z3 = 2*Y1*Z1 % P
+    return X3, Y3, Z3
+
+
+def _add_affine(X1, Y1, Z1, x2, y2):
+    """Jacobian + affine"""
+    if Z1 == 0:
+        return x2, y2, 1
+    Z1Z1 = Z1*Z1 % P
+    U2 = x2*Z1Z1 % P
+    S2 = y2*Z1*Z1Z1 % P
+    H = (U2 - X1) % P
+    R = (S2 - Y1) % P
+    if H == 0:
+        if R == 0:
+            return _double(X1, Y1, Z1)
+        return 1, 1, 0
+    HH = H*H % P
+    HHH = H*HH % P
+    V = X1*HH % P
+    X3 = (R*R - HHH - 2*V) % P
+    Y3 = (R*(V - X3) - Y1*HHH) % P
+    Z3 = Z1*H % P
+    return X3, Y3, Z3
+
+
+def _to_affine(X, Y, Z):
+    if Z == 0:
+        return None
+    Z_inv = arith.inverse(Z, P)
+    Z_inv2 = Z_inv*Z_inv % P
+    return int(X*Z_inv2 % P), int(Y*Z_inv2*Z_inv % P)
+
+
+def add(p1, p2):
+    if p1 is None:
+        return p2
+    if p2 is None:
+        return p1
+    return _to_affine(*_add_affine(p1[0], p1[1], 1, *p2))
+
+
+def wnaf(k, w):
+    """width-w non-adjacent form of k >= 0, least significant digit first"""
+    digits = []
+    while k > 0:
+        if k & 1:
+            d = k % (1 << w)
+            if d >= 1 << (w - 1):
+                d -= 1 << w
+            k -= d
+        else:
+            d = 0
+        digits.append(d)
+        k >>= 1
+    return digits
+
+
+def split_scalar(k):
+    """k1, k2 with k = k1 + k2*LAMBDA (mod N) and |k1|, |k2| < 2**129"""
+    k %= N
+    c1 = (B2*k + N//2)//N
+    c2 = (-B1*k + N//2)//N
+    k1 = k - c1*A1 - c2*A2
+    k2 = -c1*B1 - c2*B2
+    return k1, k2
+
+
+def _batch_to_affine(points):
+    """Jacobian points (none at infinity) to affine with a single inversion"""
+    prefix = []
+    acc = 1
+    for _, _, Z in points:
+        prefix.append(acc)
+        acc = acc*Z % P
+    inv = arith.inverse(acc, P)
+    affine = [None]*len(points)
+    for i in range(len(points) - 1, -1, -1):
+        X, Y, Z = points[i]
+        Z_inv = inv*prefix[i] % P
+        inv = inv*Z % P
+        Z_inv2 = Z_inv*Z_inv % P
+        affine[i] = X*Z_inv2 % P, Y*Z_inv2*Z_inv % P
+    return affine
+
+
+def odd_multiples(point, w):
+    """[P, 3P, 5P, ..., (2**(w-1) - 1)P] in affine coordinates"""
+    twice = _to_affine(*_double(point[0], point[1], 1))
+    table = [(point[0], point[1], 1)]
+    for _ in range(2**(w - 2) - 1):
+        table.append(_add_affine(*table[-1], *twice))
+    return _batch_to_affine(table)
+
+
+@functools.lru_cache(maxsize=1)
+def generator_tables():
+    table = odd_multiples(G, W_G)
+    return table, [endomorphism(pt) for pt in table]
+
+
+def _interleave(terms):
+    """sum of k*P over (k, odd multiples table of P, w), k may be negative
+
+    the nonzero wNAF digits of all terms are first collected per bit, so the
+    main loop is just one doubling and a few mixed additions per bit
+    """
+    additions = {}
+    for k, table, w in terms:
+        negative = k < 0
+        for i, d in enumerate(wnaf(abs(k), w)):
+            if d != 0:
+                x, y = table[abs(d)//2]
+                if (d < 0) != negative:
+                    y = P - y
+                additions.setdefault(i, []).append((x, y))
+
+    X, Y, Z = 1, 1, 0
+    for i in range(max(additions, default=-1), -1, -1):
+        if Z != 0:
+            # doubling for a = 0, inlined
+            YY = Y*Y % P
+            S = 4*X*YY % P
+            M = 3*X*X % P
+            Z = 2*Y*Z % P
+            X = (M*M - 2*S) % P
+            Y = (M*(S - X) - 8*YY*YY) % P
+        for x, y in additions.get(i, ()):
+            X, Y, Z = _add_affine(X, Y, Z, x, y)
+    return _to_affine(X, Y, Z)
+
+
+def _glv_terms(k, point):
+    k1, k2 = split_scalar(k)
+    if point == G:
+        table, phi_table = generator_tables()
+        w = W_G
+    else:
+        table = odd_multiples(point, W)
+        phi_table = [endomorphism(pt) for pt in table]
+        w = W
+    return [(k1, table, w), (k2, phi_table, w)]
+
+
+def multiply(k, point=G):
+    """k*P with GLV decomposition and interleaved wNAF"""
+    if point is None or k % N == 0:
+        return None
+    return _interleave(_glv_terms(k, point))
+
+
+def multiply_add(u1, u2, point):
+    """u1*G + u2*Q in one interleaved loop (for verification)"""
+    if point is None:
+        return multiply(u1)
+    return _interleave(_glv_terms(u1, G) + _glv_terms(u2, point))
+
+
+def multiply_slow(k, point=G):
+    """plain double-and-add, kept to check multiply against"""
+    result = None
+    while k > 0:
+        if k & 1:
+            result = add(result, point)
+        point = add(point, point)
+        k >>= 1
+    return result
+
+
+def to_int(data):
+    return int.from_bytes(data, 'big')
+
+
+def to_bytes32(n):
+    return n.to_bytes(32, 'big')
+
+
+def parse_private_key(key):
+    """private key from a decimal or 0x-prefixed hex string"""
+    key = str(key).strip()
+    d = int(key, 16) if key.lower().startswith('0x') else int(key)
+    if not 0 < d < N:
+        raise ValueError('private key must be between 1 and n - 1')
+    return d
+
+
+def public_key(d):
+    return multiply(d)
+
+
+def compressed(point):
+    """SEC1 compressed encoding as hex"""
+    x, y = point
+    return ('03' if y & 1 else '02') + to_bytes32(x).hex()
+
+
+# ECDSA
+
+def rfc6979_nonce(d, z):
+    """deterministic k for private key d and hash z (RFC 6979, HMAC-SHA256)"""
+    x = to_bytes32(d)
+    h = to_bytes32(z % N)
+    K = b'\x00'*32
+    V = b'\x01'*32
+    K = hmac.new(K, V + b'\x00' + x + h, hashlib.sha256).digest()
+    V = hmac.new(K, V, hashlib.sha256).digest()
+    K = hmac.new(K, V + b'\x01' + x + h, hashlib.sha256).digest()
+    V = hmac.new(K, V, hashlib.sha256).digest()
+    while True:
+        V = hmac.new(K, V, hashlib.sha256).digest()
+        k = to_int(V)
+        if 0 < k < N:
+            return k
+        K = hmac.new(K, V + b'\x00', hashlib.sha256).digest()
+        V = hmac.new(K, V, hashlib.sha256).digest()
+
+
+def ecdsa_sign(d, z):
+    """(r, s) for private key d and message hash z, s normalized to <= N/2"""
+    k = rfc6979_nonce(d, z)
+    r = multiply(k)[0] % N
+    s = arith.inverse(k, N)*(z + r*d) % N
+    if s > N//2:
+        s = N - s
+    return r, s
+
+
+def ecdsa_verify(point, z, signature):
+    r, s = signature
+    if not (0 < r < N and 0 < s < N):
+        return False
+    w = arith.inverse(s, N)
+    R = multiply_add(z*w % N, r*w % N, point)
+    return R is not None and R[0] % N == r
+
+
+# Schnorr (BIP-340)
+
+def tagged_hash(tag, data):
+    tag_hash = hashlib.sha256(tag.encode()).digest()
+    return hashlib.sha256(tag_hash + tag_hash + data).digest()
+
+
+def lift_x(x):
+    """the point with x coordinate x and even y, None if there is none"""
+    if not 0 <= x < P:
+        return None
+    y = arith.sqrt((x*x*x + B) % P, P)
+    if y is None:
+        return None
+    return x, y if y % 2 == 0 else int(P - y)
+
+
+def schnorr_sign(d, message, aux=b'\x00'*32):
+    """64-byte BIP-340 signature of message (bytes) with private key d"""
+    pub = multiply(d)
+    if pub[1] % 2:
+        d = N - d
+    t = to_bytes32(d ^ to_int(tagged_hash('BIP0340/aux', aux)))
+    k = to_int(tagged_hash('BIP0340/nonce', t + to_bytes32(pub[0]) + message)) % N
+    if k == 0:
+        raise ValueError('nonce is zero')
+    R = multiply(k)
+    if R[1] % 2:
+        k = N - k
+    e = to_int(tagged_hash('BIP0340/challenge',
+                           to_bytes32(R[0]) + to_bytes32(pub[0]) + message)) % N
+    return to_bytes32(R[0]) + to_bytes32((k + e*d) % N)
+
+
+def schnorr_verify(pub_x, message, signature):
+    """check a BIP-340 signature against the x-only public key pub_x"""
+    point = lift_x(pub_x)
+    if point is None or len(signature) != 64:
+        return False
+    r, s = to_int(signature[:32]), to_int(signature[32:])
+    if r >= P or s >= N:
+        return False
+    e = to_int(tagged_hash('BIP0340/challenge',
+                           signature[:32] + to_bytes32(pub_x) + message)) % N
+    R = multiply_add(s, N - e, point)
+    return R is not None and R[1] % 2 == 0 and R[0] == r
@@ -0,0 +1,192 @@
+"""Server-side session store for per-user point state
+
+The dcc.Store components used to hold dicts keyed by str((p, a, b)) that the
+browser uploaded with every callback. They now hold only a small handle
+
+    {'session': <hex id>, 'rev': <int>}
+
+and the points themselves stay on the server. `rev` changes on every write so
+that downstream callbacks still fire when the store is updated.
+
+Each session keeps at most `max_curves` curve keys (least recently used are
+evicted first, reading a curve key through `curves` counts as a use) and
+expires `ttl` seconds after its last write.
+"""
+import copy
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+
+_sid_pattern = re.compile('[0-9a-f]{32}')
+
+
+class MemoryBackend:
+    """keep sessions in this process, callers get and give copies of the records"""
+
+    def __init__(self):
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def load(self, sid):
+        with self._lock:
+            return copy.deepcopy(self._records.get(sid))
+
+    def save(self, sid, record):
+        record = copy.deepcopy(record)
+        with self._lock:
+            self._records[sid] = record
+
+    def delete(self, sid):
+        with self._lock:
+            self._records.pop(sid, None)
+
+    def sids(self):
+        with self._lock:
+            return list(self._records)
+
+
+class DiskBackend:
+    """keep sessions as json files in a local directory (survives restarts)"""
+
+    def __init__(self, path='.sessions'):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _fname(self, sid):
+        return os.path.join(self.path, sid + '.json')
+
+    def load(self, sid):
+        try:
+            with open(self._fname(sid)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, sid, record):
+        fname = self._fname(sid)
+        tmp = '{}.{}.tmp'.format(fname, threading.get_ident())
+        with open(tmp, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp, fname)
+
+    def delete(self, sid):
+        try:
+            os.remove(self._fname(sid))
+        except OSError:
+            pass
+
+    def sids(self):
+        return [fname[:-len('.json')] for fname in os.listdir(self.path)
+                if fname.endswith('.json')]
+
+
+backends = dict(memory=MemoryBackend, disk=DiskBackend)
+
+
+class SessionStore:
+    """points per session, keyed by curve"""
+
+    def __init__(self, backend=None, max_curves=16, ttl=3600, purge_every=256):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.max_curves = max_curves
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock() # around load-modify-save of a record
+
+    @staticmethod
+    def session_id(handle):
+        """session id of a browser handle, None if missing or malformed"""
+        if not isinstance(handle, dict):
+            return None
+        sid = handle.get('session')
+        if isinstance(sid, str) and _sid_pattern.fullmatch(sid):
+            return sid
+        return None
+
+    def _load(self, sid):
+        if sid is None:
+            return None
+        record = self.backend.load(sid)
+        if record is None:
+            return None
+        if record['expires'] < time.time():
+            self.backend.delete(sid)
+            return None
+        return record
+
+    def curves(self, handle, curve_key=None):
+        """return {curve_key: points} for this handle
+
+        None if there is no handle (as with an empty dcc.Store),
+        empty if the session has expired. Reading curve_key makes it the most
+        recently used, so it is evicted last.
+        """
+        if handle is None:
+            return None
+        sid = self.session_id(handle)
+        with self._lock:
+            record = self._load(sid)
+            if record is None:
+                return {}
+            curves = record['curves']
+            if curve_key in curves and list(curves)[-1] != curve_key:
+                curves[curve_key] = curves.pop(curve_key)
+                self.backend.save(sid, record)
+        return curves
+
+    def update(self, handle, curve_key, points):
+        """store points for curve_key and return the new browser handle"""
+        sid = self.session_id(handle)
+        with self._lock:
+            record = self._load(sid)
+            if record is None:
+                if sid is None:
+                    sid = uuid.uuid4().hex
+                record = dict(rev=0, curves={})
+
+            curves = record['curves']
+            curves.pop(curve_key, None) # most recent goes last
+            curves[curve_key] = points
+            while len(curves) > self.max_curves:
+                del curves[next(iter(curves))]
+
+            record['rev'] += 1
+            record['expires'] = time.time() + self.ttl
+            self.backend.save(sid, record)
+
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            self.purge()
+
+        return dict(session=sid, rev=record['rev'])
+
+    def purge(self):
+        """drop expired sessions"""
+        now = time.time()
+        for sid in self.backend.sids():
+            with self._lock:
+                record = self.backend.load(sid)
+                if record is not None and record['expires'] < now:
+                    self.backend.delete(sid)
+
+    def __len__(self):
+        return len(self.backend.sids())
+
+
+session_store = SessionStore()
+
+
+def configure(backend='memory', max_curves=16, ttl=3600, **backend_kwargs):
+    """configure the shared session store (see session_store in elliptic.yaml)"""
+    if backend not in backends:
+        raise ValueError('unknown session backend {}'.format(backend))
+    session_store.backend = backends[backend](**backend_kwargs)
+    session_store.max_curves = max_curves
+    session_store.ttl = ttl
+    logging.debug('session store: {} backend, {} curves, ttl {}'.format(backend, max_curves, ttl))
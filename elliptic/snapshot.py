@@ -0,0 +1,97 @@
+"""Compiled snapshot of elliptic.yaml for fast startup
+
+load_conf resolves every OmegaConf interpolation of elliptic.yaml and
+load_components then builds the whole component tree. Both only depend on
+the yaml file (and the installed component libraries), so the result is
+pickled under `.cache/` keyed by a hash of the file contents and those
+library versions. An edited yaml file gets a new hash and is compiled again.
+
+Build ahead of time (e.g. in a deploy step) with
+
+    python -m elliptic.snapshot elliptic.yaml
+
+The snapshot holds the resolved config (including the callbacks section the
+callback map is registered from) and the layout tree.
+"""
+import functools
+import glob
+import hashlib
+import importlib
+import logging
+import os
+import pickle
+import sys
+
+
+cache_dir = '.cache'
+FORMAT = 1 # bump when the snapshot contents change
+
+
+@functools.lru_cache(maxsize=1)
+def _versions():
+    versions = []
+    for name in ['dash', 'dash_bootstrap_components', 'dash_daq', 'omegaconf', 'psidash']:
+        try:
+            version = getattr(importlib.import_module(name), '__version__', None)
+        except ImportError:
+            version = None
+        versions.append('{}={}'.format(name, version))
+    return ';'.join(versions)
+
+
+def file_hash(fname):
+    """hash of the yaml file, the snapshot format and the component library versions"""
+    h = hashlib.sha256()
+    with open(fname, 'rb') as f:
+        h.update(f.read())
+    h.update('{};{}'.format(FORMAT, _versions()).encode())
+    return h.hexdigest()[:16]
+
+
+def snapshot_path(fname):
+    base = os.path.splitext(os.path.basename(fname))[0]
+    return os.path.join(cache_dir, '{}-{}.pkl'.format(base, file_hash(fname)))
+
+
+def compile_conf(fname):
+    """(conf, layout) straight from the yaml file"""
+    from psidash.psidash import load_conf, load_components
+
+    conf = load_conf(fname)
+    layout = load_components(conf['layout'], conf.get('import'))
+    return conf, layout
+
+
+def build(fname):
+    """compile fname and write its snapshot, removing stale ones"""
+    conf, layout = compile_conf(fname)
+    path = snapshot_path(fname)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp, 'wb') as f:
+        pickle.dump((conf, layout), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+    base = os.path.splitext(os.path.basename(fname))[0]
+    for old in glob.glob(os.path.join(cache_dir, base + '-*.pkl')):
+        if old != path:
+            os.remove(old)
+    return conf, layout
+
+
+def load(fname):
+    """(conf, layout) from the snapshot if it is current, compiling it otherwise"""
+    path = snapshot_path(fname)
+    if os.path.exists(path):
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as m: # unreadable snapshot, rebuild it
+            logging.warning('could not load snapshot {}: {}'.format(path, m))
+    return build(fname)
+
+
+if __name__ == '__main__':
+    for fname in sys.argv[1:] or ['elliptic.yaml']:
+        build(fname)
+        print(snapshot_path(fname))
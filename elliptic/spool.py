@@ -0,0 +1,84 @@
+"""Short-lived files on the server for uploads and downloads
+
+Large payloads (files to encrypt, documents to sign) are written here chunk
+by chunk and handed around by token, so callbacks never hold them in memory.
+Files older than ttl seconds are removed on the next save.
+"""
+import base64
+import os
+import re
+import time
+import uuid
+
+
+CHUNK_SIZE = 64*1024
+
+_token_pattern = re.compile('[0-9a-f]{32}')
+
+
+def read_chunks(f, size=CHUNK_SIZE):
+    """iterate over a binary file-like object in chunks"""
+    return iter(lambda: f.read(size), b'')
+
+
+def b64_chunks(data, size=CHUNK_SIZE):
+    """decode a base64 string a chunk at a time"""
+    step = 4*(size//3)
+    for i in range(0, len(data), step):
+        yield base64.b64decode(data[i:i + step])
+
+
+class Spool:
+    """a directory of files named by random tokens"""
+
+    def __init__(self, path, ttl=600):
+        self.dir = path
+        self.ttl = ttl
+
+    def purge(self):
+        """remove files older than ttl"""
+        if not os.path.isdir(self.dir):
+            return
+        now = time.time()
+        for fname in os.listdir(self.dir):
+            path = os.path.join(self.dir, fname)
+            try:
+                if os.path.getmtime(path) < now - self.ttl:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def save(self, chunks):
+        """write chunks to a new file, return its token
+
+        the partial file is removed if the chunks raise
+        """
+        self.purge()
+        os.makedirs(self.dir, exist_ok=True)
+        token = uuid.uuid4().hex
+        path = os.path.join(self.dir, token)
+        try:
+            with open(path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return token
+
+    def path(self, token):
+        """path of the file for token, None if unknown or expired"""
+        if not isinstance(token, str) or not _token_pattern.fullmatch(token):
+            return None
+        path = os.path.join(self.dir, token)
+        if not os.path.isfile(path):
+            return None
+        return path
+
+    def chunks(self, token, size=CHUNK_SIZE):
+        """iterate over the file for token in chunks"""
+        path = self.path(token)
+        if path is None:
+            raise KeyError(token)
+        with open(path, 'rb') as f:
+            yield from read_chunks(f, size)
@@ -0,0 +1,215 @@
+"""Locally bundled stylesheets/scripts and compressed responses
+
+The external_stylesheets and external_scripts of elliptic.yaml come from
+CDNs. Fetch them once on a machine with network access
+
+    python -m elliptic.static elliptic.yaml
+
+which mirrors every url under `vendor/<host>/<path>`, including the whole
+MathJax release the MathJax.js loader pulls its extensions and fonts from,
+and stores a gzip (and brotli, if installed) copy of each file next to it.
+Copy `vendor/` along with the repo to an offline host.
+
+With `static_assets: local: True` main.py points those urls at /_vendor/,
+served with a long max-age. Urls without a local copy stay on the CDN.
+
+init_app also compresses dash responses (layout, dependencies, callback
+responses, component bundles) above min_size bytes with brotli or gzip,
+whichever the browser accepts. Fingerprinted component bundles are only
+compressed once per encoding.
+"""
+import gzip
+import io
+import logging
+import mimetypes
+import os
+import re
+import sys
+import urllib.request
+import zipfile
+from urllib.parse import urljoin, urlparse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+vendor_dir = 'vendor'
+url_base = '/_vendor/'
+
+# MathJax.js loads config/, jax/, extensions/ and fonts/ relative to itself
+_mathjax_pattern = re.compile(r'/mathjax/([0-9.]+)/MathJax\.js$', re.IGNORECASE)
+_mathjax_release = 'https://github.com/mathjax/MathJax/archive/{}.zip'
+_mathjax_skip = ('unpacked/', 'test/', 'docs/', 'fonts/HTML-CSS/TeX/png/')
+
+_css_url = re.compile(r'url\(\s*[\'"]?([^\'")]+)[\'"]?\s*\)')
+
+compressible = ('application/json', 'application/javascript', 'text/javascript',
+                'text/html', 'text/css', 'text/plain', 'image/svg+xml')
+
+
+def local_path(url, path=vendor_dir):
+    """file a url is mirrored to"""
+    parsed = urlparse(url)
+    return os.path.join(path, parsed.netloc, parsed.path.lstrip('/'))
+
+
+def local_url(url, path=vendor_dir, url_base=url_base):
+    """/_vendor/ url of a mirrored file (query kept), the url itself if there is no copy"""
+    if not os.path.isfile(local_path(url, path)):
+        logging.warning('no local copy of {}, run python -m elliptic.static'.format(url))
+        return url
+    parsed = urlparse(url)
+    local = url_base + parsed.netloc + parsed.path
+    return local + ('?' + parsed.query if parsed.query else '')
+
+
+def localize(app_conf, path=vendor_dir, url_base=url_base):
+    """point the external urls of a resolved `app:` section at the local copies"""
+    for kwargs in app_conf.values():
+        for key in ['external_stylesheets', 'external_scripts']:
+            if key in kwargs:
+                kwargs[key] = [local_url(url, path, url_base) for url in kwargs[key]]
+    return app_conf
+
+
+def _download(url):
+    logging.info('fetching {}'.format(url))
+    with urllib.request.urlopen(url, timeout=60) as response:
+        return response.read()
+
+
+def _write(fname, data):
+    os.makedirs(os.path.dirname(fname), exist_ok=True)
+    with open(fname, 'wb') as f:
+        f.write(data)
+    precompress(fname, data)
+
+
+def precompress(fname, data):
+    """fname.gz (and fname.br) next to a vendored file"""
+    with open(fname + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, 9))
+    if brotli is not None:
+        with open(fname + '.br', 'wb') as f:
+            f.write(brotli.compress(data))
+
+
+def _fetch_mathjax(url, version, path):
+    """unpack the MathJax release into the directory of MathJax.js"""
+    base = os.path.dirname(local_path(url, path))
+    with zipfile.ZipFile(io.BytesIO(_download(_mathjax_release.format(version)))) as release:
+        for info in release.infolist():
+            name = info.filename.split('/', 1)[-1] # strip MathJax-<version>/
+            if info.is_dir() or not name or name.startswith(_mathjax_skip):
+                continue
+            _write(os.path.join(base, name), release.read(info))
+
+
+def fetch(urls, path=vendor_dir):
+    """mirror urls (and the fonts/images their css refers to) under path"""
+    for url in urls:
+        parsed = urlparse(url)
+        mathjax = _mathjax_pattern.search(parsed.path)
+        if mathjax is not None:
+            _fetch_mathjax(url, mathjax.group(1), path)
+            continue
+        data = _download(url)
+        _write(local_path(url, path), data)
+        if parsed.path.endswith('.css'):
+            for ref in _css_url.findall(data.decode('utf8', 'replace')):
+                if ref.startswith(('data:', 'http:', 'https:', '//')):
+                    if not ref.startswith('data:'):
+                        logging.warning('{} refers to {}, which stays remote'.format(url, ref))
+                    continue
+                ref_url = urljoin(url, ref.split('#')[0].split('?')[0])
+                _write(local_path(ref_url, path), _download(ref_url))
+
+
+def accepted_encoding(accept_encoding):
+    """'br', 'gzip' or None for an Accept-Encoding header"""
+    accepted = {part.split(';')[0].strip() for part in accept_encoding.lower().split(',')}
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, level=6):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, level)
+
+
+def register_routes(server, path=vendor_dir, url_base=url_base, max_age=31536000):
+    """serve the vendored files, picking a precompressed copy when accepted"""
+    from flask import request, send_from_directory
+
+    root = os.path.abspath(path)
+
+    def vendored(fname):
+        encoding = accepted_encoding(request.headers.get('Accept-Encoding', ''))
+        suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding)
+        if suffix and os.path.isfile(os.path.join(root, fname + suffix)):
+            response = send_from_directory(root, fname + suffix, max_age=max_age)
+            response.mimetype = mimetypes.guess_type(fname)[0] or 'application/octet-stream'
+            response.headers['Content-Encoding'] = encoding
+        else:
+            response = send_from_directory(root, fname, max_age=max_age)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.cache_control.public = True
+        return response
+
+    server.add_url_rule(url_base + '<path:fname>', 'vendored', vendored)
+
+
+def init_app(app, local=False, path=vendor_dir, max_age=31536000,
+             compression=True, min_size=1024, level=6):
+    """vendored file routes and response compression for a dash app
+
+    the external urls themselves are rewritten by localize before the app is built
+    """
+    if local:
+        register_routes(app.server, path, url_base, max_age)
+    if not compression:
+        return
+
+    from flask import request
+
+    bundles = {} # (path, encoding) -> compressed fingerprinted component bundle
+
+    @app.server.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in compressible):
+            return response
+        encoding = accepted_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+        response.vary.add('Accept-Encoding')
+        if response.calculate_content_length() < min_size:
+            return response
+
+        if response.cache_control.max_age: # fingerprinted, never changes
+            key = (request.path, encoding)
+            if key not in bundles:
+                bundles[key] = compress(response.get_data(), encoding, level)
+            data = bundles[key]
+        else:
+            data = compress(response.get_data(), encoding, level)
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+if __name__ == '__main__':
+    from psidash.psidash import load_conf
+
+    logging.basicConfig(level=logging.INFO)
+    for fname in sys.argv[1:] or ['elliptic.yaml']:
+        conf = load_conf(fname)
+        fetch(list(conf.get('external_stylesheets', [])) + list(conf.get('external_scripts', [])),
+              conf.get('static_assets', {}).get('path', vendor_dir))
@@ -0,0 +1,47 @@
+"""Lazy tab contents
+
+Only the initially active tab of the `lesson` tabs ships with the page. Every
+other tab starts as an empty placeholder Div (id `tab-<tab_id>`) and
+dashboard.render_tab fills it in the first time that tab is activated. Dash
+then fires the initial callbacks of the new components, so each tab's
+figures are only computed once a student opens it.
+
+The loaded-tabs store remembers which tabs a page already has, so switching
+back and forth does not resend them.
+"""
+import copy
+
+import dash.html as html
+
+
+contents = {} # tab_id -> children of the tab
+
+
+def placeholder_id(tab_id):
+    return 'tab-' + tab_id
+
+
+def find(layout, id_):
+    for component in [layout] + list(layout._traverse()):
+        if getattr(component, 'id', None) == id_:
+            return component
+    return None
+
+
+def split(layout, tabs_id='lesson', store_id='loaded-tabs'):
+    """move tab children out of layout into placeholders
+
+    returns a copy of the full layout (for app.validation_layout)
+    """
+    full = copy.deepcopy(layout)
+    tabs = find(layout, tabs_id)
+    active = tabs.active_tab
+    for tab in tabs.children:
+        contents[tab.tab_id] = tab.children
+        tab.children = html.Div(id=placeholder_id(tab.tab_id),
+                                children=tab.children if tab.tab_id == active else None)
+        full_tab = [t for t in find(full, tabs_id).children if t.tab_id == tab.tab_id][0]
+        full_tab.children = html.Div(id=placeholder_id(tab.tab_id), children=full_tab.children)
+    find(layout, store_id).data = [active]
+    find(full, store_id).data = [active]
+    return full
@@ -14,16 +14,50 @@
 # ---
 
 # +
-from omegaconf import OmegaConf
-from psidash.psidash import load_app, load_conf, load_dash, load_components, get_callbacks, assign_callbacks
+from psidash.psidash import load_dash, load_components, get_callbacks, assign_callbacks
+from elliptic import sessions, cipher, profiling, counters, snapshot, tabs, static, api, scheduler, patterns, memory
+
+conf, layout = snapshot.load('elliptic.yaml') # resolved config and layout, cached by file hash
+
+if 'session_store' in conf:
+    sessions.configure(**conf['session_store'])
+
+if conf.get('static_assets', {}).get('local'):
+    static.localize(conf['app'], conf['static_assets'].get('path', static.vendor_dir))
+
+op_counts = conf.get('op_counters', {}).get('enabled', False)
+if op_counts: # debug panel only where counting is on
+    layout.children.append(load_components(conf['op_counts_panel'], conf.get('import')))
 
-conf = load_conf('elliptic.yaml')
 app = load_dash(__name__, conf['app'], conf.get('import'))
-app.layout = load_components(conf['layout'], conf.get('import'))
+app.layout = layout
+app.validation_layout = tabs.split(app.layout) # tabs other than the active one load lazily
+cipher.register_routes(app.server)
+
+if 'api' in conf:
+    api.register_routes(app.server, **conf['api'])
+
+if 'static_assets' in conf:
+    static.init_app(app, **conf['static_assets'])
+
+if 'scheduler' in conf: # first, so turned away requests skip the other hooks
+    scheduler.init_app(app, **conf['scheduler'])
+
+if 'profiling' in conf:
+    profiling.init_app(app, **conf['profiling'])
+
+if 'op_counters' in conf:
+    counters.init_app(app, **conf['op_counters'])
+
+if 'memory' in conf:
+    memory.init_app(app, **conf['memory'])
 
 if 'callbacks' in conf:
-    callbacks = get_callbacks(app, conf['callbacks'])
-    assign_callbacks(callbacks, conf['callbacks'])
+    callbacks_conf = patterns.resolve(conf['callbacks']) # MATCH/ALL in dict ids
+    if not op_counts:
+        del callbacks_conf['render_op_counts']
+    callbacks = get_callbacks(app, callbacks_conf)
+    assign_callbacks(callbacks, callbacks_conf)
 
 
 if __name__ == '__main__':
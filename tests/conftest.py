@@ -0,0 +1,35 @@
+import pytest
+
+from elliptic.curve import _ecc
+
+
+@pytest.fixture(scope='session')
+def ecc():
+    """(FieldElement, Point) of programmingbitcoin's ecc, the semantics the package replaced"""
+    types = _ecc()
+    if types is None:
+        pytest.skip('programmingbitcoin ecc not found')
+    return types
+
+
+def ecc_xy(point):
+    """(x, y) ints of an ecc.Point, None at infinity"""
+    if point.x is None:
+        return None
+    return point.x.num, point.y.num
+
+
+@pytest.fixture(scope='session')
+def dashboard(tmp_path_factory):
+    """elliptic.dashboard, imported from a scratch directory so its elliptic.log lands there"""
+    import os
+    import sys
+
+    if 'elliptic.dashboard' not in sys.modules:
+        cwd = os.getcwd()
+        os.chdir(tmp_path_factory.mktemp('dashboard'))
+        try:
+            import elliptic.dashboard # noqa: F401
+        finally:
+            os.chdir(cwd)
+    return sys.modules['elliptic.dashboard']
@@ -0,0 +1,153 @@
+import pytest
+
+from elliptic import api
+from elliptic.curve import get_curve
+from elliptic.group import GroupStructure
+from elliptic.sessions import session_store
+
+
+curve = {'p': 37, 'a': 0, 'b': 7}
+G = [18, 17]
+
+
+@pytest.fixture
+def client():
+    flask = pytest.importorskip('flask')
+    server = flask.Flask(__name__)
+    api.register_routes(server, max_requests=3, max_p=1000, max_bits=64)
+    return server.test_client()
+
+
+def post(client, operation, body):
+    return client.post('/api/' + operation, json=body)
+
+
+def test_index(client):
+    response = client.get('/api/')
+    assert response.status_code == 200
+    assert response.json == dict(operations=sorted(api.operations), max_requests=3, max_prime=1000,
+                                 max_scalar_bits=64)
+
+
+def test_unknown_operation(client):
+    assert post(client, 'divide', dict(curve=curve, requests=[])).status_code == 404
+    with pytest.raises(KeyError):
+        api.run('divide', [])
+
+
+def test_method_not_allowed(client):
+    assert client.get('/api/add').status_code == 405
+
+
+@pytest.mark.parametrize('body', [None, [], 'requests', {}, {'requests': {}}, {'requests': 'P'},
+                                  {'requests': [1]}, {'requests': [{'P': G}, None]}])
+def test_bad_body(client, body):
+    response = client.post('/api/add', json=body) if body is not None else \
+        client.post('/api/add', data='{not json', content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_too_many_requests(client):
+    body = dict(curve=curve, requests=[dict(P=G, Q=G)]*4)
+    assert post(client, 'add', body).status_code == 413
+    body['requests'] = body['requests'][:3]
+    assert post(client, 'add', body).status_code == 200
+
+
+@pytest.mark.parametrize('operation, request_, error', [
+    ('add', dict(P=G), 'KeyError'), # no Q
+    ('add', dict(P=G, Q=[1, 1]), 'is not on the curve'),
+    ('add', dict(P=G, Q=[18 + 37, 17]), 'is not on the curve'),
+    ('add', dict(P=G, Q=[18]), 'ValueError'),
+    ('add', dict(P=G, Q=7), 'TypeError'),
+    ('multiply', dict(P=G, n='three'), 'ValueError'),
+    ('multiply', dict(P=G, n=3, curve={'p': 35, 'a': 0, 'b': 7}), 'not an odd prime'),
+    ('multiply', dict(P=G, n=3, curve={'p': 2, 'a': 0, 'b': 1}), 'not an odd prime'),
+    ('multiply', dict(P=G, n=3, curve={'p': 37, 'a': 0, 'b': 0}), 'singular'),
+    ('multiply', dict(P=G, n=3, curve={'p': 37, 'a': 0}), 'KeyError'),
+    ('order', dict(curve={'p': 1009, 'a': 0, 'b': 7}), 'p is limited to 1000'),
+    ('add', dict(P=None, Q=None, curve={'p': 1009, 'a': 0, 'b': 7}), 'p is limited to 1000'),
+    ('multiply', dict(P=G, n=2**64), 'limited to 64 bits'),
+    ('multiply', dict(P=G, n=-2**64), 'limited to 64 bits'),
+    ('sign', dict(G=G, d=3, k=5, z=2**64), 'limited to 64 bits'),
+    ('sign', dict(G=G, d=3, k=5), 'z or message required'),
+    ('inverse-multiply', dict(P=G, n=0), 'has no inverse'),
+    ])
+def test_request_errors(client, operation, request_, error):
+    response = post(client, operation, dict(curve=curve, requests=[request_, dict(P=G, Q=G, n=2)]))
+    assert response.status_code == 200
+    bad, good = response.json['results']
+    assert 'error' in bad and error in bad['error']
+    if operation in ('add', 'multiply'):
+        assert good == dict(R=list((2*get_curve(37, 0, 7).point(*G)).xy))
+
+
+def test_missing_curve(client):
+    response = post(client, 'add', dict(requests=[dict(P=G, Q=G)]))
+    assert 'error' in response.json['results'][0]
+
+
+def test_results(client):
+    C = get_curve(37, 0, 7)
+    P = C.point(*G)
+    H = 5*P
+
+    results = post(client, 'add', dict(curve=curve, requests=[
+        dict(P=G, Q=G), dict(P=G, Q=list((-P).xy)), dict(P=None, Q=G)])).json['results']
+    assert results == [dict(R=list((P + P).xy)), dict(R=None), dict(R=G)]
+
+    results = post(client, 'multiply', dict(curve=curve, requests=[
+        dict(P=G, n=n) for n in (0, 5, -2)])).json['results']
+    assert results == [dict(R=None), dict(R=list(H.xy)), dict(R=list((-2*P).xy))]
+
+    group = GroupStructure(37, 0, 7)
+    results = post(client, 'order', dict(curve=curve, requests=[{}])).json['results']
+    assert results == [dict(order=group.order, n1=group.n1, n2=group.n2, cyclic=group.n2 == 1)]
+
+    n = group.point_order(*G)
+    results = post(client, 'subgroup-order', dict(curve=curve, requests=[
+        dict(P=G), dict(P=None)])).json['results']
+    assert results == [dict(order=n), dict(order=1)]
+
+    results = post(client, 'inverse-multiply', dict(curve=curve, requests=[dict(P=list(H.xy), n=5)]))
+    assert results.json['results'] == [dict(Q=G, order=n)]
+
+
+def test_sign_and_verify(client):
+    d, k = 7, 3
+    H = list((d*get_curve(37, 0, 7).point(*G)).xy)
+    signed = post(client, 'sign', dict(curve=curve, requests=[
+        dict(G=G, d=d, k=k, message='hello'), dict(G=G, d=d, k=0, z=1)])).json['results']
+    assert 'error' in signed[1]
+    r, s = signed[0]['r'], signed[0]['s']
+
+    z = signed[0]['z']
+    checks = [dict(G=G, H=H, message='hello', r=r, s=s),
+              dict(G=G, H=H, z=z + 1, r=r, s=s),
+              dict(G=G, H=H, z=z, r=0, s=s)]
+    results = post(client, 'verify', dict(curve=curve, requests=checks)).json['results']
+    assert results == [dict(valid=True), dict(valid=False), dict(valid=False)]
+
+
+def test_dashboard_signature_verifies(client, dashboard):
+    """(z, r, s) signed on the ECDSA tab checks out through /api/verify"""
+    p_i, d, k = dashboard.primes_.index(37), 7, 3
+    C = get_curve(37, 0, 7)
+    P = C.point(*G)
+    curve_key = str((37, 0, 7))
+    pub_points = session_store.update(None, curve_key, [G, list((d*P).xy)])
+    secret_points = session_store.update(None, curve_key, [G, list((k*P).xy)])
+
+    for message in ['hello', 'a longer message to sign']:
+        _, signature = dashboard.render_sign_params(p_i, 0, 7, d, k, pub_points, secret_points, message)
+        z, r, s = dashboard.md_str_to_tuple(signature)
+        assert r == (k*P).x % GroupStructure(37, 0, 7).point_order(*G)
+
+        signed = post(client, 'sign', dict(curve=curve, requests=[dict(G=G, d=d, k=k, message=message)]))
+        assert signed.json['results'][0]['z'] == z
+        assert (signed.json['results'][0]['r'], signed.json['results'][0]['s']) == (r, s)
+
+        checks = [dict(G=G, H=list((d*P).xy), message=message, r=r, s=s),
+                  dict(G=G, H=list((d*P).xy), z=z, r=r, s=s)]
+        results = post(client, 'verify', dict(curve=curve, requests=checks)).json['results']
+        assert results == [dict(valid=True), dict(valid=True)]
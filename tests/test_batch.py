@@ -0,0 +1,145 @@
+import numpy as np
+import pytest
+
+from elliptic.batch import FieldArray, PointBatch, batch_inverse, curve_points, multiples, on_curve, sqrt_mod, sqrt_table
+
+from tests.conftest import ecc_xy
+
+
+# (0, 0) on y^2 = x^3 + x mod 43 and (4, 0) on y^2 = x^3 + 7 mod 71 have order 2
+curves = [(37, 0, 7), (43, 1, 0), (71, 0, 7), (2**31 + 11, 0, 7)]
+
+
+def small_points(p, a, b, count=12):
+    """(x, y) of up to count points, with any point of order 2 among them"""
+    if p > 2**16:
+        return [(x, y) for x in range(2, 200) for y in [pow(x**3 + a*x + b, (p + 1)//4, p)]
+                if (y*y - x**3 - a*x - b) % p == 0][:count]
+    xs, ys = curve_points(p, a, b)
+    points = list(zip(xs.tolist(), ys.tolist()))
+    order_2 = [pt for pt in points if pt[1] == 0]
+    return order_2 + points[::max(1, len(points)//count)][:count]
+
+
+@pytest.mark.parametrize('p', [7, 223, 2**31 - 1, 2**61 - 1])
+def test_field_matches_field_element(ecc, p):
+    FieldElement, _ = ecc
+    rng = np.random.default_rng(p % 2**32)
+    xs = [0, 1, p - 1] + [int(n) for n in rng.integers(0, min(p, 2**62), 20)]
+    ys = [0, p - 1, 1] + [int(n) for n in rng.integers(0, min(p, 2**62), 20)]
+    X, Y = FieldArray(xs, p), FieldArray(ys, p)
+    fx = [FieldElement(x % p, p) for x in xs]
+    fy = [FieldElement(y % p, p) for y in ys]
+
+    assert (X + Y).num.tolist() == [(a + b).num for a, b in zip(fx, fy)]
+    assert (X - Y).num.tolist() == [(a - b).num for a, b in zip(fx, fy)]
+    assert (X*Y).num.tolist() == [(a*b).num for a, b in zip(fx, fy)]
+    assert (X**5).num.tolist() == [(a**5).num for a in fx]
+    assert (X**-3).num.tolist() == [(a**-3).num for a in fx]
+    assert (3*X).num.tolist() == [(3*a).num for a in fx]
+    # ecc divides by zero as a*0^(p-2) = 0, and so does FieldArray
+    assert (X/Y).num.tolist() == [(a/b).num for a, b in zip(fx, fy)]
+
+
+def test_inverse_of_zero_is_zero():
+    p = 101
+    num = np.array([0, 1, 0, 5, 100, 0, 7])
+    inv = FieldArray(num, p).inverse().num
+    assert inv.tolist() == [0 if n == 0 else pow(int(n), -1, p) for n in num]
+    assert FieldArray([0], p).inverse().num.tolist() == [0]
+    assert FieldArray(np.zeros(0, dtype=np.int64), p).inverse().num.shape == (0,)
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 65])
+def test_batch_inverse(size):
+    p = 2**61 - 1
+    num = FieldArray(np.arange(size) * 977 + 1, p).num
+    inv = batch_inverse(num, p)
+    assert [int(n)*int(i) % p for n, i in zip(num, inv)] == [1]*size
+
+
+# p = 3 mod 4 takes one power, the others Tonelli-Shanks with 2, 4 and 2**8 | p - 1
+@pytest.mark.parametrize('p', [3, 5, 7, 13, 17, 41, 103, 257, 7681, 65537])
+def test_sqrt_mod(p):
+    roots = sqrt_mod(np.arange(p), p)
+    squares = {x*x % p: min(x, p - x) for x in range(p)}
+    assert roots.tolist() == [squares.get(v, -1) for v in range(p)]
+    assert sqrt_mod([p + 4, -1], p).tolist() == [squares[4 % p], squares.get(p - 1, -1)]
+    assert sqrt_table(p).tolist() == roots.tolist()
+
+
+def test_sqrt_mod_large():
+    p = 7340033 # 7*2**20 + 1
+    num = np.random.default_rng(1).integers(0, p, 1000)
+    roots = sqrt_mod(num, p)
+    euler = np.array([pow(int(v), (p - 1)//2, p) for v in num])
+    assert np.array_equal(roots >= 0, euler != p - 1)
+    assert np.all((roots < 0) | (roots*roots % p == num)) and np.all(roots <= p//2)
+
+
+def test_fields_do_not_mix():
+    with pytest.raises(TypeError):
+        FieldArray([1], 7) + FieldArray([1], 11)
+
+
+@pytest.mark.parametrize('p, a, b', curves)
+def test_addition_matches_point(ecc, p, a, b):
+    FieldElement, Point = ecc
+    F = lambda n: FieldElement(n % p, p)
+    points = small_points(p, a, b) + [None]
+    eccs = [Point(None, None, F(a), F(b)) if pt is None else Point(F(pt[0]), F(pt[1]), F(a), F(b))
+            for pt in points]
+
+    # every pair, including P + P, P + (-P) and both sides of infinity
+    pairs = [(i, j) for i in range(len(points)) for j in range(len(points))]
+    negated = [None if pt is None else (pt[0], -pt[1] % p) for pt in points]
+    left = [points[i] for i, _ in pairs] + points
+    right = [points[j] for _, j in pairs] + negated
+
+    def batch(pts):
+        return PointBatch(np.array([0 if pt is None else pt[0] for pt in pts], dtype=object),
+                          np.array([0 if pt is None else pt[1] for pt in pts], dtype=object),
+                          a, b, p, inf=[pt is None for pt in pts])
+
+    expected = [ecc_xy(eccs[i] + eccs[j]) for i, j in pairs] + [None]*len(points)
+    total = batch(left) + batch(right)
+    assert total.to_list() == expected
+    assert total.on_curve().all()
+
+
+@pytest.mark.parametrize('p, a, b', curves)
+def test_multiply_matches_point(ecc, p, a, b):
+    FieldElement, Point = ecc
+    F = lambda n: FieldElement(n % p, p)
+    x, y = small_points(p, a, b)[-1]
+    G = Point(F(x), F(y), F(a), F(b))
+    ks = list(range(12)) + [p + 1, 2*p + 3]
+
+    batch = PointBatch.repeat(x, y, a, b, p, len(ks)).multiply(np.array(ks, dtype=object))
+    assert batch.to_list() == [ecc_xy(k*G) for k in ks]
+    assert (-batch).to_list() == PointBatch.repeat(x, -y, a, b, p, len(ks)).multiply(
+        np.array(ks, dtype=object)).to_list()
+    assert PointBatch.repeat(x, y, a, b, p, len(ks)).multiply(
+        -np.array(ks, dtype=object)).to_list() == (-batch).to_list()
+
+
+def test_multiples_end_at_infinity():
+    p, a, b = 37, 0, 7
+    xs, ys = curve_points(p, a, b)
+    P = multiples(int(xs[0]), int(ys[0]), p, a, b, 40)
+    points = P.to_list()
+    assert points[0] is None
+    order = points.index(None, 1)
+    assert points[order:2*order] == points[:order]
+
+
+def test_on_curve():
+    p, a, b = 37, 0, 7
+    xs, ys = curve_points(p, a, b)
+    assert on_curve(xs, ys, p, a, b).all()
+    assert not on_curve([xs[0], xs[0] + p, 1], [(ys[0] + 1) % p, ys[0], 1], p, a, b).any()
+
+
+def test_points_of_different_curves_do_not_mix():
+    with pytest.raises(TypeError):
+        PointBatch([18], [17], 0, 7, 37) + PointBatch([0], [0], 1, 0, 37)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from elliptic import cayley
+from elliptic.cayley import CayleyTable, cayley_table
+from elliptic.curve import get_curve
+
+
+@pytest.mark.parametrize('p, a, b', [(5, 1, 1), (37, 0, 7), (43, 1, 0), (61, 2, 3)])
+def test_table_matches_curve_add(p, a, b):
+    table = CayleyTable(p, a, b)
+    curve = get_curve(p, a, b)
+    points = [table.point(i) for i in range(table.order)]
+    assert points[0] is None and len(set(points)) == table.order
+    assert all(curve.contains(*P) for P in points[1:])
+
+    for i, P in enumerate(points):
+        for j, Q in enumerate(points):
+            assert table.point(int(table.table[i, j])) == curve.add(P, Q)
+            assert table.add(P, Q) == curve.add(P, Q)
+
+
+def test_group_laws():
+    table = CayleyTable(61, 2, 3).table
+    n = len(table)
+    assert np.array_equal(table, table.T)
+    assert np.array_equal(table[0], np.arange(n))
+    # every row is a permutation, and every point has an inverse
+    assert all(len(set(row.tolist())) == n for row in table)
+    assert all((row == 0).sum() == 1 for row in table)
+    i, j, k = np.random.default_rng(0).integers(0, n, (3, 200))
+    assert np.array_equal(table[table[i, j], k], table[i, table[j, k]])
+
+
+def test_points_not_on_the_curve():
+    table = CayleyTable(37, 0, 7)
+    assert table.number(1, 1) is None and table.number(None, None) == 0
+    with pytest.raises(ValueError):
+        table.add((1, 1), (18, 17))
+
+
+def test_cache_and_limit(monkeypatch):
+    monkeypatch.setattr(cayley, 'cayley_dict', {})
+    assert cayley_table(37, 0, 7) is cayley_table(37, 0, 7)
+    assert cayley_table(4099, 0, 7) is None # more than max_order points
+    monkeypatch.setattr(cayley, 'max_order', 10)
+    assert cayley_table(37, 1, 1) is None # Hasse allows 26 points at least
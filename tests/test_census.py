@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from elliptic.census import census, legendre_table, summary
+from elliptic.group import GroupStructure, curve_order, factorize
+
+
+@pytest.mark.parametrize('p', [5, 7, 11, 13])
+def test_census_matches_group(p):
+    rows = census(p, processes=1)
+    assert [row['a'][0] for row in rows if len(row['a'])] == list(range(p))
+    for row in rows:
+        for a, b, order, trace, prime, cofactor, cyclic in zip(*[row[_].tolist() for _ in
+                ['a', 'b', 'order', 'trace', 'prime', 'cofactor', 'cyclic']]):
+            group_ = GroupStructure(p, a, b)
+            assert (4*a**3 + 27*b**2) % p != 0
+            assert order == group_.order == curve_order(p, a, b)
+            assert trace == p + 1 - order and trace**2 <= 4*p
+            assert prime == max(factorize(order)) and prime*cofactor == order
+            assert cyclic == group_.cyclic
+
+
+@pytest.mark.parametrize('p', [37, 61])
+def test_orders_match_curve_order(p):
+    for row in census(p, processes=1):
+        assert row['order'].tolist() == [curve_order(p, a, b) for a, b in zip(row['a'].tolist(), row['b'].tolist())]
+
+
+def test_legendre_table():
+    p = 23
+    squares = {x*x % p for x in range(1, p)}
+    assert legendre_table(p).tolist() == [0] + [1 if v in squares else -1 for v in range(1, p)]
+
+
+def test_summary():
+    totals = summary(census(7, processes=1))
+    assert totals['curves'] == 7*7 - 7 # the singular ones are a = -3t^2, b = 2t^3 for t in F_p
+    assert totals['min_order'] >= 7 + 1 - 2*np.sqrt(7)
+
+
+@pytest.mark.parametrize('p', [2, 3, 9, 91])
+def test_not_a_prime(p):
+    with pytest.raises(ValueError):
+        census(p, processes=1)
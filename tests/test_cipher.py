@@ -0,0 +1,107 @@
+import os
+
+import pytest
+from cryptography.fernet import InvalidToken
+
+from elliptic import cipher
+from elliptic.cipher import MAGIC, PREFIX_SIZE, decrypt_chunks, decrypt_message, encrypt_chunks, encrypt_message
+
+
+secret = '**(12, 5)**'
+header_size = len(MAGIC) + PREFIX_SIZE
+
+
+def encrypt(chunks, secret=secret):
+    return b''.join(encrypt_chunks(secret, chunks))
+
+
+def decrypt(stream, secret=secret, size=None):
+    """decrypt stream handed over in pieces of size bytes (all at once by default)"""
+    size = size or max(1, len(stream))
+    return b''.join(decrypt_chunks(secret, [stream[i:i + size] for i in range(0, len(stream), size)]))
+
+
+@pytest.mark.parametrize('chunks', [[], [b''], [b'hello'], [b'a'*1000, b'b'*1000, b'c'], [os.urandom(65536)]*3])
+def test_round_trip(chunks):
+    stream = encrypt(chunks)
+    assert stream.startswith(MAGIC)
+    assert decrypt(stream) == b''.join(chunks)
+    assert decrypt(stream, size=7) == b''.join(chunks) # frames split across reads
+
+
+def test_secret_is_normalized():
+    stream = encrypt([b'hello'], '**(12, 5)**')
+    assert decrypt(stream, '(12,5)') == b'hello'
+    with pytest.raises(InvalidToken):
+        decrypt(stream, '(12, 6)')
+
+
+def test_nonces_differ():
+    assert encrypt([b'hello']) != encrypt([b'hello'])
+
+
+def test_message_round_trip():
+    token = encrypt_message(secret, 'attack at dawn ☕')
+    assert decrypt_message('(12, 5)', token) == 'attack at dawn ☕'
+    for bad in ['', 'not a token!', token[:-4], 'é']:
+        with pytest.raises(InvalidToken):
+            decrypt_message(secret, bad)
+
+
+def test_truncated():
+    stream = encrypt([b'a'*100, b'b'*100, b'c'*100])
+    frame = 5 + 100 + 16
+    # inside the header, inside a frame, and at every frame boundary before the last
+    for end in [0, 3, header_size, header_size + 2, header_size + 50,
+                header_size + frame, header_size + 2*frame, len(stream) - 1]:
+        with pytest.raises(InvalidToken):
+            decrypt(stream[:end])
+
+
+def test_tampered():
+    stream = encrypt([b'a'*100, b'b'*100, b'c'*100])
+    frame = 5 + 100 + 16
+    first, second = header_size, header_size + frame
+    tampered = [
+        b'XXXX' + stream[4:], # magic
+        stream[:5] + bytes([stream[5] ^ 1]) + stream[6:], # nonce prefix
+        stream[:first] + b'\x01' + stream[first + 1:], # first frame marked last
+        stream[:first + 20] + bytes([stream[first + 20] ^ 1]) + stream[first + 21:], # ciphertext
+        stream[:second - 1] + bytes([stream[second - 1] ^ 1]) + stream[second:], # tag
+        stream[:first] + stream[second:second + frame] + stream[first:second] + stream[second + frame:], # reordered
+        stream[:first] + stream[second:], # dropped
+        stream + b'\x00', # trailing data
+        stream + stream[header_size:], # frames appended after the last
+        ]
+    for stream_ in tampered:
+        with pytest.raises(InvalidToken):
+            decrypt(stream_)
+
+
+def test_frame_too_large(monkeypatch):
+    stream = encrypt([b'a'*100])
+    monkeypatch.setattr(cipher, 'MAX_FRAME', 64)
+    with pytest.raises(InvalidToken, match='too large'):
+        decrypt(stream)
+
+
+@pytest.fixture
+def client():
+    flask = pytest.importorskip('flask')
+    server = flask.Flask(__name__)
+    cipher.register_routes(server)
+    return server.test_client()
+
+
+def test_stream_routes(client):
+    body = os.urandom(100000)
+    headers = {'X-Shared-Secret': secret}
+    encrypted = client.post('/secret-sharing/encrypt', data=body, headers=headers)
+    assert encrypted.status_code == 200
+    decrypted = client.post('/secret-sharing/decrypt', data=encrypted.data, headers=headers)
+    assert decrypted.status_code == 200 and decrypted.data == body
+
+    assert client.post('/secret-sharing/encrypt', data=body).status_code == 400
+    assert client.post('/secret-sharing/encrypt?secret=(12,5)', data=body).status_code == 400
+    assert client.post('/secret-sharing/decrypt', data=b'garbage', headers=headers).status_code == 400
+    assert client.get('/secret-sharing/download/nosuchtoken/x.enc').status_code == 404
@@ -0,0 +1,44 @@
+import pytest
+
+from elliptic import counters
+from elliptic.curve import get_curve
+
+
+@pytest.fixture
+def counting():
+    counters.install()
+    token = counters.start()
+    yield
+    counters.stop(token)
+    counters.uninstall()
+
+
+def test_curve_counts_field_operations(counting):
+    curve = get_curve(37, 0, 7)
+    P, Q = (18, 17), curve.double((18, 17))
+    counts = counters._current.get()
+    assert counts == dict(point_double=1, field_inv=1, field_mul=7, field_add=4)
+
+    counts.clear()
+    curve.add(P, Q)
+    curve.add(P, P)
+    curve.add(P, curve.negate(P)) # infinity, no slope
+    curve.add(None, P)
+    assert counts == dict(point_add=3, point_double=1, field_inv=2, field_mul=9, field_add=11)
+
+
+def test_scalar_multiply_counts_every_inversion(counting):
+    curve = get_curve(37, 0, 7)
+    counts = counters._current.get()
+    curve.multiply((18, 17), 11) # 11 = 0b1011: three doublings, two finite additions
+    assert counts['scalar_mul'] == 1
+    assert counts['point_double'] == 3
+    assert counts['point_add'] == 3 # the first one adds to infinity
+    assert counts['field_inv'] == 5
+
+
+def test_uninstall_restores_the_curve():
+    add = get_curve(37, 0, 7).add.__func__
+    counters.install()
+    counters.uninstall()
+    assert get_curve(37, 0, 7).add.__func__ is add
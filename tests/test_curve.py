@@ -0,0 +1,99 @@
+import pytest
+
+from elliptic import arith
+from elliptic.batch import curve_points
+from elliptic.curve import Curve, Point, get_curve
+
+from tests.conftest import ecc_xy
+
+
+@pytest.fixture(params=[(37, 0, 7), (43, 1, 0), (71, 0, 7), (223, 0, 7)])
+def curves(request, ecc):
+    """a Curve, all its points and an ecc point maker for the same curve"""
+    FieldElement, EccPoint = ecc
+    p, a, b = request.param
+    F = lambda n: FieldElement(n % p, p)
+
+    def to_ecc(xy):
+        if xy is None:
+            return EccPoint(None, None, F(a), F(b))
+        return EccPoint(F(xy[0]), F(xy[1]), F(a), F(b))
+
+    xs, ys = curve_points(p, a, b)
+    return get_curve(p, a, b), list(zip(xs.tolist(), ys.tolist())), to_ecc
+
+
+def test_addition_matches_ecc(curves):
+    curve, points, to_ecc = curves
+    points = points[:24] + [None]
+    for P in points:
+        for Q in points:
+            assert curve.add(P, Q) == ecc_xy(to_ecc(P) + to_ecc(Q)), (P, Q)
+        assert curve.double(P) == ecc_xy(to_ecc(P) + to_ecc(P))
+        assert curve.add(P, curve.negate(P)) is None
+
+
+def test_multiply_matches_ecc(curves):
+    curve, points, to_ecc = curves
+    for P in points[::5]:
+        for n in [0, 1, 2, 3, 7, curve.p, curve.p + 2]:
+            assert curve.multiply(P, n) == ecc_xy(n*to_ecc(P))
+            assert curve.multiply(P, -n) == curve.negate(curve.multiply(P, n))
+
+
+def test_point_operators(curves):
+    curve, points, to_ecc = curves
+    G = curve.point(*points[-1])
+    H = curve.point(*points[len(points)//2])
+    inf = curve.infinity
+    assert ecc_xy(to_ecc(G.xy) + to_ecc(H.xy)) == (G + H).xy
+    assert 5*G == G*5 == G + G + G + G + G
+    assert G - G == inf and (G + inf, inf + G, inf + inf) == (G, G, inf)
+    assert -inf == inf and (-G).xy == curve.negate(G.xy)
+    assert 0*G == inf and inf.xy is None and (inf.x, inf.y) == (None, None)
+
+    multiples = G.multiples()
+    assert multiples[0] == G and all(P != inf for P in multiples)
+    assert (len(multiples) + 1)*G == inf
+    assert [ecc_xy(to_ecc(P.xy)) for P in multiples] == [P.xy for P in multiples]
+
+
+def test_points_of_order_2():
+    curve = get_curve(43, 1, 0)
+    T = curve.point(0, 0)
+    assert T + T == curve.infinity and 2*T == curve.infinity
+    assert -T == T and T.multiples() == [T]
+
+
+def test_point_must_be_on_the_curve(ecc):
+    FieldElement, EccPoint = ecc
+    curve = get_curve(37, 0, 7)
+    for x, y in [(18, 18), (18 + 37, 17), (-19, 17)]:
+        with pytest.raises(ValueError):
+            curve.point(x, y)
+    F = lambda n: FieldElement(n, 37)
+    with pytest.raises(ValueError):
+        EccPoint(F(18), F(18), F(0), F(7))
+
+
+def test_points_of_different_curves_do_not_mix():
+    G = get_curve(37, 0, 7).point(18, 17)
+    H = get_curve(37, 0, 8).point(1, 3)
+    with pytest.raises(TypeError):
+        G + H
+    with pytest.raises(TypeError):
+        G - H
+    assert G != Point(get_curve(37, 1, 7), 18, 17)
+
+
+def test_curves_are_shared():
+    assert get_curve(37, 0, 7) is get_curve(37, 37, 44)
+    assert get_curve(37, 0, 7) == Curve(37, 0, 7)
+    assert get_curve(37, 0, 7).point(18, 17) == Curve(37, 0, 7).point(18, 17)
+    assert len({get_curve(37, 0, 7).point(18, 17), Curve(37, 0, 7).point(18, 17)}) == 1
+
+
+def test_inverse_of_zero_raises():
+    # the curve never inverts zero (vertical lines give infinity), arith refuses to
+    with pytest.raises(ValueError):
+        arith.inverse(0, 37)
@@ -0,0 +1,59 @@
+import base64
+import hashlib
+
+import pytest
+
+from elliptic import cipher, digest as digest_module
+from elliptic.digest import SUFFIX, digest, to_z, upload_digest, upload_parts
+from elliptic.spool import Spool
+
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch):
+    spool = Spool(str(tmp_path / 'uploads'))
+    monkeypatch.setattr(digest_module, 'uploads', spool)
+    upload_digest.cache_clear()
+    yield spool
+    upload_digest.cache_clear()
+
+
+def test_digest_of_parts():
+    message = b'btc++ is the best!' * 1000
+    expected = hashlib.sha256(message + SUFFIX).digest()
+    assert digest([message]) == expected
+    assert digest([message.decode()]) == expected
+    assert digest([message[:7], [message[7:100], message[100:]]]) == expected # chunks of a part
+    assert digest([message], suffix=b'') == hashlib.sha256(message).digest()
+
+
+def test_to_z():
+    digest_ = hashlib.sha256(b'z').digest()
+    assert to_z(digest_, 2) == int.from_bytes(digest_[:2], 'big')
+    assert to_z(digest_) == int.from_bytes(digest_[:30], 'big')
+
+
+def test_upload_hashes_like_typed_text(uploads):
+    message = b'0123456789abcdef' * 5000
+    token = uploads.save(message[i:i + 1000] for i in range(0, len(message), 1000))
+    assert upload_digest(token) == digest([message.decode()])
+    assert digest(['R', 'H_A', upload_parts(dict(token=token))]) == digest(['RH_A', message])
+    assert upload_parts(dict(token='0'*32)) is None
+
+
+def upload(data):
+    return 'data:text/plain;base64,' + base64.b64encode(data).decode()
+
+
+def test_upload_message(uploads, dashboard, monkeypatch):
+    monkeypatch.setattr(dashboard, 'get_triggered', lambda: 'sign-upload')
+    monkeypatch.setattr(dashboard, 'uploads', uploads)
+    message_file, text = dashboard.upload_message(upload(b'sign me'), 'typed', 'doc.txt')
+    assert text == 'Signing doc.txt (7 bytes)'
+    assert upload_digest(message_file['token']) == digest(['sign me'])
+
+    monkeypatch.setattr(cipher, 'max_upload', 1000)
+    message_file, text = dashboard.upload_message(upload(b'x'*1001), 'typed', 'big.txt')
+    assert message_file is None and 'over' in text
+
+    monkeypatch.setattr(dashboard, 'get_triggered', lambda: 'sign-message')
+    assert dashboard.upload_message(upload(b'sign me'), 'typed', 'doc.txt')[0] is None
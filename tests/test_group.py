@@ -0,0 +1,63 @@
+import pytest
+
+from elliptic import group
+from elliptic.curve import get_curve
+from elliptic.group import GroupStructure, curve_order, factorize, group_invariants, group_structure
+
+
+curves = [(5, 1, 1), (11, 10, 0), (37, 0, 7), (43, 1, 0), (61, 2, 3), (97, 3, 5)]
+
+
+def brute_order(curve, P):
+    """smallest n > 0 with nP = infinity"""
+    n, Q = 1, P
+    while Q is not None:
+        n, Q = n + 1, curve.add(Q, P)
+    return n
+
+
+def test_factorize():
+    assert factorize(1) == {}
+    assert factorize(97) == {97: 1}
+    assert factorize(2**4*3*97**2) == {2: 4, 3: 1, 97: 2}
+
+
+@pytest.mark.parametrize('p, a, b', curves)
+def test_point_orders(p, a, b):
+    curve = get_curve(p, a, b)
+    points = [(x, y) for x in range(p) for y in range(p) if curve.contains(x, y)]
+    group_ = GroupStructure(p, a, b)
+    assert group_.order == len(points) + 1 == curve_order(p, a, b)
+    for P in points:
+        assert group_.point_order(*P) == brute_order(curve, P)
+        assert group_.cofactor(*P)*group_.point_order(*P) == group_.order
+
+
+@pytest.mark.parametrize('p, a, b', curves)
+def test_invariants(p, a, b):
+    group_ = GroupStructure(p, a, b)
+    assert group_invariants(p, a, b) == (group_.order, group_.n1, group_.n2)
+    assert group_.n1 % group_.n2 == 0 and group_.n1*group_.n2 == group_.order
+    assert all(group_.point_order(*P) == group_.n1 for P in group_.generators())
+
+
+def test_non_cyclic():
+    # y^2 = x^3 - x has all three points of order 2 over F_11
+    group_ = GroupStructure(11, 10, 0)
+    assert (group_.order, group_.n1, group_.n2) == (12, 6, 2) and not group_.cyclic
+    assert sorted(group_.points_of_order(2)) == [(0, 0), (1, 0), (10, 0)]
+
+
+def test_lookups():
+    group_ = GroupStructure(37, 0, 7)
+    assert group_.cyclic and group_.prime_orders() == [13, 3]
+    assert group_.point_order(None, None) == group_.point_order(-1, -1) == 1
+    assert group_.point_order(1, 1) is None and group_.cofactor(1, 1) is None
+    assert all(group_.point_order(*P) == 13 for P in group_.prime_order_generators())
+    assert len(group_.prime_order_generators(limit=2)) == 2
+    assert group_.to_dict(limit=1)['prime_order'] == 13
+
+
+def test_cache(monkeypatch):
+    monkeypatch.setattr(group, 'group_dict', {})
+    assert group_structure(37, 0, 7) is group_structure(37, 0, 7)
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from elliptic.curve import get_curve
+from elliptic.sessions import session_store
+
+
+def click(x, y):
+    return {'points': [{'x': x, 'y': y}]}
+
+
+def test_key_context(dashboard):
+    context = dashboard.key_context(37, 0, 7, click(18, 17))
+    assert context == dict(curve=[37, 0, 7], order=39, generator=[18, 17],
+                           on_curve=True, subgroup_order=13)
+    assert len(json.dumps(context)) < 200 # the multiples stay on the server
+
+    assert dashboard.key_context(37, 0, 7, None)['generator'] is None
+    off_curve = dashboard.key_context(37, 0, 7, click(1, 1))
+    assert off_curve['generator'] == [1, 1] and not off_curve['on_curve']
+
+
+@pytest.mark.parametrize('n', [0, 1, 2, 5, 12, 13, 14, 40])
+def test_multiply_points(dashboard, n):
+    context = dashboard.key_context(37, 0, 7, click(18, 17))
+    store = dashboard.update_multiply_points(n, context, None)
+    points = session_store.curves(store, str((37, 0, 7)))[str((37, 0, 7))]
+    nG = get_curve(37, 0, 7).multiply((18, 17), n)
+    assert points == [(18, 17), (-1, -1) if nG is None else nG]
+
+
+def test_multiples_cache(dashboard, monkeypatch):
+    monkeypatch.setattr(dashboard, 'multiples_dict', {})
+    context = dashboard.key_context(37, 0, 7, click(18, 17))
+    dashboard.update_multiply_points(3, context, None)
+    assert list(dashboard.multiples_dict) == [(37, 0, 7, 18, 17)]
+    dashboard.multiples_dict.clear() # as elliptic.memory does when shedding
+    store = dashboard.update_multiply_points(3, context, None)
+    assert session_store.curves(store)[str((37, 0, 7))][1] == get_curve(37, 0, 7).multiply((18, 17), 3)
+
+
+def test_priv_in_bounds(dashboard):
+    assert dashboard.priv_in_bounds(dashboard.key_context(37, 0, 7, None), 100) == (39, 39)
+    assert dashboard.priv_in_bounds(dashboard.key_context(37, 0, 7, click(18, 17)), 5) == (12, 5)
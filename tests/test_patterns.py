@@ -0,0 +1,143 @@
+import json
+import os
+
+import dash
+import pytest
+import yaml
+from dash import html
+from dash.dependencies import ALL, Input, Output, State
+from dash.exceptions import PreventUpdate
+
+from elliptic import patterns
+from elliptic.curve import get_curve
+from elliptic.sessions import session_store
+
+
+with open(os.path.join(os.path.dirname(__file__), '..', 'elliptic.yaml')) as f:
+    callbacks_conf = yaml.safe_load(f)['callbacks']
+
+keys = ['sign-pub', 'sign-secret', 'alice-pub', 'alice-secret', 'bob-pub', 'bob-secret']
+scalars = ['sign-priv', 'sign-k', 'alice-priv', 'bob-priv']
+
+
+@pytest.fixture(scope='module')
+def client(dashboard):
+    """test client of an app with the key callbacks of elliptic.yaml"""
+    app = dash.Dash(__name__)
+    app.layout = html.Div()
+    resolved = patterns.resolve(callbacks_conf)
+    for name in ['key_contexts', 'update_key_bounds', 'update_key_points']:
+        spec = resolved[name]
+        outputs = [Output(dep['id'], dep['attr']) for dep in spec['output']]
+        app.callback(outputs[0] if len(outputs) == 1 else outputs, # as psidash registers them
+                     [Input(dep['id'], dep['attr']) for dep in spec['input']],
+                     [State(dep['id'], dep['attr']) for dep in spec.get('state', [])],
+                     )(getattr(dashboard, spec['callback'].rsplit('.', 1)[1]))
+    return app.server.test_client()
+
+
+def prop_id(kind, index, prop):
+    return json.dumps(dict(index=index, kind=kind), separators=(',', ':')) + '.' + prop
+
+
+def call(client, name, inputs, state=(), outputs=(), triggered=()):
+    """post an update of the callback `name`, returns {(kind, index, prop): value}
+
+    the values of ALL dependencies are dicts {index: value}, outputs lists
+    the indices of each ALL output and triggered the prop ids that fired
+    """
+    spec = callbacks_conf[name]
+
+    def dep(dep, value):
+        if isinstance(dep['id'], dict):
+            return [{'id': dict(dep['id'], index=index), 'property': dep['attr'], 'value': v}
+                    for index, v in value.items()]
+        return {'id': dep['id'], 'property': dep['attr'], 'value': value}
+
+    output = '...'.join(str(Output(patterns.resolve_id(dep['id']), dep['attr'])) for dep in spec['output'])
+    outputs = [[{'id': dict(dep['id'], index=index), 'property': dep['attr']} for index in indices]
+               for dep, indices in zip(spec['output'], outputs)]
+    if len(outputs) > 1:
+        output = '..' + output + '..'
+    body = dict(output=output, outputs=outputs if len(outputs) > 1 else outputs[0],
+                inputs=[dep(*_) for _ in zip(spec['input'], inputs)],
+                state=[dep(*_) for _ in zip(spec.get('state', []), state)],
+                changedPropIds=list(triggered))
+    response = client.post('/_dash-update-component', json=body)
+    if response.status_code == 204:
+        return {}
+    assert response.status_code == 200, response.data
+    return {(json.loads(id_)['kind'], json.loads(id_)['index'], prop): value
+            for id_, props in json.loads(response.data)['response'].items()
+            for prop, value in props.items()}
+
+
+def click(x, y):
+    return {'points': [{'x': x, 'y': y}]}
+
+
+def test_resolve():
+    conf = {'cb': {'input': [{'id': 'user-input-p', 'attr': 'value'},
+                             {'id': {'kind': 'key-graph', 'index': 'ALL'}, 'attr': 'clickData'}],
+                   'output': [{'id': {'kind': 'key-context', 'index': 'sign-pub'}, 'attr': 'data'}],
+                   'callback': 'f'}}
+    resolved = patterns.resolve(conf)['cb']
+    assert resolved['input'][0]['id'] == 'user-input-p'
+    assert resolved['input'][1]['id'] == {'kind': 'key-graph', 'index': ALL}
+    assert resolved['output'][0]['id'] == {'kind': 'key-context', 'index': 'sign-pub'}
+    assert conf['cb']['input'][1]['id']['index'] == 'ALL' # the conf is left alone
+
+
+def test_map_indices():
+    specs = [{'id': {'kind': 'key-points', 'index': key}} for key in ['a', 'b', 'c']]
+    assert patterns.by_index([1, 2, 3], specs) == {'a': 1, 'b': 2, 'c': 3}
+    assert patterns.map_indices(specs, None, str.upper) == ['A', 'B', 'C']
+    assert patterns.map_indices(specs, {'b'}, str.upper) == [dash.no_update, 'B', dash.no_update]
+
+    def compute(index):
+        if index == 'a':
+            raise PreventUpdate
+        return index
+    assert patterns.map_indices(specs, None, compute) == [dash.no_update, 'b', 'c']
+    with pytest.raises(PreventUpdate):
+        patterns.map_indices(specs, {'a'}, compute)
+
+
+def test_curve_change_updates_every_key(client, dashboard):
+    p_i = dashboard.primes_.index(37)
+    clicks = dict.fromkeys(keys)
+    clicks['bob-pub'] = click(18, 17)
+    contexts = call(client, 'key_contexts', [p_i, 0, 7, clicks], outputs=[keys],
+                    triggered=['user-input-p.value'])
+    assert contexts == {('key-context', key, 'data'): dashboard.key_context(37, 0, 7, clicks[key])
+                        for key in keys}
+
+
+def test_click_updates_its_key_only(client, dashboard):
+    p_i = dashboard.primes_.index(37)
+    clicks = dict.fromkeys(keys)
+    clicks['alice-pub'] = click(18, 17)
+    contexts = call(client, 'key_contexts', [p_i, 0, 7, clicks], outputs=[keys],
+                    triggered=[prop_id('key-graph', 'alice-pub', 'clickData')])
+    assert contexts == {('key-context', 'alice-pub', 'data'): dashboard.key_context(37, 0, 7, click(18, 17))}
+
+
+def test_scalar_updates_the_keys_it_multiplies(client, dashboard):
+    context = dashboard.key_context(37, 0, 7, click(18, 17))
+    contexts = dict.fromkeys(keys, context)
+    values = dict.fromkeys(scalars, 1)
+    values['alice-priv'] = 5
+    stores = call(client, 'update_key_points', [values, contexts], [dict.fromkeys(keys)],
+                  outputs=[keys], triggered=[prop_id('key-scalar', 'alice-priv', 'value')])
+    assert set(stores) == {('key-points', 'alice-pub', 'data'), ('key-points', 'alice-secret', 'data')}
+    for store in stores.values():
+        points = session_store.curves(store, str((37, 0, 7)))[str((37, 0, 7))]
+        assert points == [(18, 17), get_curve(37, 0, 7).multiply((18, 17), 5)]
+
+
+def test_context_bounds_its_scalar(client, dashboard):
+    contexts = dict.fromkeys(keys, dashboard.key_context(37, 0, 7, None))
+    contexts['sign-pub'] = dashboard.key_context(37, 0, 7, click(18, 17)) # order 13
+    bounds = call(client, 'update_key_bounds', [contexts], [dict.fromkeys(scalars, 20)],
+                  outputs=[scalars, scalars], triggered=[prop_id('key-context', 'sign-pub', 'data')])
+    assert bounds == {('key-scalar', 'sign-priv', 'max'): 12, ('key-scalar', 'sign-priv', 'value'): 12}
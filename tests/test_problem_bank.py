@@ -0,0 +1,71 @@
+import logging
+import os
+
+from elliptic.problem_bank import ProblemBank, normalize
+
+
+def write(path, text, mtime=None):
+    path.write_text(text)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+problem = '''point-multiplication:
+  - question: q{}
+    answer_z30: {}
+    type: int
+    normalize: [strip, nospace]
+'''
+
+
+def test_problems_and_lookup(tmp_path):
+    write(tmp_path / 'a.yaml', problem.format(1, 11))
+    (tmp_path / 'more').mkdir()
+    write(tmp_path / 'more' / '01.yaml', problem.format(2, 22))
+    bank = ProblemBank([str(tmp_path / 'a.yaml'), str(tmp_path / 'more' / '*.yaml')], check_interval=0)
+    assert [p['question'] for p in bank.problems('point-multiplication')] == ['q1', 'q2']
+    assert bank.lookup('point-multiplication', 1) == (22, 'int', ('strip', 'nospace'))
+    assert bank.lookup('point-multiplication', 2) is None and bank.problems('ecdsa') == []
+
+
+def test_reload_on_change(tmp_path):
+    path = tmp_path / 'a.yaml'
+    write(path, problem.format(1, 11), mtime=10**18)
+    bank = ProblemBank(str(path), check_interval=0)
+    assert not bank.refresh()
+    write(path, problem.format(1, 12), mtime=2*10**18)
+    assert bank.refresh()
+    assert bank.lookup('point-multiplication', 0)[0] == 12
+    path.unlink()
+    assert bank.refresh() and bank.problems('point-multiplication') == []
+
+
+def test_bad_file_warns_once(tmp_path, caplog):
+    path = tmp_path / 'a.yaml'
+    write(path, problem.format(1, 11), mtime=10**18)
+    bank = ProblemBank(str(path), check_interval=0)
+
+    write(path, 'point-multiplication: [', mtime=2*10**18) # half-written
+    with caplog.at_level(logging.WARNING):
+        for _ in range(3):
+            assert not bank.refresh()
+    assert len([r for r in caplog.records if 'could not load' in r.message]) == 1
+    assert bank.lookup('point-multiplication', 0)[0] == 11 # the previous version stays
+
+    write(path, problem.format(1, 13), mtime=3*10**18)
+    assert bank.refresh()
+    assert bank.lookup('point-multiplication', 0)[0] == 13
+
+
+def test_check_interval(tmp_path):
+    path = tmp_path / 'a.yaml'
+    write(path, problem.format(1, 11), mtime=10**18)
+    bank = ProblemBank(str(path), check_interval=3600)
+    write(path, problem.format(1, 12), mtime=2*10**18)
+    assert bank.lookup('point-multiplication', 0)[0] == 11
+    assert bank.refresh(force=True) and bank.lookup('point-multiplication', 0)[0] == 12
+
+
+def test_normalize():
+    assert normalize(' 1 2 ', ('strip', 'nospace')) == '12'
+    assert normalize('ABC', ('lower',)) == 'abc'
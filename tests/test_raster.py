@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from elliptic.batch import curve_points
+from elliptic.raster import column_points, get_viewport, rasterize
+
+
+def point_set(xs, ys):
+    return set(zip(np.asarray(xs).tolist(), np.asarray(ys).tolist()))
+
+
+@pytest.mark.parametrize('p, a, b', [(37, 0, 7), (41, 2, 3), (97, -1, 5), (257, 0, 7), (7681, 3, 11)])
+def test_column_points(p, a, b):
+    assert point_set(*column_points(p, a, b, np.arange(p))) == point_set(*curve_points(p, a, b))
+    xs, ys = column_points(p, a, b, [1, 5, 5])
+    assert np.all((ys*ys - xs**3 - a*xs - b) % p == 0)
+
+
+def test_viewport():
+    assert get_viewport(None, 101) == (-0.5, 100.5, -0.5, 100.5)
+    assert get_viewport({'autosize': True}, 101) == (-0.5, 100.5, -0.5, 100.5)
+    assert get_viewport({'xaxis.range[0]': 30, 'xaxis.range[1]': 10}, 101) == (10, 30, -0.5, 100.5)
+    assert get_viewport({'yaxis.range': [-50, 500]}, 101) == (-0.5, 100.5, -0.5, 100.5)
+    x0, x1, _, _ = get_viewport({'xaxis.range': [200, 300]}, 101)
+    assert x0 == 99.5 and x1 == 100.5
+
+
+def test_exact_counts():
+    p, a, b = 1009, 1, 1
+    xs, ys = curve_points(p, a, b)
+    z, x0, dx, y0, dy, exact = rasterize(p, a, b, get_viewport(None, p), width=100, height=50)
+    assert exact and z.shape == (50, 100) and z.sum() == len(xs)
+    expected, _, _ = np.histogram2d(ys, xs, bins=[50, 100], range=[[-0.5, p - 0.5], [-0.5, p - 0.5]])
+    assert np.array_equal(z, expected)
+    assert (x0, dx) == (-0.5 + p/200, p/100)
+
+
+def test_zoomed_in():
+    p, a, b = 1009, 1, 1
+    xs, ys = curve_points(p, a, b)
+    viewport = (99.5, 120.5, 199.5, 700.5)
+    z, x0, dx, y0, dy, exact = rasterize(p, a, b, viewport)
+    assert exact and z.shape == (500, 21) and x0 == 100 and dx == 1
+    inside = (xs >= 100) & (xs <= 120) & (ys >= 200) & (ys <= 700)
+    assert z.sum() == inside.sum()
+
+
+def test_sampled_counts_scale_up():
+    p, a, b = 1000003, 0, 7
+    z, _, _, _, _, exact = rasterize(p, a, b, get_viewport(None, p), budget=10000)
+    assert not exact
+    # every x is hit by 0, 1 or 2 points, about p in total
+    assert abs(z.sum() - p) < 0.05*p
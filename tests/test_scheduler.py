@@ -0,0 +1,159 @@
+import threading
+import time
+
+import pytest
+
+from elliptic import scheduler as scheduler_module
+from elliptic.scheduler import HEAVY, INTERACTIVE, Busy, Scheduler
+
+
+def scheduler(**kwargs):
+    kwargs = dict(dict(slots=4, heavy_slots=2, per_session=2, rate=100.0, burst=100,
+                       max_wait=5.0, heavy=['render']), **kwargs)
+    return Scheduler(**kwargs)
+
+
+def start(scheduler, session, name, started):
+    """acquire in a thread, appending (session, name, ticket or Busy) to started"""
+    def run():
+        try:
+            started.append((session, name, scheduler.acquire(session, name)))
+        except Busy as busy:
+            started.append((session, name, busy))
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def test_kinds():
+    s = scheduler()
+    assert s.kind('render') == HEAVY and s.kind('click') == INTERACTIVE
+    ticket = s.acquire('a', 'render')
+    assert ticket == ('a', HEAVY)
+    assert s.status()['running'] == {HEAVY: 1} and s.status()['sessions'] == 1
+    s.release(ticket)
+    assert s.status()['running'] == {HEAVY: 0} and s.status()['sessions'] == 0
+    assert s.counts['ran'] == 1
+
+
+def test_slots():
+    s = scheduler(slots=2, max_wait=0.05)
+    tickets = [s.acquire('a', 'click'), s.acquire('b', 'click')]
+    with pytest.raises(Busy, match='no free slot'):
+        s.acquire('c', 'click')
+    assert s.counts['busy_wait'] == 1 and s.status()['waiting'] == 0
+    s.release(tickets.pop())
+    tickets.append(s.acquire('c', 'click'))
+
+
+def test_heavy_slots_leave_room_for_interactive():
+    s = scheduler(slots=3, heavy_slots=1, max_wait=0.05)
+    s.acquire('a', 'render')
+    with pytest.raises(Busy, match='no free slot'):
+        s.acquire('b', 'render')
+    s.acquire('b', 'click')
+    s.acquire('c', 'click')
+
+
+def test_per_session_waits_instead_of_failing():
+    s = scheduler(per_session=2, heavy_slots=3)
+    first, second = s.acquire('a', 'render'), s.acquire('a', 'render')
+    started = []
+    thread = start(s, 'a', 'render', started)
+    wait_for(lambda: s.status()['waiting'] == 1)
+    assert started == []
+
+    s.acquire('b', 'render') # other sessions are not held up
+    s.release(first)
+    thread.join(5)
+    assert started == [('a', 'render', ('a', HEAVY))]
+    assert s.counts['busy_wait'] == 0
+
+
+def test_per_session_wait_times_out():
+    s = scheduler(per_session=1, max_wait=0.05)
+    s.acquire('a', 'render')
+    with pytest.raises(Busy, match='no free slot'):
+        s.acquire('a', 'render')
+    s.acquire('a', 'click')
+
+
+def test_rate_limit(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(scheduler_module.time, 'monotonic', lambda: now[0])
+    s = scheduler(rate=2.0, burst=3, per_session=10, heavy_slots=4, slots=4)
+
+    for _ in range(3):
+        s.release(s.acquire('a', 'render'))
+    with pytest.raises(Busy, match='rate limit') as busy:
+        s.acquire('a', 'render')
+    assert busy.value.retry_after == 0.5
+    assert s.counts['busy_rate'] == 1
+
+    s.release(s.acquire('b', 'render')) # per session
+    s.release(s.acquire('a', 'click')) # interactive callbacks are not limited
+    now[0] += 0.5
+    s.release(s.acquire('a', 'render')) # one token back
+    with pytest.raises(Busy, match='rate limit'):
+        s.acquire('a', 'render')
+
+
+def test_interactive_overtakes_heavy():
+    s = scheduler(slots=1, heavy_slots=1)
+    ticket = s.acquire('a', 'click')
+    started = []
+    threads = [start(s, 'b', 'render', started)]
+    wait_for(lambda: s.status()['waiting'] == 1)
+    threads.append(start(s, 'c', 'click', started))
+    wait_for(lambda: s.status()['waiting'] == 2)
+
+    s.release(ticket)
+    wait_for(lambda: len(started) == 1)
+    assert started[0][:2] == ('c', 'click')
+    s.release(started[0][2])
+    for thread in threads:
+        thread.join(5)
+    assert [entry[:2] for entry in started] == [('c', 'click'), ('b', 'render')]
+
+
+def test_least_busy_session_goes_first():
+    s = scheduler(slots=3, heavy_slots=2, per_session=2)
+    held = [s.acquire('a', 'render'), s.acquire('b', 'render')]
+    started = []
+    threads = [start(s, 'a', 'render', started)]
+    wait_for(lambda: s.status()['waiting'] == 1)
+    threads.append(start(s, 'c', 'render', started))
+    wait_for(lambda: s.status()['waiting'] == 2)
+
+    s.release(held.pop()) # b's slot goes to c, which runs nothing yet
+    wait_for(lambda: len(started) == 1)
+    assert started[0][:2] == ('c', 'render')
+    s.release(started[0][2])
+    for thread in threads:
+        thread.join(5)
+    assert started[1][:2] == ('a', 'render')
+
+
+def test_purge(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(scheduler_module.time, 'monotonic', lambda: now[0])
+    s = scheduler(rate=2.0, burst=4, purge_every=4)
+    s.release(s.acquire('a', 'render'))
+    s.release(s.acquire('b', 'render'))
+    assert s.status()['buckets'] == 2
+
+    now[0] += 1.5
+    s.release(s.acquire('c', 'render'))
+    s.purge()
+    assert s.status()['buckets'] == 3 # not idle for burst/rate seconds yet
+
+    now[0] += 1
+    s.release(s.acquire('c', 'render')) # the fourth acquire purges
+    assert s.status()['buckets'] == 1
@@ -0,0 +1,159 @@
+import hashlib
+import importlib
+
+import pytest
+
+from elliptic import arith, secp256k1
+
+
+@pytest.fixture(params=sorted(arith.backends), scope='module')
+def secp(request):
+    """elliptic.secp256k1 reloaded on each arithmetic backend"""
+    default = arith.backend
+    arith.backend = arith.backends[request.param]()
+    try:
+        yield importlib.reload(secp256k1)
+    finally:
+        arith.backend = default
+        importlib.reload(secp256k1)
+
+
+def test_backends():
+    assert 'python' in arith.backends
+    if arith.gmpy2 is not None:
+        assert 'gmp' in arith.backends
+
+
+def test_generator(secp):
+    assert secp.on_curve(secp.G)
+    assert secp.multiply(1) == secp.G
+    assert secp.multiply(2)[0] == 0xC6047F9441ED7D6D3045406E95C07CD85C778E4B8CEF3CA7ABAC09B95C709EE5
+    assert secp.multiply(secp.N) is None
+    assert secp.multiply(secp.N - 1) == secp.negate(secp.G)
+    assert secp.add(secp.G, secp.negate(secp.G)) is None
+
+
+@pytest.mark.parametrize('k', [3, 0xFFFF, 2**128 + 1, secp256k1.N - 2, 0x1D3C1A0D9C2E4B1F])
+def test_multiply_matches_double_and_add(secp, k):
+    Q = secp.multiply(k)
+    assert Q == secp.multiply_slow(k)
+    assert type(Q[0]) is int and type(Q[1]) is int
+    assert secp.multiply(k, Q) == secp.multiply_slow(k, Q)
+    assert secp.multiply_add(k, 5, Q) == secp.add(secp.multiply(k), secp.multiply(5, Q))
+
+
+# private key, message, k (RFC 6979), r, s (low s)
+ecdsa_vectors = [
+    (1, b'Satoshi Nakamoto',
+     0x8F8A276C19F4149656B280621E358CCE24F5F52542772691EE69063B74F15D15,
+     0x934B1EA10A4B3C1757E2B0C017D0B6143CE3C9A7E6A4A49860D7A6AB210EE3D8,
+     0x2442CE9D2B916064108014783E923EC36B49743E2FFA1C4496F01A512AAFD9E5),
+    (secp256k1.N - 1, b'Satoshi Nakamoto',
+     0x33A19B60E25FB6F4435AF53A3D42D493644827367E6453928554F43E49AA6F90,
+     0xFD567D121DB66E382991534ADA77A6BD3106F0A1098C231E47993447CD6AF2D0,
+     None),
+    ]
+
+
+@pytest.mark.parametrize('d, message, k, r, s', ecdsa_vectors)
+def test_ecdsa_vectors(secp, d, message, k, r, s):
+    z = secp.to_int(hashlib.sha256(message).digest())
+    assert secp.rfc6979_nonce(d, z) == k
+    signature = secp.ecdsa_sign(d, z)
+    assert signature[0] == r
+    if s is not None:
+        assert signature[1] == s
+    assert signature[1] <= secp.N//2
+    assert type(signature[0]) is int and type(signature[1]) is int
+
+    Q = secp.public_key(d)
+    assert secp.ecdsa_verify(Q, z, signature)
+    assert secp.ecdsa_verify(Q, z, (signature[0], secp.N - signature[1])) # high s verifies too
+    assert not secp.ecdsa_verify(Q, z + 1, signature)
+    assert not secp.ecdsa_verify(secp.public_key(2), z, signature) # another key
+    for bad in [(0, signature[1]), (signature[0], 0), (secp.N + signature[0], signature[1])]:
+        assert not secp.ecdsa_verify(Q, z, bad)
+
+
+# BIP-340 test vectors: secret key, public key, aux, message, signature
+bip340_vectors = [
+    ('0000000000000000000000000000000000000000000000000000000000000003',
+     'F9308A019258C31049344F85F89D5229B531C845836F99B08601F113BCE036F9',
+     '0000000000000000000000000000000000000000000000000000000000000000',
+     '0000000000000000000000000000000000000000000000000000000000000000',
+     'E907831F80848D1069A5371B402410364BDF1C5F8307B0084C55F1CE2DCA8215'
+     '25F66A4A85EA8B71E482A74F382D2CE5EBEEE8FDB2172F477DF4900D310536C0'),
+    ('B7E151628AED2A6ABF7158809CF4F3C762E7160F38B4DA56A784D9045190CFEF',
+     'DFF1D77F2A671C5F36183726DB2341BE58FEAE1DA2DECED843240F7B502BA659',
+     '0000000000000000000000000000000000000000000000000000000000000001',
+     '243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89',
+     '6896BD60EEAE296DB48A229FF71DFE071BDE413E6D43F917DC8DCF8C78DE3341'
+     '8906D11AC976ABCCB20B091292BFF4EA897EFCB639EA871CFA95F6DE339E4B0A'),
+    ('C90FDAA22168C234C4C6628B80DC1CD129024E088A67CC74020BBEA63B14E5C9',
+     'DD308AFEC5777E13121FA72B9CC1B7CC0139715309B086C960E18FD969774EB8',
+     'C87AA53824B4D7AE2EB035A2B5BBBCCC080E76CDC6D1692C4B0B62D798E6D906',
+     '7E2D58D8B3BCDF1ABADEC7829054F90DDA9805AAB56C77333024B9D0A508B75C',
+     '5831AAEED7B44BB74E5EAB94BA9D4294C49BCF2A60728D8B4C200F50DD313C1B'
+     'AB745879A5AD954A72C45A91C3A51D3C7ADEA98D82F8481E0E1E03674A6F3FB7'),
+    ('0B432B2677937381AEF05BB02A66ECD012773062CF3FA2549E44F58ED2401710',
+     '25D1DFF95105F5253C4022F628A996AD3A0D95FBF21D468A1B33F8C160D8F517',
+     'FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF',
+     'FFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFF',
+     '7EB0509757E246F19449885651611CB965ECC1A187DD51B64FDA1EDC9637D5EC'
+     '97582B9CB13DB3933705B32BA982AF5AF25FD78881EBB32771FC5922EFC66EA3'),
+    ]
+
+# BIP-340 verification-only vectors: public key, message, signature, valid
+bip340_verify_vectors = [
+    ('D69C3509BB99E412E68B0FE8544E72837DFA30746D8BE2AA65975F29D22DC7B9',
+     '4DF3C3F68FCC83B27E9D42C90431A72499F17875C81A599B566C9889B9696703',
+     '00000000000000000000003B78CE563F89A0ED9414F5AA28AD0D96D6795F9C63'
+     '76AFB1548AF603B3EB45C9F8207DEE1060CB71C04E80F593060B07D28308D7F4', True),
+    # public key not on the curve
+    ('EEFDEA4CDB677750A420FEE807EACF21EB9898AE79B9768766E4FAA04A2D4A34',
+     '243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89',
+     '6CFF5C3BA86C69EA4B7376F31A9BCB4F74C1976089B2D9963DA2E5543E177769'
+     '69E89B4C5564D00349106B8497785DD7D1D713A8AE82B32FA79D5F7FC407D39B', False),
+    # R has an odd y
+    ('DFF1D77F2A671C5F36183726DB2341BE58FEAE1DA2DECED843240F7B502BA659',
+     '243F6A8885A308D313198A2E03707344A4093822299F31D0082EFA98EC4E6C89',
+     'FFF97BD5755EEEA420453A14355235D382F6472F8568A18B2F057A1460297556'
+     '3CC27944640AC607CD107AE10923D9EF7A73C643E166BE5EBEAFA34B1AC553E2', False),
+    ]
+
+
+@pytest.mark.parametrize('secret, public, aux, message, signature', bip340_vectors)
+def test_bip340_sign(secp, secret, public, aux, message, signature):
+    d, aux, message = int(secret, 16), bytes.fromhex(aux), bytes.fromhex(message)
+    signature = bytes.fromhex(signature)
+    pub_x = secp.public_key(d)[0]
+    assert pub_x == int(public, 16)
+    assert secp.schnorr_sign(d, message, aux) == signature
+    assert secp.schnorr_verify(pub_x, message, signature)
+
+    assert not secp.schnorr_verify(pub_x, bytes([message[0] ^ 1]) + message[1:], signature)
+    assert not secp.schnorr_verify(pub_x, message, signature[:-1] + bytes([signature[-1] ^ 1]))
+    assert not secp.schnorr_verify(pub_x, message, signature[:63])
+    assert not secp.schnorr_verify(pub_x, message, secp.to_bytes32(secp.P) + signature[32:])
+    assert not secp.schnorr_verify(pub_x, message, signature[:32] + secp.to_bytes32(secp.N))
+
+
+@pytest.mark.parametrize('public, message, signature, valid', bip340_verify_vectors)
+def test_bip340_verify(secp, public, message, signature, valid):
+    assert secp.schnorr_verify(int(public, 16), bytes.fromhex(message),
+                               bytes.fromhex(signature)) is valid
+
+
+def test_lift_x(secp):
+    x, y = secp.lift_x(secp.G[0])
+    assert (x, y) == secp.G and type(y) is int # G has an even y
+    assert secp.lift_x(secp.P) is None
+    assert secp.lift_x(0xEEFDEA4CDB677750A420FEE807EACF21EB9898AE79B9768766E4FAA04A2D4A34) is None
+
+
+def test_parse_private_key():
+    assert secp256k1.parse_private_key(' 0x1f ') == 31
+    assert secp256k1.parse_private_key('31') == 31
+    for key in ['0', str(secp256k1.N), '-1']:
+        with pytest.raises(ValueError):
+            secp256k1.parse_private_key(key)
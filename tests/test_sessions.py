@@ -0,0 +1,136 @@
+import threading
+
+import pytest
+
+from elliptic import sessions
+from elliptic.sessions import DiskBackend, MemoryBackend, SessionStore
+
+
+class Clock:
+    """stands in for time.time"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture(params=['memory', 'disk'])
+def store(request, tmp_path):
+    backend = MemoryBackend() if request.param == 'memory' else DiskBackend(str(tmp_path))
+    return SessionStore(backend, max_curves=3, ttl=60, purge_every=4)
+
+
+def test_handles(store):
+    assert store.curves(None) is None
+    assert store.curves({}) == {}
+    assert store.curves({'session': '../../etc/passwd'}) == {}
+
+    handle = store.update(None, 'k', [[1, 2]])
+    assert set(handle) == {'session', 'rev'}
+    assert store.session_id(handle) == handle['session']
+    assert store.curves(handle) == {'k': [[1, 2]]}
+
+    again = store.update(handle, 'k', [[3, 4]])
+    assert again['session'] == handle['session'] and again['rev'] == handle['rev'] + 1
+    assert store.curves(handle) == {'k': [[3, 4]]}
+    assert store.update({'session': 'bad'}, 'k', [])['session'] != 'bad'
+
+
+def test_ttl(store, clock):
+    handle = store.update(None, 'k', [[1, 2]])
+    clock.now += 59
+    assert store.curves(handle) == {'k': [[1, 2]]}
+    handle = store.update(handle, 'j', []) # a write extends the session
+    clock.now += 59
+    assert store.curves(handle) == {'k': [[1, 2]], 'j': []}
+    clock.now += 2
+    assert store.curves(handle) == {}
+    assert len(store) == 0
+
+    # an expired session starts over under the same id
+    new = store.update(handle, 'k', [])
+    assert new['session'] == handle['session'] and store.curves(new) == {'k': []}
+
+
+def test_purge(store, clock):
+    old = store.update(None, 'k', [])
+    clock.now += 30
+    new = store.update(None, 'k', [])
+    assert len(store) == 2
+    clock.now += 31
+    store.purge()
+    assert len(store) == 1
+    assert store.curves(old) == {} and store.curves(new) == {'k': []}
+
+    # every purge_every writes
+    clock.now += 61
+    store.update(None, 'k', [])
+    store.update(None, 'k', [])
+    assert len(store) == 2
+
+
+def test_eviction(store):
+    handle = store.update(None, 'a', [[1, 1]])
+    handle = store.update(handle, 'b', [[2, 2]])
+    handle = store.update(handle, 'c', [[3, 3]])
+    handle = store.update(handle, 'd', [[4, 4]])
+    assert list(store.curves(handle)) == ['b', 'c', 'd']
+
+    # writing and reading a curve both count as a use
+    handle = store.update(handle, 'b', [[5, 5]])
+    assert list(store.curves(handle)) == ['c', 'd', 'b']
+    assert store.curves(handle, 'c')['c'] == [[3, 3]]
+    handle = store.update(handle, 'e', [])
+    assert list(store.curves(handle)) == ['b', 'c', 'e']
+
+    # reading without a curve key, or one not kept, changes nothing
+    store.curves(handle)
+    store.curves(handle, 'a')
+    handle = store.update(handle, 'f', [])
+    assert list(store.curves(handle)) == ['c', 'e', 'f']
+
+
+def test_returns_copies(store):
+    handle = store.update(None, 'k', [[1, 2]])
+    store.curves(handle)['k'].append([3, 4])
+    store.curves(handle, 'k')['j'] = []
+    assert store.curves(handle) == {'k': [[1, 2]]}
+
+    points = [[1, 2]]
+    handle = store.update(handle, 'k', points)
+    points.append([3, 4])
+    assert store.curves(handle) == {'k': [[1, 2]]}
+
+
+def test_concurrent_updates(store):
+    handle = store.update(None, 'start', [])
+    store.max_curves = 200
+
+    def write(i):
+        for j in range(10):
+            store.update(handle, '{}-{}'.format(i, j), [[i, j]])
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(store.curves(handle)) == 81
+
+
+def test_configure(monkeypatch, tmp_path):
+    store = SessionStore()
+    monkeypatch.setattr(sessions, 'session_store', store)
+    sessions.configure('disk', max_curves=4, ttl=5, path=str(tmp_path / 'sessions'))
+    assert isinstance(store.backend, DiskBackend) and (store.max_curves, store.ttl) == (4, 5)
+    with pytest.raises(ValueError):
+        sessions.configure('redis')